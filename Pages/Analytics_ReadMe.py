@@ -0,0 +1,213 @@
+"""
+24. Analytics
+
+Streamlit-free analytics core. The Overview, Price Change, Value Over Time and Risk
+Classification tabs call these functions for their numbers and only do the
+rendering themselves, and the batch runner calls the same functions to compute
+nightly analytics for many portfolios without rendering anything.
+
+"""
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from stock_dashboard.fx import to_usd
+from stock_dashboard.indicators import rolling_volatility
+from stock_dashboard.instrumentation import record_swallowed
+from stock_dashboard.market_data import MarketDataService, get_market_data_service
+from stock_dashboard.metrics import DEFAULT_HORIZONS, compute_price_metrics
+from stock_dashboard.portfolio import Portfolio
+from stock_dashboard.portfolio_state import PortfolioState
+from stock_dashboard.price_store import get_price_store
+from stock_dashboard.risk_model import FEATURE_SCHEMA as RISK_FEATURES, RiskModel, get_risk_model, score_risk
+
+
+# -------------------- HOLDINGS --------------------
+def value_holdings(holdings: pd.DataFrame, service: Optional[MarketDataService] = None) -> Tuple[pd.DataFrame, float]:
+    """
+    Price a holdings frame the way the Dashboard does.
+
+    Args:
+        holdings (pd.DataFrame): "ticker" and "quantity" columns.
+        service (MarketDataService, optional): Source of prices. Defaults to the shared service.
+
+    Returns:
+        tuple: (valued holdings with price, currency, fx_rate and USD value; total USD value).
+    """
+    state = PortfolioState(service, max_quote_age=math.inf)
+    state.update(Portfolio(holdings["ticker"].astype(str), holdings["quantity"]))
+    return state.view(), state.total_value
+
+
+# -------------------- OVERVIEW --------------------
+def holding_volatilities(tickers: Iterable[str], period: str = "30d") -> pd.Series:
+    """Daily return standard deviation of each ticker over `period` (NaN without history)."""
+    histories = get_price_store().history_many(list(tickers), period=period)
+    return pd.Series({
+        ticker: np.std(hist["Close"].pct_change().dropna()) if not hist.empty else np.nan
+        for ticker, hist in histories.items()
+    }, dtype="float64")
+
+
+def overview_metrics(df: pd.DataFrame) -> Tuple[Dict[str, object], pd.DataFrame]:
+    """
+    The Overview tab's portfolio metrics.
+
+    Args:
+        df (pd.DataFrame): Valued holdings ("ticker", "quantity", "price", "value").
+
+    Returns:
+        tuple: (metrics dict, holdings with prev_close, daily_change_pct, volatility,
+        div_yield and sector added).
+    """
+    # Shallow copy: columns are only added, the holdings' rows stay shared
+    df = df.copy(deep=False)
+    snapshots = get_market_data_service().get_snapshots(df["ticker"].tolist())
+    df["prev_close"] = df["ticker"].map(lambda t: snapshots[t].previous_close)
+    df["daily_change_pct"] = ((df["price"] - df["prev_close"]) / df["prev_close"]) * 100
+    df["volatility"] = df["ticker"].map(holding_volatilities(df["ticker"].unique()))
+    df["div_yield"] = df["ticker"].map(lambda t: snapshots[t].dividend_yield)
+    df["sector"] = df["ticker"].map(lambda t: snapshots[t].sector)
+
+    weights = df["value"] if df["value"].sum() > 0 else None
+    metrics = {
+        "total_value": float(df["value"].sum()),
+        "holdings": len(df),
+        "top_holding": df.loc[df["value"].idxmax()]["ticker"] if not df.empty else "N/A",
+        "daily_change_pct": float(np.average(df["daily_change_pct"], weights=weights)) if not df.empty else np.nan,
+        "volatility": float(np.average(df["volatility"], weights=weights)) if not df.empty else np.nan,
+        "dividend_yield": float(np.average(df["div_yield"].fillna(0), weights=weights)) if not df.empty else np.nan,
+        "sector_count": int(df["sector"].nunique()),
+    }
+    return metrics, df
+
+
+# -------------------- PRICE CHANGE --------------------
+def price_change_metrics(df: pd.DataFrame, period: str = "30d") -> pd.DataFrame:
+    """
+    The Price Change tab's per-holding metrics.
+
+    Args:
+        df (pd.DataFrame): Valued holdings ("ticker" and "price" columns).
+        period (str): Return period of the "Selected %" column.
+
+    Returns:
+        pd.DataFrame: `df` joined with the horizon returns, "Selected %", volatility,
+        drawdown and 52-week high columns.
+    """
+    # The window covers the selected period and the 52-week high
+    panel_period = period if period in ("5y", "max") else "1y"
+    prices = get_price_store().close_panel(df["ticker"].tolist(), period=panel_period)
+    metrics = compute_price_metrics(
+        prices,
+        horizons={**DEFAULT_HORIZONS, "Selected %": period},
+        last_prices=df.drop_duplicates("ticker").set_index("ticker")["price"],
+    )
+    return df.join(metrics, on="ticker")
+
+
+# -------------------- RETURNS --------------------
+def period_returns(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Trailing 1M/6M/1Y/5Y returns and max drawdown (in %) of each column.
+
+    A horizon longer than the history is measured from the first available date.
+    """
+    returns = pd.DataFrame(index=prices.columns)
+    today = prices.index[-1]
+
+    def calc_return(days):
+        try:
+            past = prices.index[-1] - pd.Timedelta(days=days)
+            past_idx = prices.index[prices.index >= past][0]
+            return ((prices.loc[today] - prices.loc[past_idx]) / prices.loc[past_idx]) * 100
+        except Exception as e:
+            record_swallowed("period_returns", e)
+            return pd.Series(np.nan, index=prices.columns)
+
+    returns["1M"] = calc_return(30)
+    returns["6M"] = calc_return(180)
+    returns["1Y"] = calc_return(365)
+    returns["5Y"] = calc_return(1825)
+    returns["Max Drawdown %"] = (
+        prices.apply(lambda x: ((x / x.cummax()) - 1).min() * 100)
+    )
+    return returns.round(2)
+
+
+def usd_price_history(tickers: Iterable[str], start) -> pd.DataFrame:
+    """Close panel from `start`, converted to USD at each date's FX rate."""
+    prices = get_price_store().close_panel(list(tickers), start=start)
+    if prices.empty:
+        return prices
+    snapshots = get_market_data_service().get_fundamentals(prices.columns.tolist())
+    # Tickers whose currency has no USD rate are left out rather than valued as USD
+    return to_usd(prices, {t: s.currency for t, s in snapshots.items()}).dropna(axis=1, how="all")
+
+
+# -------------------- RISK --------------------
+def risk_features(tickers: Iterable[str], complete: bool = True) -> pd.DataFrame:
+    """
+    Risk-classification features for each ticker: annualized volatility, beta,
+    P/E, dividend yield (%) and price standard deviation over six months.
+
+    Tickers with any missing feature are left out, unless `complete` is False: then
+    every ticker gets a row, with NaN for what could not be computed.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    data = []
+    # Stock info comes from the shared market-data layer in one batched request
+    snapshots = get_market_data_service().get_snapshots(tickers)
+    # Six months of history for every ticker, sliced from the local price store
+    histories = get_price_store().history_many(tickers, period="6mo")
+    closes = {t: h["Close"] for t, h in histories.items() if not h.empty}
+    # Mean annualized 30-day rolling volatility for every ticker in one pass
+    volatilities = rolling_volatility(pd.concat(closes, axis=1), 30).mean() if closes else pd.Series(dtype="float64")
+    for t in tickers:
+        if t not in closes:
+            if not complete:
+                data.append({"ticker": t})
+            continue
+        info = snapshots[t]
+        data.append({
+            "ticker": t,
+            "Volatility": volatilities[t],
+            "Beta": info.beta,
+            "P/E Ratio": info.trailing_pe,
+            "Dividend Yield": info.dividend_yield * 100,
+            "Price Std Dev": closes[t].std(),
+        })
+    features = pd.DataFrame(data, columns=["ticker", *RISK_FEATURES])
+    return features.dropna() if complete else features
+
+
+def classify_risk(feature_df: pd.DataFrame, model: Optional[RiskModel] = None) -> Tuple[Dict[str, object], pd.DataFrame]:
+    """
+    Label each holding's risk and summarize the portfolio.
+
+    Args:
+        feature_df (pd.DataFrame): Output of `risk_features` (must not be empty).
+        model (RiskModel, optional): Trained model. Defaults to the registry's latest;
+            without one, the rule-based label is used as the prediction.
+
+    Returns:
+        tuple: (summary with portfolio_risk, model_version and average features;
+        features with the per-rule "Rule: ..." points, "Risk Score", "Risk" and
+        "Predicted Risk" columns added).
+    """
+    feature_df = feature_df.join(score_risk(feature_df))
+
+    # Inference only: the model is trained offline (python -m stock_dashboard.risk_model)
+    model = model or get_risk_model()
+    feature_df["Predicted Risk"] = model.predict(feature_df) if model else feature_df["Risk"]
+
+    summary = {
+        "portfolio_risk": feature_df["Predicted Risk"].value_counts().idxmax(),
+        "model_version": model.version if model else "rules",
+        "avg_volatility": float(feature_df["Volatility"].mean()),
+        "avg_beta": float(feature_df["Beta"].mean()),
+        "avg_pe": float(feature_df["P/E Ratio"].mean()),
+        "avg_dividend_yield": float(feature_df["Dividend Yield"].mean()),
+    }
+    return summary, feature_df
@@ -0,0 +1,221 @@
+"""
+25. Batch
+
+Headless batch runner for nightly portfolio analytics. Reads many portfolios from CSV
+or JSON, runs the Overview, Price Change, returns and risk-classification
+computations from the analytics core on a process pool, and writes one Parquet file
+per result table. Market data is fetched once up front for the union of all
+holdings, so the workers only read the shared cache and price store.
+
+Run with: python -m stock_dashboard.batch portfolios.csv --out results/ [--fixture DIR]
+
+Input formats:
+    CSV:  portfolio_id,ticker,quantity (one row per holding)
+    JSON: {"<portfolio_id>": [{"ticker": ..., "quantity": ...}, ...], ...}
+          or [{"portfolio_id": ..., "holdings": [...]}, ...]
+
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+from stock_dashboard.analytics import (
+    classify_risk, overview_metrics, period_returns, price_change_metrics, usd_price_history, value_holdings,
+)
+from stock_dashboard.feature_store import get_feature_store
+from stock_dashboard.fx import fx_panel
+from stock_dashboard.instrumentation import record_swallowed
+from stock_dashboard.market_data import LocalProvider, get_market_data_service
+from stock_dashboard.price_store import get_price_store, period_start
+
+TABLES = ["overview", "holdings", "returns", "risk"]
+
+
+# -------------------- INPUT --------------------
+def read_portfolios(paths: Iterable[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Read portfolios from CSV and JSON files.
+
+    Returns:
+        dict: Portfolio id -> holdings frame with "ticker" and "quantity" columns.
+    """
+    frames = []
+    for path in paths:
+        if path.lower().endswith(".json"):
+            with open(path) as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                data = [{"portfolio_id": pid, "holdings": holdings} for pid, holdings in data.items()]
+            for portfolio in data:
+                pid = portfolio.get("portfolio_id", portfolio.get("id"))
+                frame = pd.DataFrame(portfolio["holdings"], columns=["ticker", "quantity"])
+                frames.append(frame.assign(portfolio_id=str(pid)))
+        else:
+            frame = pd.read_csv(path, dtype={"portfolio_id": str, "ticker": str})
+            missing = {"portfolio_id", "ticker", "quantity"} - set(frame.columns)
+            if missing:
+                raise ValueError(f"{path}: missing columns {sorted(missing)}")
+            frames.append(frame[["portfolio_id", "ticker", "quantity"]])
+
+    holdings = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["portfolio_id", "ticker", "quantity"])
+    holdings["ticker"] = holdings["ticker"].astype(str).str.strip().str.upper()
+    holdings["quantity"] = pd.to_numeric(holdings["quantity"], errors="coerce")
+    holdings = holdings[(holdings["ticker"] != "") & (holdings["quantity"] > 0)]
+    return {pid: group[["ticker", "quantity"]].reset_index(drop=True)
+            for pid, group in holdings.groupby("portfolio_id", sort=False)}
+
+
+# -------------------- WORKERS --------------------
+def _init_worker(fixture: Optional[str]):
+    if fixture:
+        get_market_data_service().set_provider(LocalProvider.from_directory(fixture))
+
+
+def analyze_portfolio(portfolio_id: str, holdings: pd.DataFrame, period: str = "30d",
+                      returns_start=None) -> Dict[str, pd.DataFrame]:
+    """
+    Run every analysis for one portfolio.
+
+    Args:
+        portfolio_id (str): Id written to every output row.
+        holdings (pd.DataFrame): "ticker" and "quantity" columns.
+        period (str): Return period of the price-change "Selected %" column.
+        returns_start (date-like, optional): Start of the returns history. None means five years.
+
+    Returns:
+        dict: Table name -> frame (see TABLES). Failures are reported in the
+        overview row's "error" column instead of stopping the batch.
+    """
+    row = {"portfolio_id": portfolio_id, "error": None}
+    tables = {name: pd.DataFrame() for name in TABLES}
+    try:
+        df, _ = value_holdings(holdings)
+        metrics, df = overview_metrics(df)
+        row.update(metrics)
+        tables["holdings"] = price_change_metrics(df, period)
+
+        start = returns_start if returns_start is not None else pd.Timestamp.today().normalize() - pd.DateOffset(years=5)
+        prices = usd_price_history(df["ticker"].unique(), start)
+        if not prices.empty:
+            tables["returns"] = period_returns(prices).rename_axis("ticker").reset_index()
+
+        features = get_feature_store().features(df["ticker"].unique())
+        if not features.empty:
+            summary, tables["risk"] = classify_risk(features)
+            row.update(summary)
+    except Exception as e:
+        record_swallowed("analyze_portfolio", e)
+        row["error"] = f"{type(e).__name__}: {e}"
+
+    tables["overview"] = pd.DataFrame([row])
+    for name, table in tables.items():
+        tables[name] = table.assign(portfolio_id=portfolio_id) if not table.empty else table
+    return tables
+
+
+def _analyze(job: Tuple[str, pd.DataFrame, str, object]) -> Dict[str, pd.DataFrame]:
+    return analyze_portfolio(*job)
+
+
+# -------------------- DRIVER --------------------
+def warm_up(portfolios: Dict[str, pd.DataFrame], period: str, returns_start, benchmark: str = "SPY"):
+    """
+    Fetch quotes, price history, FX rates and risk features once for the union of
+    all holdings, so the workers find everything in the shared cache and stores.
+    """
+    tickers = sorted({t for holdings in portfolios.values() for t in holdings["ticker"]})
+    if not tickers:
+        return
+    today = pd.Timestamp.today().normalize()
+    starts = [pd.Timestamp(returns_start), period_start(period if period in ("5y", "max") else "1y", today)]
+    start = None if any(s is None for s in starts) else min(starts)
+    snapshots = get_market_data_service().get_snapshots(tickers)
+    get_price_store().refresh(tickers + [benchmark], start)
+    fx_panel({s.currency for s in snapshots.values()}, start=start)
+    get_feature_store().features(tickers)
+
+
+def run_batch(portfolios: Dict[str, pd.DataFrame], out_dir: str, workers: Optional[int] = None,
+              period: str = "30d", returns_start=None, fixture: Optional[str] = None) -> Dict[str, str]:
+    """
+    Analyze every portfolio on a process pool and write one Parquet file per table.
+
+    Args:
+        portfolios (dict): Portfolio id -> holdings frame.
+        out_dir (str): Output directory.
+        workers (int, optional): Worker processes. Defaults to the number of cores.
+        period (str): Return period of the price-change "Selected %" column.
+        returns_start (date-like, optional): Start of the returns history. None means five years.
+        fixture (str, optional): Offline fixture directory (see LocalProvider.from_directory).
+
+    Returns:
+        dict: Table name -> path of the written Parquet file.
+    """
+    if returns_start is None:
+        returns_start = pd.Timestamp.today().normalize() - pd.DateOffset(years=5)
+    _init_worker(fixture)
+    warm_up(portfolios, period, returns_start)
+
+    jobs = [(pid, holdings, period, returns_start) for pid, holdings in portfolios.items()]
+    results: Dict[str, List[pd.DataFrame]] = {name: [] for name in TABLES}
+    # Spawned workers open their own SQLite connections instead of inheriting the parent's
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(fixture,)) as pool:
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        for tables in pool.map(_analyze, jobs, chunksize=chunksize):
+            for name, table in tables.items():
+                if not table.empty:
+                    results[name].append(table)
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for name, tables in results.items():
+        frame = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame({"portfolio_id": []})
+        paths[name] = os.path.join(out_dir, f"{name}.parquet")
+        frame.to_parquet(paths[name], index=False)
+    return paths
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compute portfolio analytics for many portfolios.")
+    parser.add_argument("inputs", nargs="+", help="Portfolio CSV or JSON files")
+    parser.add_argument("--out", required=True, help="Directory for the Parquet results")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--period", default="30d", help="Price-change return period, e.g. 7d, 6mo, 1y, max")
+    parser.add_argument("--returns-start", default=None, help="Start date of the returns history")
+    parser.add_argument("--fixture", default=None, help="Offline data fixture directory instead of Yahoo Finance")
+    parser.add_argument("--data-dir", default=None, help="Price store directory")
+    parser.add_argument("--cache", default=None, help="Cache SQLite file")
+    args = parser.parse_args(argv)
+
+    # A fixture run gets its own stores and cache so it never mixes with live data
+    scratch = tempfile.mkdtemp(prefix="stock_dashboard_batch_") if args.fixture else None
+    if scratch:
+        os.environ["STOCK_DASHBOARD_FEATURES"] = os.path.join(scratch, "features")
+        os.environ["STOCK_DASHBOARD_SYMBOLS"] = os.path.join(scratch, "symbols.parquet")
+    data_dir = args.data_dir or (os.path.join(scratch, "prices") if scratch else None)
+    cache_path = args.cache or (os.path.join(scratch, "cache.sqlite") if scratch else None)
+    if data_dir:
+        os.environ["STOCK_DASHBOARD_DATA"] = data_dir
+    if cache_path:
+        os.environ["STOCK_DASHBOARD_CACHE"] = cache_path
+
+    portfolios = read_portfolios(args.inputs)
+    started = time.perf_counter()
+    paths = run_batch(portfolios, args.out, args.workers, args.period,
+                      pd.Timestamp(args.returns_start) if args.returns_start else None, args.fixture)
+    print(f"{len(portfolios)} portfolios in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    for name, path in paths.items():
+        print(f"{name}: {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+15. Benchmarks
+
+Offline micro-benchmarks for the computation modules. Everything runs on synthetic
+data, so the numbers are repeatable and no network is needed.
+
+Run with: python -m stock_dashboard.benchmarks
+
+"""
+import os
+import tempfile
+import time
+import warnings
+from io import BytesIO
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+from stock_dashboard.export_pipeline import export_tables, load_table, write_excel
+from stock_dashboard.indicators import compute_indicators
+from stock_dashboard.metrics import compute_price_metrics
+from stock_dashboard.report import build_pdf_report
+from stock_dashboard.risk_model import score_risk
+
+
+def synthetic_prices(n_tickers: int, n_days: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Build a random-walk closing price panel (business days x tickers).
+
+    Args:
+        n_tickers (int): Number of ticker columns.
+        n_days (int): Number of daily rows.
+        seed (int): Random seed, so runs are repeatable.
+
+    Returns:
+        pd.DataFrame: Positive prices indexed by date.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0003, 0.02, size=(n_days, n_tickers))
+    index = pd.bdate_range(end="2024-12-31", periods=n_days, name="Date")
+    columns = [f"T{i:04d}" for i in range(n_tickers)]
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=columns)
+
+
+def best_of(func: Callable, repeat: int = 5) -> float:
+    """Return the best wall time in seconds over `repeat` calls."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_price_metrics(n_tickers: int = 500, n_years: int = 10) -> float:
+    """Time the Price Change metrics engine on a full multi-year panel."""
+    prices = synthetic_prices(n_tickers, n_years * 252)
+    horizons = {"1D %": "2d", "1W %": "7d", "1M %": "30d", "6M %": "6mo",
+                "1Y %": "1y", "5Y %": "5y", "Max %": "max"}
+    return best_of(lambda: compute_price_metrics(prices, horizons))
+
+
+def legacy_indicators(close: pd.Series) -> pd.DataFrame:
+    """The export tab's original per-ticker indicator code, kept as the parity reference."""
+    hist = pd.DataFrame({"Close": close})
+    hist["SMA_50"] = hist["Close"].rolling(50).mean()
+    hist["SMA_200"] = hist["Close"].rolling(200).mean()
+    hist["Volatility"] = hist["Close"].pct_change().rolling(30).std() * np.sqrt(252)
+    hist["RSI"] = 100 - (100 / (1 + hist["Close"].pct_change().rolling(14).apply(
+        lambda x: (x[x > 0].sum() / abs(x[x < 0].sum())) if abs(x[x < 0].sum()) > 0 else 0)))
+    return hist
+
+
+def check_indicator_parity(n_tickers: int = 20, n_days: int = 252):
+    """
+    Assert the vectorized indicators match the legacy per-ticker output.
+
+    One ticker gets a shorter history and one a run of flat prices, so the
+    NaN warm-up and the no-loss RSI branch are both covered.
+    """
+    prices = synthetic_prices(n_tickers, n_days)
+    prices.iloc[:60, 1] = np.nan
+    prices.iloc[100:130, 2] = prices.iloc[100, 2]
+    indicators = compute_indicators(prices)
+    for ticker in prices.columns:
+        expected = legacy_indicators(prices[ticker].dropna())
+        for name, panel in indicators.items():
+            actual = panel[ticker].dropna().reindex(expected.index)
+            np.testing.assert_allclose(actual, expected[name], rtol=1e-7, atol=1e-9, err_msg=f"{ticker} {name}")
+
+
+def bench_indicators(n_tickers: int = 20, n_years: int = 1):
+    """Time the legacy per-ticker indicators against the vectorized panel kernels."""
+    prices = synthetic_prices(n_tickers, n_years * 252)
+    legacy = best_of(lambda: [legacy_indicators(prices[t]) for t in prices.columns], repeat=1)
+    vectorized = best_of(lambda: compute_indicators(prices))
+    return legacy, vectorized
+
+
+def legacy_label_risk(row) -> str:
+    """The risk tab's original row-wise rule, kept as the parity reference."""
+    score = 0
+    if row["Volatility"] > 0.35 or row["Beta"] > 1.2: score += 2
+    if row["P/E Ratio"] > 30: score += 1
+    if row["Dividend Yield"] < 1: score += 1
+    return "High" if score >= 3 else "Moderate" if score == 2 else "Low"
+
+
+def synthetic_features(n_tickers: int, seed: int = 42) -> pd.DataFrame:
+    """Random risk features spread around every rule threshold, with a few gaps."""
+    rng = np.random.default_rng(seed)
+    features = pd.DataFrame({
+        "Volatility": rng.uniform(0.05, 0.8, n_tickers),
+        "Beta": rng.uniform(-0.5, 2.5, n_tickers),
+        "P/E Ratio": rng.uniform(-20, 80, n_tickers),
+        "Dividend Yield": rng.uniform(0, 6, n_tickers),
+        "Price Std Dev": rng.uniform(0.5, 50, n_tickers),
+    })
+    features.iloc[::97, 1] = np.nan
+    return features
+
+
+def check_risk_parity(n_tickers: int = 2000):
+    """Assert the vectorized rule table labels every row like the legacy rule."""
+    features = synthetic_features(n_tickers)
+    expected = features.apply(legacy_label_risk, axis=1)
+    actual = score_risk(features)["Risk"]
+    mismatches = (actual != expected).sum()
+    assert mismatches == 0, f"{mismatches} risk labels differ from the legacy rule"
+
+
+def bench_risk_scoring(n_tickers: int = 10000):
+    """Time row-wise apply(label_risk) against the vectorized threshold table."""
+    features = synthetic_features(n_tickers)
+    legacy = best_of(lambda: features.apply(legacy_label_risk, axis=1), repeat=1)
+    vectorized = best_of(lambda: score_risk(features))
+    return legacy, vectorized
+
+
+def synthetic_fundamentals(tickers, seed: int = 42) -> pd.DataFrame:
+    """Random export fundamentals (see export_pipeline.FUNDAMENTAL_COLUMNS) for the tickers."""
+    rng = np.random.default_rng(seed)
+    n = len(tickers)
+    return pd.DataFrame({
+        "Ticker": list(tickers),
+        "Sector": rng.choice(["Technology", "Healthcare", "Financial Services", "Energy", "Utilities"], n),
+        "Industry": "Synthetic",
+        "Exchange": "NMS",
+        "Market Cap": rng.uniform(1e8, 3e12, n),
+        "P/E": rng.uniform(5, 60, n),
+        "Forward EPS": rng.uniform(0.5, 15, n),
+        "Dividend Yield": rng.uniform(0, 0.06, n),
+        "Beta": rng.uniform(0.2, 2.0, n),
+        "Price to Book": rng.uniform(0.5, 20, n),
+        "52W High": rng.uniform(100, 200, n),
+        "52W Low": rng.uniform(20, 100, n),
+    })
+
+
+def legacy_generate_pdf(fundamentals: pd.DataFrame) -> BytesIO:
+    """
+    The export tab's original PDF builder (NamedTemporaryFile round trip), kept as the
+    reference. Each line now returns to the left margin: with current fpdf2 the original
+    multi_cell call left the cursor at the right margin and failed on the second row.
+    """
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(200, 10, "Portfolio Summary Report", ln=True, align='C')
+    pdf.ln(10)
+
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(200, 10, "Fundamentals Overview", ln=True)
+    pdf.set_font("Arial", size=11)
+    for _, row in fundamentals.iterrows():
+        line = f"{row['Ticker']} | Sector: {row['Sector']} | P/E: {row['P/E']} | Yield: {(row['Dividend Yield'] or 0) * 100:.2f}%"
+        pdf.multi_cell(0, 8, line, new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(5)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmpfile:
+        pdf.output(tmpfile.name)
+        tmpfile.seek(0)
+        pdf_bytes = tmpfile.read()
+
+    return BytesIO(pdf_bytes)
+
+
+def timed_disk_usage(func: Callable) -> Tuple[float, int]:
+    """
+    Run `func` once with the temp directory pointed at an empty scratch directory.
+
+    Returns:
+        tuple: (wall time in seconds, bytes the call left behind in the temp directory).
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        previous, tempfile.tempdir = tempfile.tempdir, scratch
+        try:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        finally:
+            tempfile.tempdir = previous
+        left = sum(os.path.getsize(os.path.join(scratch, name)) for name in os.listdir(scratch))
+    return elapsed, left
+
+
+def bench_pdf_report(sizes=(10, 100, 1000)):
+    """
+    Time the in-memory PDF report against the legacy builder for several portfolio sizes.
+
+    Returns:
+        list: (tickers, report seconds, report bytes, report temp bytes,
+        legacy seconds, legacy temp bytes) per size.
+    """
+    results = []
+    for n_tickers in sizes:
+        prices = synthetic_prices(n_tickers, 252)
+        fundamentals = synthetic_fundamentals(prices.columns)
+        report = {}
+        elapsed, left = timed_disk_usage(lambda: report.setdefault("pdf", build_pdf_report(fundamentals, prices=prices)))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            legacy_elapsed, legacy_left = timed_disk_usage(lambda: legacy_generate_pdf(fundamentals))
+        results.append((n_tickers, elapsed, len(report["pdf"]), left, legacy_elapsed, legacy_left))
+    return results
+
+
+def synthetic_technicals(n_tickers: int, n_days: int):
+    """Yield one export-shaped technicals frame per synthetic ticker."""
+    prices = synthetic_prices(n_tickers, n_days)
+    indicators = compute_indicators(prices)
+    for ticker in prices.columns:
+        close = prices[ticker]
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6})
+        for name, panel in indicators.items():
+            frame[name] = panel[ticker]
+        frame["Ticker"] = ticker
+        yield frame.reset_index()
+
+
+def bench_export_formats(n_tickers: int = 200, n_years: int = 5):
+    """
+    Write the technicals table as xlsx, Parquet and Feather and time loading the columnar files.
+
+    Returns:
+        dict: Format -> (write seconds, file bytes, load seconds or None for xlsx).
+    """
+    n_days = n_years * 252
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        xlsx_path = os.path.join(scratch, "technicals.xlsx")
+        start = time.perf_counter()
+        write_excel(xlsx_path, {"Technicals": synthetic_technicals(n_tickers, n_days)})
+        results["xlsx"] = (time.perf_counter() - start, os.path.getsize(xlsx_path), None)
+        for fmt in ("parquet", "feather"):
+            start = time.perf_counter()
+            path = export_tables({"Technicals": synthetic_technicals(n_tickers, n_days)}, scratch, [fmt])["Technicals"][fmt]
+            elapsed = time.perf_counter() - start
+            results[fmt] = (elapsed, os.path.getsize(path), best_of(lambda: load_table(path), repeat=3))
+    return results
+
+
+def main():
+    elapsed = bench_price_metrics()
+    print(f"price metrics, 500 tickers x 10 years: {elapsed * 1000:.1f} ms")
+
+    check_indicator_parity()
+    legacy, vectorized = bench_indicators()
+    print(f"indicators, 20 tickers x 1 year: legacy {legacy * 1000:.1f} ms, "
+          f"vectorized {vectorized * 1000:.1f} ms ({legacy / vectorized:.0f}x)")
+
+    check_risk_parity()
+    legacy, vectorized = bench_risk_scoring()
+    print(f"risk scoring, 10000 tickers: legacy {legacy * 1000:.1f} ms, "
+          f"vectorized {vectorized * 1000:.1f} ms ({legacy / vectorized:.0f}x)")
+
+    for n_tickers, elapsed, size, left, legacy_elapsed, legacy_left in bench_pdf_report():
+        print(f"pdf report, {n_tickers} tickers: {elapsed:.2f} s, {size / 1024:.0f} KB, "
+              f"{left} bytes left on disk (legacy summary: {legacy_elapsed:.2f} s, {legacy_left} bytes left on disk)")
+
+    for fmt, (write, size, load) in bench_export_formats().items():
+        loaded = f", load {load * 1000:.0f} ms" if load is not None else ""
+        print(f"technicals export, 200 tickers x 5 years, {fmt}: write {write:.2f} s, {size / 2**20:.1f} MB{loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+18. Cache
+
+Two-tier cache shared by every fetch function: a bounded in-process LRU in front of a
+SQLite file that is shared between Streamlit server processes and survives restarts.
+Entries expire by data class: quotes after minutes, daily bars at the next market
+close and fundamentals (sector, currency, exchange) after days.
+
+"""
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+from stock_dashboard.instrumentation import span
+from stock_dashboard.singleflight import get_single_flight
+
+# Data classes
+QUOTES = "quotes"
+DAILY_BARS = "daily_bars"
+FUNDAMENTALS = "fundamentals"
+
+DEFAULT_TTLS = {
+    QUOTES: 5 * 60,
+    FUNDAMENTALS: 3 * 24 * 3600,
+}
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".stock_dashboard", "cache.sqlite")
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+
+def seconds_until_next_close(now: Optional[datetime] = None, close_hour: int = 16, settle_minutes: int = 30) -> float:
+    """
+    Seconds until the next US market close (plus time for the final bar to settle).
+
+    Weekends are skipped; exchange holidays are not, which only means one extra
+    refresh on those days.
+    """
+    now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+    close = now.replace(hour=close_hour, minute=0, second=0, microsecond=0) + timedelta(minutes=settle_minutes)
+    if now >= close:
+        close += timedelta(days=1)
+    while close.weekday() >= 5:
+        close += timedelta(days=1)
+    return (close - now).total_seconds()
+
+
+class TwoTierCache:
+    """
+    In-process LRU backed by an optional SQLite store.
+
+    Values are stored pickled in both tiers, so every hit returns a private copy
+    that callers may modify freely (the same contract as st.cache_data).
+
+    Args:
+        path (str, optional): SQLite file for the shared tier. None keeps the cache in memory only.
+        max_entries (int): Capacity of the in-process LRU.
+        ttls (dict, optional): Seconds to live by data class, overriding DEFAULT_TTLS.
+            DAILY_BARS entries always live until the next market close.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 2048, ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "data_class TEXT, key TEXT, expires REAL, value BLOB, PRIMARY KEY (data_class, key))"
+            )
+            self._db.commit()
+
+    # -------------------- INTERNALS --------------------
+    def ttl(self, data_class: str) -> float:
+        if data_class == DAILY_BARS:
+            return seconds_until_next_close()
+        return self.ttls[data_class]
+
+    def _count(self, data_class: str, counter: str, n: int = 1):
+        counters = self._counters.setdefault(data_class, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        counters[counter] += n
+
+    def _remember(self, data_class: str, key: str, expires: float, blob: bytes):
+        self._memory[(data_class, key)] = (expires, blob)
+        self._memory.move_to_end((data_class, key))
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    # -------------------- API --------------------
+    def get_many(self, data_class: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several keys of one data class.
+
+        Returns:
+            dict: Key -> value for the keys that were found and not expired.
+        """
+        now = time.time()
+        found, missing = {}, []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._memory.get((data_class, key))
+                if entry and entry[0] > now:
+                    self._memory.move_to_end((data_class, key))
+                    found[key] = entry[1]
+                    self._count(data_class, "memory_hits")
+                else:
+                    missing.append(key)
+
+            if missing and self._db is not None:
+                for start in range(0, len(missing), 500):
+                    chunk = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, expires, value FROM entries WHERE data_class = ? AND expires > ? "
+                        f"AND key IN ({','.join('?' * len(chunk))})",
+                        [data_class, now, *chunk],
+                    ).fetchall()
+                    for key, expires, blob in rows:
+                        self._remember(data_class, key, expires, blob)
+                        found[key] = blob
+                self._count(data_class, "disk_hits", sum(1 for k in missing if k in found))
+            self._count(data_class, "misses", sum(1 for k in missing if k not in found))
+        return {key: pickle.loads(blob) for key, blob in found.items()}
+
+    def get(self, data_class: str, key: str) -> Tuple[bool, Any]:
+        """
+        Look up one key.
+
+        Returns:
+            tuple: (found, value). `value` is None when not found.
+        """
+        found = self.get_many(data_class, [key])
+        return (True, found[key]) if key in found else (False, None)
+
+    def set_many(self, data_class: str, items: Dict[str, Any], ttl: Optional[float] = None):
+        """Store several values of one data class (ttl defaults to the data class TTL)."""
+        if not items:
+            return
+        expires = time.time() + (self.ttl(data_class) if ttl is None else ttl)
+        blobs = {key: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for key, value in items.items()}
+        with self._lock:
+            for key, blob in blobs.items():
+                self._remember(data_class, key, expires, blob)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (data_class, key, expires, value) VALUES (?, ?, ?, ?)",
+                    [(data_class, key, expires, sqlite3.Binary(blob)) for key, blob in blobs.items()],
+                )
+                self._db.commit()
+
+    def set(self, data_class: str, key: str, value: Any, ttl: Optional[float] = None):
+        """Store one value."""
+        self.set_many(data_class, {key: value}, ttl)
+
+    def delete(self, data_class: str, keys: Iterable[str]):
+        """Drop keys from both tiers."""
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                self._memory.pop((data_class, key), None)
+            if self._db is not None:
+                self._db.executemany("DELETE FROM entries WHERE data_class = ? AND key = ?",
+                                     [(data_class, key) for key in keys])
+                self._db.commit()
+
+    def clear(self, data_class: Optional[str] = None):
+        """Drop every entry (of one data class, or of all of them) from both tiers."""
+        with self._lock:
+            for entry in [k for k in self._memory if data_class is None or k[0] == data_class]:
+                del self._memory[entry]
+            if self._db is not None:
+                if data_class is None:
+                    self._db.execute("DELETE FROM entries")
+                else:
+                    self._db.execute("DELETE FROM entries WHERE data_class = ?", (data_class,))
+                self._db.commit()
+
+    def prune(self):
+        """Delete expired rows from the SQLite tier."""
+        if self._db is not None:
+            with self._lock:
+                self._db.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Hit/miss counters by data class.
+
+        Returns:
+            dict: Data class -> memory_hits, disk_hits, misses and hit_ratio.
+        """
+        with self._lock:
+            stats = {}
+            for data_class, counters in self._counters.items():
+                lookups = sum(counters.values())
+                hits = counters["memory_hits"] + counters["disk_hits"]
+                stats[data_class] = {**counters, "hit_ratio": hits / lookups if lookups else 0.0}
+            return stats
+
+
+_cache: Optional[TwoTierCache] = None
+
+
+def get_cache() -> TwoTierCache:
+    """Return the process-wide cache (SQLite file at $STOCK_DASHBOARD_CACHE or ~/.stock_dashboard)."""
+    global _cache
+    if _cache is None:
+        _cache = TwoTierCache(os.environ.get("STOCK_DASHBOARD_CACHE", DEFAULT_PATH))
+    return _cache
+
+
+# -------------------- DECORATOR --------------------
+def _freeze(value: Any) -> Any:
+    """Turn an argument into a value with a stable repr for cache keys."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        raise TypeError("Cached functions cannot take DataFrame or Series arguments")
+    if isinstance(value, dict):
+        return tuple(sorted((repr(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(_freeze(v)) for v in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.empty
+    if isinstance(value, (dict, list, tuple)):
+        return len(value) == 0
+    return False
+
+
+def cached(data_class: str) -> Callable:
+    """
+    Cache a fetch function's results in the shared two-tier cache.
+
+    The key is the function's qualified name plus its arguments, so it is the
+    same on every Streamlit rerun and in every server process. Concurrent misses
+    for the same key share one call. Empty results (None, empty frames, empty
+    containers) are not cached, so a failed fetch is retried on the next call.
+    Every call (hit or miss) is timed under the function's name.
+
+    Args:
+        data_class (str): QUOTES, DAILY_BARS or FUNDAMENTALS; decides the TTL.
+    """
+    def decorator(func):
+        prefix = f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(func.__qualname__, kind="fetch"):
+                return lookup(*args, **kwargs)
+
+        def lookup(*args, **kwargs):
+            arguments = repr((_freeze(args), _freeze(kwargs)))
+            key = f"{prefix}:{hashlib.sha1(arguments.encode()).hexdigest()}"
+            cache = get_cache()
+            found, value = cache.get(data_class, key)
+            if found:
+                return value
+
+            def work():
+                value = func(*args, **kwargs)
+                if not _is_empty(value):
+                    cache.set(data_class, key, value)
+                return value
+
+            value = get_single_flight().do((data_class, key), work)
+            # Sessions that shared the flight each get their own copy (without a second,
+            # counted cache lookup, which would report every miss as a memory hit too)
+            return pickle.loads(pickle.dumps(value)) if not _is_empty(value) else value
+
+        return wrapper
+    return decorator
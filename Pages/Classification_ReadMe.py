@@ -5,12 +5,20 @@
 
 import streamlit as st
 import pandas as pd
-import numpy as np
-import yfinance as yf
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
 import plotly.express as px
+from stock_dashboard.analytics import classify_risk
+from stock_dashboard.feature_store import get_feature_store
+from stock_dashboard.instrumentation import timed
+from stock_dashboard.tab_registry import requires
 
+# === Fetch Stock Features ===
+@timed(kind="fetch")
+def fetch_features(tickers):
+    # Looked up in the daily feature store; only tickers nobody requested today are computed
+    return get_feature_store().features(tickers)
+
+
+@requires("holdings")
 def render_risk_classification_tab(df):
     # === Dark Theme and Full White Styling ===
     st.markdown("""
@@ -67,37 +75,6 @@ def render_risk_classification_tab(df):
     # User selection for desired risk level
     desired_risk = st.radio("Select your desired risk level:", options=["Low", "Moderate", "High"], horizontal=True)
 
-    # === Fetch Stock Features ===
-    @st.cache_data
-    def fetch_features(tickers):
-        data = []
-        for t in tickers:
-            try:
-                # Fetch stock info and historical data
-                ticker = yf.Ticker(t)
-                info = ticker.info
-                hist = ticker.history(period="6mo", auto_adjust=True)
-                
-                # Calculate key metrics
-                volatility = hist["Close"].pct_change().rolling(30).std().mean() * np.sqrt(252)  # Annualized volatility
-                beta = info.get("beta", np.nan)  # Beta of the stock
-                pe = info.get("trailingPE", np.nan)  # P/E Ratio
-                dividend = (info.get("dividendYield") or 0) * 100  # Dividend yield as percentage
-                stddev = hist["Close"].std()  # Standard deviation of the stock price
-                
-                # Append stock data to list
-                data.append({
-                    "ticker": t,
-                    "Volatility": volatility,
-                    "Beta": beta,
-                    "P/E Ratio": pe,
-                    "Dividend Yield": dividend,
-                    "Price Std Dev": stddev
-                })
-            except:
-                continue
-        return pd.DataFrame(data).dropna()
-
     # Fetch the financial data for the tickers
     feature_df = fetch_features(tickers)
 
@@ -107,40 +84,13 @@ def render_risk_classification_tab(df):
         return None, None
 
     # === Risk Classification Logic ===
-    # Assign risk levels based on key metrics
-    def label_risk(row):
-        score = 0
-        if row["Volatility"] > 0.35 or row["Beta"] > 1.2: score += 2  # High volatility or high beta increases risk
-        if row["P/E Ratio"] > 30: score += 1  # High P/E Ratio increases risk
-        if row["Dividend Yield"] < 1: score += 1  # Low dividend yield increases risk
-        # Classify based on score
-        return "High" if score >= 3 else "Moderate" if score == 2 else "Low"
-
-    # Apply the risk classification
-    feature_df["Risk"] = feature_df.apply(label_risk, axis=1)
-
-    # === Train a Random Forest Classifier ===
-    # Prepare data for model training
-    X = feature_df[["Volatility", "Beta", "P/E Ratio", "Dividend Yield", "Price Std Dev"]]
-    y = feature_df["Risk"]
-    le = LabelEncoder()
-    y_encoded = le.fit_transform(y)  # Encode the target labels
-
-    # Train the Random Forest model
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(X, y_encoded)
-
-    # Predict the risk classification for each stock
-    feature_df["Predicted Risk"] = le.inverse_transform(model.predict(X))
-
-    # Get the most common predicted risk level
-    portfolio_risk = feature_df["Predicted Risk"].value_counts().idxmax()
-
-    # Calculate average metrics for the portfolio
-    avg_vol = feature_df["Volatility"].mean()
-    avg_beta = feature_df["Beta"].mean()
-    avg_pe = feature_df["P/E Ratio"].mean()
-    avg_yield = feature_df["Dividend Yield"].mean()
+    # Rule-based labels, the registry model's predictions (the rule label without a model) and the portfolio averages
+    summary, feature_df = classify_risk(feature_df)
+    portfolio_risk = summary["portfolio_risk"]
+    avg_vol = summary["avg_volatility"]
+    avg_beta = summary["avg_beta"]
+    avg_pe = summary["avg_pe"]
+    avg_yield = summary["avg_dividend_yield"]
 
     # === Display Risk Summary ===
     st.markdown("### Portfolio Risk Summary")
@@ -148,6 +98,7 @@ def render_risk_classification_tab(df):
 
     with left:
         st.metric("Predicted Risk", portfolio_risk)
+        st.caption(f"Risk model: {summary['model_version']}")
         st.markdown(f"**Average Volatility:** {avg_vol:.2f}")
         st.markdown(f"**Average Beta:** {avg_beta:.2f}")
         st.markdown(f"**Average P/E Ratio:** {avg_pe:.2f}")
@@ -172,6 +123,19 @@ def render_risk_classification_tab(df):
         )
         st.plotly_chart(fig_risk_dist, use_container_width=True)
 
+    # === Risk Drift ===
+    risk_history = get_feature_store().risk_history(tickers)
+    if len(risk_history) > 1:
+        st.markdown("### Risk Score Over Time")
+        fig_drift = px.line(risk_history, x="date", y="Risk Score", title="Average Holding Risk Score")
+        fig_drift.update_layout(
+            paper_bgcolor="#1E1E2F",
+            plot_bgcolor="#1E1E2F",
+            font_color="white",
+            title_font_color="white",
+        )
+        st.plotly_chart(fig_drift, use_container_width=True)
+
     # === Risk Guidance ===
     if desired_risk != portfolio_risk:
         st.warning(f"Your portfolio risk does not match your selected target of '{desired_risk}'.")
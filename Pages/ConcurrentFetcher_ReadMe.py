@@ -0,0 +1,110 @@
+"""
+17. ConcurrentFetcher
+
+Hydrates a whole portfolio concurrently. Every ticker is fetched on a bounded pool of
+worker threads with a per-request timeout and jittered exponential backoff, and
+failures are reported per ticker instead of being swallowed, so wall-clock time is
+close to the slowest single request rather than the sum of all of them.
+
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+@dataclass
+class FetchFailure:
+    """Why a ticker could not be fetched."""
+    ticker: str
+    error: str
+    attempts: int
+
+
+@dataclass
+class HydrationResult:
+    """Outcome of a concurrent fetch: successful results and per-ticker failures."""
+    results: Dict[str, Any] = field(default_factory=dict)
+    failures: Dict[str, FetchFailure] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rng: random.Random) -> float:
+    """
+    Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)].
+    """
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+async def hydrate_async(tickers: Iterable[str], fetch_one: Callable[[str], Any], max_concurrency: int = 8,
+                        timeout: float = 10.0, retries: int = 2, backoff: float = 0.5,
+                        max_backoff: float = 8.0, seed: Optional[int] = None) -> HydrationResult:
+    """
+    Fetch every ticker concurrently. See `hydrate` for the arguments.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    result = HydrationResult()
+    if not tickers:
+        return result
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def fetch(ticker):
+        error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt - 1, backoff, max_backoff, rng))
+            async with semaphore:
+                try:
+                    call = loop.run_in_executor(executor, fetch_one, ticker)
+                    result.results[ticker] = await asyncio.wait_for(call, timeout)
+                    return
+                except asyncio.TimeoutError:
+                    error = f"timed out after {timeout:g}s"
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+        result.failures[ticker] = FetchFailure(ticker, error, retries + 1)
+
+    try:
+        await asyncio.gather(*(fetch(t) for t in tickers))
+    finally:
+        # Don't wait for calls that timed out; their threads finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def hydrate(tickers: Iterable[str], fetch_one: Callable[[str], Any], max_concurrency: int = 8,
+            timeout: float = 10.0, retries: int = 2, backoff: float = 0.5,
+            max_backoff: float = 8.0, seed: Optional[int] = None) -> HydrationResult:
+    """
+    Fetch data for every ticker concurrently.
+
+    Args:
+        tickers (iterable): Ticker symbols (duplicates are fetched once).
+        fetch_one (callable): Blocking function fetching one ticker; raise to signal failure.
+        max_concurrency (int): Maximum number of requests in flight.
+        timeout (float): Seconds allowed per request attempt.
+        retries (int): Extra attempts after the first failure.
+        backoff (float): Base delay in seconds for the exponential backoff.
+        max_backoff (float): Upper bound for a single backoff delay.
+        seed (int, optional): Seed for the backoff jitter, for repeatable runs.
+
+    Returns:
+        HydrationResult: Results by ticker, failures by ticker and the elapsed time.
+    """
+    coroutine = hydrate_async(tickers, fetch_one, max_concurrency, timeout, retries, backoff, max_backoff, seed)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Already inside an event loop (e.g. a notebook): run on a helper thread
+    with ThreadPoolExecutor(max_workers=1) as runner:
+        return runner.submit(asyncio.run, coroutine).result()
@@ -6,7 +6,6 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import yfinance as yf
 import sys
 import os
 
@@ -17,6 +16,10 @@ from stock_dashboard.price_change_tab import render_price_change_tab
 from stock_dashboard.value_over_time_tab import render_value_over_time_tab
 from stock_dashboard.summary_tab import render_summary_tab
 from stock_dashboard.export_tab import render_export_tab
+from stock_dashboard.instrumentation import get_metrics, serve_metrics
+from stock_dashboard.portfolio import Portfolio
+from stock_dashboard.portfolio_state import PortfolioState
+from stock_dashboard.tab_registry import DatasetResolver, render_tab, requires
 
 # -------------------- PAGE CONFIG --------------------
 st.set_page_config(page_title="Portfolio Dashboard", layout="wide")
@@ -102,62 +105,124 @@ h3 {
 """, unsafe_allow_html=True)
 
 # -------------------- SHARED DATA PREPARATION --------------------
-# Initialize portfolio
-portfolio = st.session_state.get("portfolio", [])
-if not portfolio:
+# Initialize portfolio (an array-backed Portfolio kept in the session by the HomePage)
+portfolio = st.session_state.get("portfolio")
+if portfolio is not None and not isinstance(portfolio, Portfolio):
+    # Sessions started before the Portfolio type hold a list of {"ticker", "quantity"} dicts
+    portfolio = st.session_state.portfolio = Portfolio.from_records(portfolio)
+if portfolio is None or len(portfolio) == 0:
     st.warning("No portfolio found. Using sample data.")
-    portfolio = [
-        {"ticker": "AAPL", "quantity": 10}, {"ticker": "MSFT", "quantity": 5},
-        {"ticker": "TSLA", "quantity": 3}, {"ticker": "AMZN", "quantity": 8},
-        {"ticker": "GOOGL", "quantity": 6}, {"ticker": "NESN.SW", "quantity": 12},
-        {"ticker": "ASML.AS", "quantity": 4}, {"ticker": "MC.PA", "quantity": 2},
-        {"ticker": "SIE.DE", "quantity": 7}, {"ticker": "ULVR.L", "quantity": 9},
-        {"ticker": "7203.T", "quantity": 15}, {"ticker": "005930.KS", "quantity": 1},
-        {"ticker": "9988.HK", "quantity": 10}, {"ticker": "TCS.NS", "quantity": 5},
-        {"ticker": "0700.HK", "quantity": 8}
-    ]
-
-# Create portfolio DataFrame
-df = pd.DataFrame(portfolio)
-df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
-df.dropna(subset=["quantity"], inplace=True)
-
-# Fetch prices and calculate values
-@st.cache_data(show_spinner=True)
-def fetch_price(ticker):
-    try:
-        stock_info = yf.Ticker(ticker).info
-        return stock_info.get("regularMarketPrice", 0)
-    except:
-        return 0
-
-df["price"] = df["ticker"].apply(fetch_price)
-df["value"] = df["price"] * df["quantity"]
-df = df[df["price"] > 0]
-total_value = df["value"].sum()
-
-# Generate charts
-fig_alloc = px.pie(df, values="value", names="ticker", title="Portfolio Allocation")
-fig_region = None  # Placeholder for regional diversification chart (if applicable)
+    if "sample_portfolio" not in st.session_state:
+        st.session_state.sample_portfolio = Portfolio.from_records([
+            {"ticker": "AAPL", "quantity": 10}, {"ticker": "MSFT", "quantity": 5},
+            {"ticker": "TSLA", "quantity": 3}, {"ticker": "AMZN", "quantity": 8},
+            {"ticker": "GOOGL", "quantity": 6}, {"ticker": "NESN.SW", "quantity": 12},
+            {"ticker": "ASML.AS", "quantity": 4}, {"ticker": "MC.PA", "quantity": 2},
+            {"ticker": "SIE.DE", "quantity": 7}, {"ticker": "ULVR.L", "quantity": 9},
+            {"ticker": "7203.T", "quantity": 15}, {"ticker": "005930.KS", "quantity": 1},
+            {"ticker": "9988.HK", "quantity": 10}, {"ticker": "TCS.NS", "quantity": 5},
+            {"ticker": "0700.HK", "quantity": 8}
+        ])
+    portfolio = st.session_state.sample_portfolio
+
+# Datasets are built lazily: only what the selected tab declares (via @requires) is computed
+datasets = DatasetResolver()
+
+@datasets.register("holdings")
+def build_holdings(_):
+    # Tickers and quantities only; no prices are fetched for this
+    return portfolio.frame()
+
+@datasets.register("portfolio_state")
+def build_portfolio_state(_):
+    # Value the portfolio incrementally: the state survives reruns and only prices
+    # added tickers; unchanged holdings cost a version check (everything is repriced once quotes expire)
+    if "portfolio_state" not in st.session_state:
+        st.session_state.portfolio_state = PortfolioState()
+    state = st.session_state.portfolio_state
+    state.update(portfolio)
+
+    # Report tickers that could not be loaded instead of silently dropping them
+    if state.failed:
+        st.warning("Could not load market data for: " + ", ".join(state.failed))
+    return state
+
+@datasets.register("valued_holdings")
+def build_valued_holdings(resolved):
+    # Tabs only add their own columns, so they share the state's rows instead of copying them
+    return resolved["portfolio_state"].view()
+
+@datasets.register("total_value")
+def build_total_value(resolved):
+    return resolved["portfolio_state"].total_value
+
+@datasets.register("fig_alloc")
+def build_fig_alloc(resolved):
+    # Rebuilt only when the holdings change
+    return resolved["portfolio_state"].figure(
+        "allocation", lambda frame: px.pie(frame, values="value", names="ticker", title="Portfolio Allocation"))
+
+@datasets.register("fig_region")
+def build_fig_region(_):
+    return None  # Placeholder for regional diversification chart (if applicable)
 
 # -------------------- VIEW OPTIONS --------------------
 st.sidebar.markdown('<div class="view-options-header">View Options</div>', unsafe_allow_html=True)
 
+# Each tab's render function declares its datasets; summary_tab predates @requires
+TABS = {
+    "Overview": render_overview_tab,
+    "Price Change": render_price_change_tab,
+    "Value Over Time": render_value_over_time_tab,
+    "Summary": requires("valued_holdings")(render_summary_tab),
+    "Export": render_export_tab,
+}
+
 # Use radio buttons for vertical navigation
 selected_tab = st.sidebar.radio(
     label="",
-    options=["Overview", "Price Change", "Value Over Time", "Summary", "Export"],
+    options=list(TABS),
     index=0
 )
 
 # -------------------- RENDER SELECTED TAB --------------------
-if selected_tab == "Overview":
-    render_overview_tab(df, fig_alloc, fig_region, total_value)
-elif selected_tab == "Price Change":
-    render_price_change_tab(df)
-elif selected_tab == "Value Over Time":
-    render_value_over_time_tab(df)
-elif selected_tab == "Summary":
-    render_summary_tab(df)
-elif selected_tab == "Export":
-    render_export_tab(df, fig_alloc, fig_region, total_value)
+render_tab(TABS[selected_tab], datasets)
+
+# -------------------- INSTRUMENTATION --------------------
+# /metrics and /metrics.json on localhost, only when $STOCK_DASHBOARD_METRICS_PORT is set
+serve_metrics()
+
+def render_debug_panel():
+    # Process-wide numbers: every session and rerun since the server started
+    snapshot = get_metrics().snapshot()
+    with st.expander("Performance debug panel", expanded=True):
+        latency = pd.DataFrame([
+            {
+                "kind": s["labels"].get("kind"),
+                "name": s["labels"].get("name"),
+                "calls": s["count"],
+                "total ms": s["sum"] * 1000,
+                "mean ms": s["sum"] / s["count"] * 1000 if s["count"] else 0.0,
+                "p95 ms (bucket)": s["p95"] * 1000,
+            }
+            for s in snapshot["histograms"].get("latency_seconds", [])
+        ])
+        st.markdown("**Latency by tab, dataset and fetch**")
+        if not latency.empty:
+            st.dataframe(latency.sort_values("total ms", ascending=False), hide_index=True)
+
+        counters = pd.DataFrame([
+            {"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in s["labels"].items()), "value": s["value"]}
+            for name, series in snapshot["counters"].items() if name != "calls_total"
+            for s in series
+        ])
+        st.markdown("**Upstream calls, cache and swallowed exceptions**")
+        if not counters.empty:
+            st.dataframe(counters, hide_index=True)
+
+        col1, col2 = st.columns(2)
+        col1.download_button("Prometheus text", get_metrics().to_prometheus(), file_name="metrics.txt")
+        col2.download_button("JSON", get_metrics().to_json(), file_name="metrics.json")
+
+if st.sidebar.checkbox("Show performance debug panel", value=False):
+    render_debug_panel()
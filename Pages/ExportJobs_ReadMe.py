@@ -0,0 +1,308 @@
+"""
+30. ExportJobs
+
+Background export jobs. The Excel + PDF + ZIP bundle is built by a small pool of
+worker threads instead of inside the Streamlit script run, and the finished bundle
+is stored on disk under a hash of (holdings, data date). Asking for the same
+portfolio again on the same trading day returns the stored file at once, and a
+portfolio that is already being built is joined instead of queued twice.
+
+Each job reports its status and progress, so the Export tab only polls and shows a
+download button when the bundle is ready.
+
+Headless exports: python -m stock_dashboard.export_jobs portfolios.csv --out DIR
+    [--format zip parquet feather] [--fixture DIR]
+
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+from stock_dashboard.analytics import value_holdings
+from stock_dashboard.export_pipeline import (
+    COLUMNAR_FORMATS, build_export_zip, export_tables, fundamentals_frame, iter_technicals,
+)
+from stock_dashboard.feature_store import last_close_date
+from stock_dashboard.report import build_pdf_report
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".stock_dashboard", "exports")
+
+# Bump when the bundle layout changes, so stored artifacts are rebuilt
+BUNDLE_VERSION = 2
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class NoExportData(ValueError):
+    """None of the holdings had market data to export."""
+
+
+def export_key(holdings: pd.DataFrame, data_date: Optional[pd.Timestamp] = None) -> str:
+    """
+    Content address of an export bundle.
+
+    Only the (ticker, quantity) rows, sorted, are hashed: the prices in the bundle are
+    those of `data_date`, so a quote refresh during the day keeps the same key.
+
+    Args:
+        holdings (pd.DataFrame): Portfolio rows with "ticker" and "quantity" columns.
+        data_date (date-like, optional): Trading day of the market data. Defaults to the last close.
+
+    Returns:
+        str: Hex SHA-256 of the holdings, the data date and BUNDLE_VERSION.
+    """
+    data_date = pd.Timestamp(data_date if data_date is not None else last_close_date())
+    rows = holdings[["ticker", "quantity"]].sort_values(["ticker", "quantity"])
+    digest = hashlib.sha256()
+    digest.update(f"v{BUNDLE_VERSION}|{data_date:%Y-%m-%d}|".encode())
+    digest.update(rows.to_csv(index=False).encode())
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Finished export bundles, one "<key>.zip" file each.
+
+    Args:
+        root (str, optional): Directory. Defaults to $STOCK_DASHBOARD_EXPORTS or ~/.stock_dashboard/exports.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.environ.get("STOCK_DASHBOARD_EXPORTS", DEFAULT_ROOT)
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.zip")
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def write(self, key: str, build: Callable[[object], None]):
+        """Run `build(file)` on a temp file and move it into place once it succeeded."""
+        tmp_path = f"{self.path(key)}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w+b") as f:
+                build(f)
+            os.replace(tmp_path, self.path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def prune(self, max_age_days: float = 7):
+        """Delete bundles (and abandoned temp files) older than `max_age_days`."""
+        cutoff = time.time() - max_age_days * 24 * 3600
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+@dataclass
+class ExportJob:
+    """Status of one export bundle."""
+    key: str
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = "Waiting for a worker"
+    path: Optional[str] = None
+    error: Optional[str] = None
+    rows: Dict[str, int] = field(default_factory=dict)
+    submitted: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def report(self, progress: float, message: str):
+        self.progress = min(max(progress, 0.0), 1.0)
+        self.message = message
+
+
+def build_bundle(holdings: pd.DataFrame, archive, job: Optional[ExportJob] = None) -> Dict[str, int]:
+    """
+    Write the export ZIP of a portfolio to `archive`: the workbook, the PDF report and
+    every table as Parquet and Feather under "data/".
+
+    Args:
+        holdings (pd.DataFrame): Portfolio rows with "ticker" and "quantity" columns; the
+            "Original Input" sheet has them valued (price, currency, fx_rate, value).
+        archive: Seekable binary file.
+        job (ExportJob, optional): Receives progress updates.
+
+    Returns:
+        dict: Sheet name -> data rows written.
+
+    Raises:
+        NoExportData: If none of the tickers has fundamentals or price history.
+    """
+    report = job.report if job else (lambda progress, message: None)
+    tickers = holdings["ticker"].dropna().unique().tolist()
+    report(0.01, "Valuing holdings")
+    valued, _ = value_holdings(holdings)
+    report(0.02, "Loading fundamentals")
+    fundamentals = fundamentals_frame(tickers)
+    if fundamentals.empty:
+        raise NoExportData("No valid financial data could be retrieved. Please check your ticker symbols.")
+
+    def technicals():
+        for i, frame in enumerate(iter_technicals(tickers), 1):
+            report(0.05 + 0.75 * i / len(tickers), f"Writing technicals ({i}/{len(tickers)} tickers)")
+            yield frame
+
+    def pdf():
+        report(0.8, "Rendering PDF report")
+        return build_pdf_report(fundamentals, holdings)
+
+    _, rows = build_export_zip(
+        {"Fundamentals": fundamentals, "Technicals": technicals(), "Original Input": valued},
+        extra_files={"portfolio_summary.pdf": pdf},
+        archive=archive,
+    )
+    if rows["Technicals"] == 0:
+        raise NoExportData("No valid financial data could be retrieved. Please check your ticker symbols.")
+    return rows
+
+
+def export_portfolio_tables(holdings: pd.DataFrame, out_dir: str,
+                            formats=tuple(COLUMNAR_FORMATS)) -> Dict[str, Dict[str, str]]:
+    """
+    Write a portfolio's export tables as columnar files only (no workbook or PDF).
+
+    Returns:
+        dict: Table name -> format -> path (see export_pipeline.export_tables).
+    """
+    tickers = holdings["ticker"].dropna().unique().tolist()
+    return export_tables({
+        "Fundamentals": fundamentals_frame(tickers),
+        "Technicals": iter_technicals(tickers),
+        "Original Input": value_holdings(holdings)[0],
+    }, out_dir, formats)
+
+
+class ExportQueue:
+    """
+    Builds export bundles on background worker threads.
+
+    Args:
+        workers (int): Bundles built at the same time.
+        store (ArtifactStore, optional): Where finished bundles go.
+    """
+
+    def __init__(self, workers: int = 2, store: Optional[ArtifactStore] = None):
+        self.store = store or ArtifactStore()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ExportJob] = {}
+
+    def status(self, key: str) -> Optional[ExportJob]:
+        """The job for a key: in flight, finished in this process, or found in the store."""
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None and (job.active or job.status == FAILED or self.store.exists(key)):
+            return job
+        if self.store.exists(key):
+            return ExportJob(key, DONE, 1.0, "Ready", path=self.store.path(key))
+        return None
+
+    def submit(self, holdings: pd.DataFrame, key: Optional[str] = None) -> ExportJob:
+        """
+        Queue a bundle build unless it is stored or already in flight.
+
+        Args:
+            holdings (pd.DataFrame): Portfolio rows with "ticker" and "quantity" columns.
+            key (str, optional): `export_key(holdings)` if already computed.
+
+        Returns:
+            ExportJob: The (possibly shared or already finished) job.
+        """
+        key = key or export_key(holdings)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.active:
+                return job
+            if self.store.exists(key):
+                job = ExportJob(key, DONE, 1.0, "Ready", path=self.store.path(key))
+                self._jobs[key] = job
+                return job
+            job = ExportJob(key)
+            self._jobs[key] = job
+        self._pool.submit(self._run, job, holdings.copy())
+        return job
+
+    def _run(self, job: ExportJob, holdings: pd.DataFrame):
+        job.status = RUNNING
+        job.report(0.0, "Starting")
+        try:
+            self.store.write(job.key, lambda f: job.rows.update(build_bundle(holdings, f, job)))
+            job.path = self.store.path(job.key)
+            job.status = DONE
+            job.report(1.0, "Ready")
+        except NoExportData as e:
+            job.error = str(e)
+            job.status = FAILED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+            logger.exception("Export %s failed", job.key)
+        finally:
+            job.finished = time.time()
+        self.store.prune()
+
+
+_queue: Optional[ExportQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_export_queue() -> ExportQueue:
+    """Return the process-wide export queue shared by all sessions."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ExportQueue()
+        return _queue
+
+
+def main(argv: Optional[List[str]] = None):
+    from stock_dashboard.batch import read_portfolios
+    from stock_dashboard.market_data import LocalProvider, get_market_data_service
+
+    parser = argparse.ArgumentParser(description="Export portfolios without the dashboard.")
+    parser.add_argument("inputs", nargs="+", help="Portfolio CSV or JSON files (see stock_dashboard.batch)")
+    parser.add_argument("--out", required=True, help="Output directory")
+    parser.add_argument("--format", nargs="+", default=["zip"], choices=["zip", *COLUMNAR_FORMATS],
+                        help="zip: the full bundle; parquet/feather: columnar tables only")
+    parser.add_argument("--fixture", default=None, help="Offline data fixture directory instead of Yahoo Finance")
+    args = parser.parse_args(argv)
+
+    if args.fixture:
+        get_market_data_service().set_provider(LocalProvider.from_directory(args.fixture))
+    os.makedirs(args.out, exist_ok=True)
+    columnar = [fmt for fmt in args.format if fmt in COLUMNAR_FORMATS]
+    for pid, holdings in read_portfolios(args.inputs).items():
+        if "zip" in args.format:
+            with open(os.path.join(args.out, f"{pid}.zip"), "wb") as f:
+                build_bundle(holdings, f)
+        if columnar:
+            export_portfolio_tables(holdings, os.path.join(args.out, pid), columnar)
+        print(f"{pid}: exported", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
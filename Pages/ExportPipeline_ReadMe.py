@@ -0,0 +1,380 @@
+"""
+28. ExportPipeline
+
+Streaming portfolio export. Technical rows are produced one ticker at a time by a
+generator and written row by row with xlsxwriter's constant_memory mode, so only the
+current row of a worksheet is held in memory. The workbook is streamed straight into
+its ZIP entry, and the ZIP goes to a spooled temporary file that moves to disk once
+it outgrows `SPOOL_MAX_BYTES`. Peak memory is bounded by one chunk of tickers
+instead of growing with the portfolio.
+
+Every table is also written in columnar form for downstream pipelines: Parquet
+(zstd) and Arrow IPC / Feather v2. Each frame is converted to an Arrow record batch
+once and the same batch feeds both writers, so the columnar files cost one
+conversion per frame. They have no row limit, and the uncompressed Feather files
+can be memory-mapped, so `load_table` opens even multi-year, many-ticker exports
+in milliseconds.
+
+"""
+import math
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+from stock_dashboard.indicators import compute_indicators
+from stock_dashboard.market_data import get_market_data_service
+from stock_dashboard.price_store import get_price_store, period_start
+
+# Tickers whose bars and indicators are in memory at the same time
+CHUNK_SIZE = 50
+
+# ZIP archives up to this size stay in memory; larger ones spill to a temp file
+SPOOL_MAX_BYTES = 16 * 1024 * 1024
+
+# Rows per worksheet in the xlsx format (the header takes one)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Columnar formats written next to the workbook: format -> file extension
+COLUMNAR_FORMATS = {"parquet": "parquet", "feather": "feather"}
+
+# Rows buffered per Parquet row group / Arrow IPC batch
+ROW_GROUP_ROWS = 64 * 1024
+
+FUNDAMENTAL_COLUMNS = [
+    "Ticker", "Sector", "Industry", "Exchange", "Market Cap", "P/E", "Forward EPS",
+    "Dividend Yield", "Beta", "Price to Book", "52W High", "52W Low",
+]
+
+
+# -------------------- FRAMES --------------------
+def fundamentals_frame(tickers: Iterable[str]) -> pd.DataFrame:
+    """One row of fundamentals per ticker (FUNDAMENTAL_COLUMNS), from one batched lookup."""
+    tickers = list(dict.fromkeys(tickers))
+    snapshots = get_market_data_service().get_snapshots(tickers)
+    rows = []
+    for t in tickers:
+        info = snapshots.get(t)
+        if info is None:
+            continue
+        rows.append([
+            t, info.sector, info.industry, info.exchange, info.market_cap, info.trailing_pe,
+            info.forward_eps, info.dividend_yield, info.beta, info.price_to_book,
+            info.fifty_two_week_high, info.fifty_two_week_low,
+        ])
+    return pd.DataFrame(rows, columns=FUNDAMENTAL_COLUMNS)
+
+
+def iter_technicals(tickers: Iterable[str], period: str = "1y",
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield each ticker's daily bars with the export indicators, one frame per ticker.
+
+    The store is refreshed for all tickers in one pass up front; bars and indicators
+    are then loaded `chunk_size` tickers at a time, so only one chunk is held in memory.
+    Tickers without history are skipped.
+
+    Args:
+        tickers (iterable): Ticker symbols, in output order.
+        period (str): History window of every frame.
+        chunk_size (int): Tickers loaded together.
+
+    Yields:
+        pd.DataFrame: "Date", OHLCV, "SMA_50", "SMA_200", "Volatility", "RSI" and "Ticker".
+    """
+    tickers = list(dict.fromkeys(tickers))
+    store = get_price_store()
+    if tickers:
+        store.refresh(tickers, start=period_start(period, pd.Timestamp.today().normalize()))
+    for i in range(0, len(tickers), chunk_size):
+        histories = store.history_many(tickers[i:i + chunk_size], period=period)
+        closes = {t: h["Close"] for t, h in histories.items() if not h.empty}
+        indicators = compute_indicators(pd.concat(closes, axis=1)) if closes else {}
+        for t in closes:
+            hist = histories[t].copy()
+            for name, panel in indicators.items():
+                hist[name] = panel[t].reindex(hist.index)
+            hist["Ticker"] = t
+            hist = hist.reset_index()
+            # Make datetime columns timezone-naive
+            for col in hist.select_dtypes(include=["datetimetz"]).columns:
+                hist[col] = hist[col].dt.tz_localize(None)
+            yield hist
+        del histories, closes, indicators
+
+
+# -------------------- EXCEL --------------------
+def _rows(frame: pd.DataFrame) -> Iterator[list]:
+    """Rows of plain Python values, with missing values as None (blank cells)."""
+    columns = []
+    for name in frame.columns:
+        values = frame[name]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns.append([None if pd.isna(v) else v.to_pydatetime() for v in values])
+        else:
+            columns.append([None if _is_missing(v) else v for v in values.tolist()])
+    return (list(row) for row in zip(*columns))
+
+
+def _is_missing(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, float):
+        return math.isnan(value) or math.isinf(value)
+    return value is pd.NaT or value is pd.NA
+
+
+class _SheetWriter:
+    """Appends rows to a worksheet, continuing on "<name> (2)", ... past the row limit."""
+
+    def __init__(self, workbook: xlsxwriter.Workbook, name: str, max_rows: int = EXCEL_MAX_ROWS):
+        self.workbook = workbook
+        self.name = name
+        self.max_rows = max_rows
+        self.columns: Optional[list] = None
+        self.sheets = 0
+        self.rows_written = 0
+        self._sheet = None
+        self._row = 0
+
+    def _next_sheet(self):
+        self.sheets += 1
+        title = self.name if self.sheets == 1 else f"{self.name} ({self.sheets})"
+        self._sheet = self.workbook.add_worksheet(title)
+        self._sheet.write_row(0, 0, [str(c) for c in self.columns])
+        self._row = 1
+
+    def write(self, frame: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(frame.columns)
+        for row in _rows(frame.reindex(columns=self.columns)):
+            if self._sheet is None or self._row >= self.max_rows:
+                self._next_sheet()
+            self._sheet.write_row(self._row, 0, row)
+            self._row += 1
+            self.rows_written += 1
+
+    def close(self, columns: Optional[list] = None):
+        """Make sure the sheet exists (with `columns` as its header) even when nothing was written."""
+        if self._sheet is None:
+            self.columns = self.columns or columns or []
+            self._next_sheet()
+
+
+def write_excel(fileobj, sheets: Dict[str, object]) -> Dict[str, int]:
+    """
+    Write a workbook row by row in constant-memory mode.
+
+    Args:
+        fileobj: Path or writable file object.
+        sheets (dict): Sheet name -> DataFrame or iterable of DataFrames with the same
+            columns. Sheets are written in order, each fully before the next.
+
+    Returns:
+        dict: Sheet name -> data rows written.
+    """
+    counts = {}
+    workbook = xlsxwriter.Workbook(fileobj, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd",
+        "strings_to_numbers": False,
+        "strings_to_urls": False,
+    })
+    try:
+        for name, frames in sheets.items():
+            writer = _SheetWriter(workbook, name)
+            columns = None
+            if isinstance(frames, pd.DataFrame):
+                columns = list(frames.columns)
+                frames = [frames]
+            for frame in frames:
+                writer.write(frame)
+            writer.close(columns)
+            counts[name] = writer.rows_written
+    finally:
+        workbook.close()
+    return counts
+
+
+# -------------------- COLUMNAR --------------------
+def table_file_name(table: str, fmt: str) -> str:
+    """File name of one table in one columnar format, e.g. "original_input.parquet"."""
+    return f"{table.lower().replace(' ', '_')}.{COLUMNAR_FORMATS[fmt]}"
+
+
+class ColumnarWriter:
+    """
+    Streams the frames of one table into Parquet (zstd) and Arrow IPC files.
+
+    The schema is taken from the first frame; later frames are cast to it.
+
+    Args:
+        files (dict): Format ("parquet", "feather") -> writable binary file or path.
+    """
+
+    def __init__(self, files: Dict[str, object]):
+        unknown = set(files) - set(COLUMNAR_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown columnar formats: {sorted(unknown)}")
+        self.files = files
+        self.schema: Optional[pa.Schema] = None
+        self.rows = 0
+        self._writers = {}
+        self._pending: List[pa.RecordBatch] = []
+        self._pending_rows = 0
+
+    def _open(self, schema: pa.Schema):
+        self.schema = schema
+        for fmt, sink in self.files.items():
+            if fmt == "parquet":
+                self._writers[fmt] = pq.ParquetWriter(sink, schema, compression="zstd")
+            else:
+                self._writers[fmt] = pa.ipc.new_file(sink, schema)
+
+    def _flush(self):
+        if not self._pending:
+            return
+        table = pa.Table.from_batches(self._pending, schema=self.schema)
+        for fmt, writer in self._writers.items():
+            if fmt == "parquet":
+                writer.write_table(table, row_group_size=ROW_GROUP_ROWS)
+            else:
+                writer.write_table(table, max_chunksize=ROW_GROUP_ROWS)
+        self._pending, self._pending_rows = [], 0
+
+    def write(self, frame: pd.DataFrame):
+        batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+        if self.schema is None:
+            self._open(batch.schema)
+        elif not batch.schema.equals(self.schema):
+            batch = batch.cast(self.schema)
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        self.rows += batch.num_rows
+        if self._pending_rows >= ROW_GROUP_ROWS:
+            self._flush()
+
+    def close(self, columns: Optional[list] = None):
+        """Finish every file (with `columns` as string columns when nothing was written)."""
+        if self.schema is None:
+            self._open(pa.schema([(str(c), pa.string()) for c in columns or []]))
+        self._flush()
+        for writer in self._writers.values():
+            writer.close()
+
+
+def _tee(frames, writer: ColumnarWriter):
+    for frame in frames:
+        writer.write(frame)
+        yield frame
+
+
+def export_tables(tables: Dict[str, object], out_dir: str,
+                  formats: Iterable[str] = tuple(COLUMNAR_FORMATS)) -> Dict[str, Dict[str, str]]:
+    """
+    Write tables straight to columnar files, without a workbook.
+
+    Args:
+        tables (dict): Table name -> DataFrame or iterable of DataFrames.
+        out_dir (str): Output directory.
+        formats (iterable): Columnar formats to write.
+
+    Returns:
+        dict: Table name -> format -> path.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for name, frames in tables.items():
+        paths[name] = {fmt: os.path.join(out_dir, table_file_name(name, fmt)) for fmt in formats}
+        writer = ColumnarWriter(paths[name])
+        columns = list(frames.columns) if isinstance(frames, pd.DataFrame) else None
+        for frame in [frames] if isinstance(frames, pd.DataFrame) else frames:
+            writer.write(frame)
+        writer.close(columns)
+    return paths
+
+
+def load_table(path: str) -> pd.DataFrame:
+    """Read an exported Parquet or Feather table (Feather files are memory-mapped)."""
+    if path.endswith(".parquet"):
+        return pq.read_table(path).to_pandas()
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+# -------------------- ZIP --------------------
+def build_export_zip(excel_sheets: Dict[str, object],
+                     extra_files: Optional[Dict[str, Callable[[], bytes]]] = None,
+                     excel_name: str = "portfolio_report.xlsx",
+                     spool_max: int = SPOOL_MAX_BYTES, archive=None,
+                     columnar: Iterable[str] = tuple(COLUMNAR_FORMATS)) -> Tuple[object, Dict[str, int]]:
+    """
+    Write the export ZIP incrementally into a spooled temporary file.
+
+    Args:
+        excel_sheets (dict): Passed to `write_excel`; the workbook is streamed into
+            the `excel_name` entry without being buffered separately.
+        extra_files (dict, optional): Entry name -> function returning its bytes,
+            called only when that entry is written.
+        excel_name (str): Name of the workbook entry.
+        spool_max (int): Bytes kept in memory before the file moves to disk.
+        archive (file, optional): Seekable binary file to write the ZIP to instead of
+            a new spooled temporary file. The caller keeps ownership of it.
+        columnar (iterable): Columnar formats each sheet is also written in, as
+            "data/<table>.<ext>" entries. Empty for the workbook only.
+
+    Returns:
+        tuple: (the ZIP file positioned at its start; sheet name -> data rows).
+    """
+    owned = archive is None
+    if owned:
+        archive = tempfile.SpooledTemporaryFile(max_size=spool_max, suffix=".zip")
+    # Zip entries are written one at a time, so the columnar files are spooled while
+    # the workbook streams and copied in after it
+    columnar = list(columnar)
+    spools = {name: {fmt: tempfile.SpooledTemporaryFile(max_size=spool_max) for fmt in columnar}
+              for name in excel_sheets} if columnar else {}
+    writers = {name: ColumnarWriter(files) for name, files in spools.items()}
+    sheets = {}
+    for name, frames in excel_sheets.items():
+        if name not in writers:
+            sheets[name] = frames
+        elif isinstance(frames, pd.DataFrame):
+            writers[name].write(frames)
+            sheets[name] = frames
+        else:
+            sheets[name] = _tee(frames, writers[name])
+    try:
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            with zf.open(excel_name, "w", force_zip64=True) as entry:
+                counts = write_excel(entry, sheets)
+            for name, writer in writers.items():
+                frames = excel_sheets[name]
+                writer.close(list(frames.columns) if isinstance(frames, pd.DataFrame) else None)
+                for fmt, spool in spools[name].items():
+                    info = zipfile.ZipInfo(f"data/{table_file_name(name, fmt)}", time.localtime()[:6])
+                    # Parquet pages are already zstd-compressed
+                    info.compress_type = zipfile.ZIP_STORED if fmt == "parquet" else zipfile.ZIP_DEFLATED
+                    spool.seek(0)
+                    with zf.open(info, "w", force_zip64=True) as entry:
+                        shutil.copyfileobj(spool, entry)
+            for name, build in (extra_files or {}).items():
+                with zf.open(name, "w", force_zip64=True) as entry:
+                    entry.write(build())
+    except BaseException:
+        if owned:
+            archive.close()
+        raise
+    finally:
+        for files in spools.values():
+            for spool in files.values():
+                spool.close()
+    archive.seek(0)
+    return archive, counts
+
@@ -0,0 +1,111 @@
+"""
+23. FX
+
+Currency conversion to USD. Daily FX rates are stored as ordinary "{CUR}USD=X" series
+in the price store, so the FX panel is cached and updated incrementally like any
+other price history. Whole price panels are converted with one broadcast multiply,
+each date using that day's rate, instead of scaling every column by today's spot.
+
+"""
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from stock_dashboard.price_store import get_price_store
+
+BASE_CURRENCY = "USD"
+
+# Quote currencies in minor units: (major currency, factor to the major unit)
+MINOR_UNITS = {
+    "GBp": ("GBP", 0.01),
+    "GBX": ("GBP", 0.01),
+    "ILA": ("ILS", 0.01),
+    "ZAc": ("ZAR", 0.01),
+}
+
+
+def fx_symbol(currency: str) -> str:
+    """Yahoo symbol of the daily rate converting `currency` to USD."""
+    return f"{currency}{BASE_CURRENCY}=X"
+
+
+def fx_panel(currencies: Iterable[str], period: Optional[str] = None, start=None) -> pd.DataFrame:
+    """
+    Daily rates to USD, dates x currency.
+
+    Minor-unit currencies (GBp, ILA, ZAc) are derived from their major currency and
+    USD is a constant 1. Currencies whose rate cannot be loaded are left out.
+
+    Args:
+        currencies (iterable): Currency codes as reported by the quote data.
+        period (str, optional): Window such as "5d", "1y" or "max".
+        start (date-like, optional): Start date instead of a period.
+
+    Returns:
+        pd.DataFrame: Rates indexed by date (forward-filled over FX holidays).
+    """
+    currencies = list(dict.fromkeys(c for c in currencies if c))
+    majors = {c: MINOR_UNITS.get(c, (c, 1.0)) for c in currencies}
+    pairs = sorted({major for major, _ in majors.values() if major != BASE_CURRENCY})
+    closes = get_price_store().close_panel([fx_symbol(c) for c in pairs], period=period, start=start)
+    closes = closes.rename(columns={fx_symbol(c): c for c in pairs}).ffill()
+
+    panel = pd.DataFrame(index=closes.index)
+    for currency, (major, factor) in majors.items():
+        if major == BASE_CURRENCY:
+            panel[currency] = factor
+        elif major in closes:
+            panel[currency] = closes[major] * factor
+    return panel
+
+
+def spot_rates(currencies: Iterable[str]) -> pd.Series:
+    """
+    Latest rate to USD for each currency.
+
+    Returns:
+        pd.Series: Rate by currency; NaN where no rate could be loaded.
+    """
+    currencies = list(dict.fromkeys(c for c in currencies if c))
+    panel = fx_panel(currencies, period="7d")
+    latest = panel.iloc[-1] if not panel.empty else pd.Series(dtype="float64")
+    # A USD-only portfolio has no FX rows at all, so USD rates are filled in directly
+    return latest.reindex(currencies).fillna(_fixed_rates(currencies))
+
+
+def _fixed_rates(currencies: Iterable[str]) -> pd.Series:
+    """Constant rates of USD and its minor units, which need no FX data."""
+    return pd.Series({c: factor for c in currencies for major, factor in [MINOR_UNITS.get(c, (c, 1.0))]
+                      if major == BASE_CURRENCY}, dtype="float64")
+
+
+def to_usd(prices: pd.DataFrame, currencies: Dict[str, str], fx: Optional[pd.DataFrame] = None,
+           missing_rate: float = np.nan) -> pd.DataFrame:
+    """
+    Convert a price panel to USD with each date's own exchange rate.
+
+    Args:
+        prices (pd.DataFrame): Prices, dates x tickers, in each ticker's quote currency.
+        currencies (dict): Ticker -> currency (tickers not listed are taken as USD).
+        fx (pd.DataFrame, optional): Rates from `fx_panel`. Loaded for the panel's dates if omitted.
+        missing_rate (float): Rate used when a currency has no FX data at all. The
+            default NaN leaves those columns NaN, so callers can leave them out instead
+            of valuing them as USD. Dates before the first rate use the earliest one.
+
+    Returns:
+        pd.DataFrame: USD prices, same shape as `prices`.
+    """
+    if prices.empty:
+        return prices
+    column_currencies = [currencies.get(t) or BASE_CURRENCY for t in prices.columns]
+    if fx is None:
+        fx = fx_panel(column_currencies, start=prices.index.min())
+    # Carry each rate onto the price calendar: the last rate known on every price date
+    dates = prices.index.union(fx.index)
+    rates = fx.reindex(dates).ffill().bfill().reindex(prices.index)
+    rates = rates.reindex(columns=list(dict.fromkeys(column_currencies)))
+    # The panel has no dates at all when no other currency has data; USD still converts at 1
+    rates = rates.fillna(_fixed_rates(rates.columns))
+    matrix = rates[column_currencies].to_numpy(dtype="float64")
+    matrix = np.where(np.isnan(matrix), missing_rate, matrix)
+    return pd.DataFrame(prices.to_numpy(dtype="float64") * matrix, index=prices.index, columns=prices.columns)
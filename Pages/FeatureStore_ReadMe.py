@@ -0,0 +1,212 @@
+"""
+27. FeatureStore
+
+Daily risk-feature store. The classification features (volatility, beta, P/E,
+dividend yield, price std dev) are computed once per trading day, in bulk, for every
+tracked ticker and stored as one Parquet table per date keyed by (ticker, date).
+Classification requests are served by lookup, and the kept history shows how a
+portfolio's risk drifted over time.
+
+Fundamentals have no history upstream, so history starts on the day a ticker is
+first tracked and grows by one row per trading day.
+
+Refresh nightly with: python -m stock_dashboard.feature_store [--fixture DIR]
+
+"""
+import argparse
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from stock_dashboard.analytics import risk_features
+from stock_dashboard.cache import MARKET_TZ
+from stock_dashboard.risk_model import FEATURE_SCHEMA, score_risk
+from stock_dashboard.singleflight import get_single_flight
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".stock_dashboard", "features")
+
+
+def last_close_date(now: Optional[datetime] = None, close_hour: int = 16, settle_minutes: int = 30) -> pd.Timestamp:
+    """The date of the most recent settled US market close (weekends skipped)."""
+    now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+    close = now.replace(hour=close_hour, minute=0, second=0, microsecond=0) + timedelta(minutes=settle_minutes)
+    day = now.date() if now >= close else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return pd.Timestamp(day)
+
+
+def _complete(frame: pd.DataFrame) -> pd.DataFrame:
+    """Rows with every feature; the others are stored only so they are not recomputed."""
+    return frame.dropna(subset=FEATURE_SCHEMA)
+
+
+class FeatureStore:
+    """
+    Risk features by (ticker, date), one Parquet file per date plus a universe list.
+
+    Args:
+        root (str, optional): Store directory. Defaults to $STOCK_DASHBOARD_FEATURES or ~/.stock_dashboard/features.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.environ.get("STOCK_DASHBOARD_FEATURES", DEFAULT_ROOT)
+        self._lock = threading.RLock()
+        self._frames: Dict[pd.Timestamp, tuple] = {}
+        os.makedirs(self.root, exist_ok=True)
+        self._universe_path = os.path.join(self.root, "universe.json")
+
+    # -------------------- INTERNALS --------------------
+    def _path(self, date: pd.Timestamp) -> str:
+        return os.path.join(self.root, f"{date:%Y-%m-%d}.parquet")
+
+    def _load(self, date: pd.Timestamp) -> pd.DataFrame:
+        """The stored table for one date (re-read when another process rewrote it)."""
+        try:
+            mtime = os.path.getmtime(self._path(date))
+        except OSError:
+            return pd.DataFrame(columns=["ticker", "date", *FEATURE_SCHEMA])
+        with self._lock:
+            cached_mtime, frame = self._frames.get(date, (None, None))
+            if cached_mtime != mtime:
+                frame = pd.read_parquet(self._path(date))
+                frame["ticker"] = frame["ticker"].astype(str)
+                self._frames[date] = (mtime, frame)
+            return frame
+
+    def _append(self, date: pd.Timestamp, rows: pd.DataFrame):
+        with self._lock:
+            stored = self._load(date)
+            frame = pd.concat([stored[~stored["ticker"].isin(rows["ticker"])], rows], ignore_index=True) \
+                if not stored.empty else rows
+            frame = frame.sort_values("ticker", ignore_index=True)
+            # Dictionary-encoded tickers keep the per-date tables small
+            table = frame.astype({"ticker": "category"})
+            tmp_path = self._path(date) + ".tmp"
+            table.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(date))
+            self._frames[date] = (os.path.getmtime(self._path(date)), frame)
+
+    def universe(self) -> List[str]:
+        """Every ticker that has been requested or tracked."""
+        try:
+            with open(self._universe_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def track(self, tickers: Iterable[str]):
+        """Add tickers to the universe refreshed every day."""
+        with self._lock:
+            universe = self.universe()
+            added = [t for t in dict.fromkeys(tickers) if t not in set(universe)]
+            if added:
+                tmp_path = self._universe_path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(sorted(universe + added), f)
+                os.replace(tmp_path, self._universe_path)
+
+    # -------------------- API --------------------
+    def features(self, tickers: Iterable[str], date: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """
+        Risk features of each ticker for one trading day (the latest by default).
+
+        Tickers missing from that day's table are computed together in one bulk pass
+        and stored, so later requests for them are lookups. Tickers with incomplete
+        features (e.g. ETFs without a P/E) are stored too, with NaN, so they are not
+        recomputed on every request. Past dates are only looked up.
+
+        Returns:
+            pd.DataFrame: "ticker", "date" and the FEATURE_SCHEMA columns; tickers
+            without complete features are left out.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        latest = last_close_date()
+        date = pd.Timestamp(date).normalize() if date is not None else latest
+        stored = self._load(date)
+        missing = [t for t in tickers if t not in set(stored["ticker"])]
+        if missing and date == latest:
+            self.track(missing)
+            get_single_flight().do_many(
+                [("features", t, date) for t in missing],
+                lambda keys: self._compute([k[1] for k in keys], date),
+            )
+            stored = self._load(date)
+        return _complete(stored[stored["ticker"].isin(tickers)]).reset_index(drop=True)
+
+    def _compute(self, tickers: List[str], date: pd.Timestamp):
+        rows = risk_features(tickers, complete=False).assign(date=date)[["ticker", "date", *FEATURE_SCHEMA]]
+        if not rows.empty:
+            self._append(date, rows)
+
+    def refresh(self, tickers: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Compute today's features for the whole tracked universe (plus `tickers`) in one pass."""
+        if tickers is not None:
+            self.track(tickers)
+        return self.features(self.universe())
+
+    def dates(self) -> List[pd.Timestamp]:
+        """Dates that have a stored table, oldest first."""
+        return sorted(pd.Timestamp(name[:-len(".parquet")]) for name in os.listdir(self.root)
+                      if name.endswith(".parquet"))
+
+    def history(self, tickers: Iterable[str], start=None) -> pd.DataFrame:
+        """Every stored feature row of the tickers, from `start` on, sorted by date."""
+        tickers = set(tickers)
+        start = pd.Timestamp(start) if start is not None else None
+        frames = [self._load(date) for date in self.dates() if start is None or date >= start]
+        frames = [_complete(frame[frame["ticker"].isin(tickers)]) for frame in frames]
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=["ticker", "date", *FEATURE_SCHEMA])
+        return pd.concat(frames, ignore_index=True).sort_values(["date", "ticker"], ignore_index=True)
+
+    def risk_history(self, tickers: Iterable[str], start=None) -> pd.DataFrame:
+        """
+        How the tickers' rule-based risk evolved, one row per stored date.
+
+        Returns:
+            pd.DataFrame: "date", mean "Risk Score" and the share of tickers at each risk level.
+        """
+        history = self.history(tickers, start)
+        if history.empty:
+            return pd.DataFrame(columns=["date", "Risk Score"])
+        scored = history[["date"]].join(score_risk(history))
+        levels = pd.crosstab(scored["date"], scored["Risk"], normalize="index")
+        return scored.groupby("date")["Risk Score"].mean().to_frame().join(levels).reset_index()
+
+
+_store: Optional[FeatureStore] = None
+
+
+def get_feature_store() -> FeatureStore:
+    """Return the process-wide feature store."""
+    global _store
+    if _store is None:
+        _store = FeatureStore()
+    return _store
+
+
+def main(argv: Optional[List[str]] = None):
+    from stock_dashboard.market_data import LocalProvider, get_market_data_service
+
+    parser = argparse.ArgumentParser(description="Compute today's risk features for the tracked universe.")
+    parser.add_argument("--universe", default=None, help="Text file with extra tickers to track, one per line")
+    parser.add_argument("--fixture", default=None, help="Offline data fixture directory instead of Yahoo Finance")
+    args = parser.parse_args(argv)
+
+    if args.fixture:
+        get_market_data_service().set_provider(LocalProvider.from_directory(args.fixture))
+    tickers = None
+    if args.universe:
+        with open(args.universe) as f:
+            tickers = [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+    features = get_feature_store().refresh(tickers)
+    print(f"{len(features)} tickers stored for {last_close_date():%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,10 @@ import yfinance as yf
 from typing import Optional, Dict, Any
 import pandas as pd
 import streamlit as st
+from stock_dashboard.cache import QUOTES, cached
+from stock_dashboard.instrumentation import record_swallowed
 
+@cached(QUOTES)
 def get_info_on_stock(ticker: str) -> Dict[str, Any]:
     """
     Fetch stock information for a given ticker using yfinance.
@@ -28,6 +31,7 @@ def get_info_on_stock(ticker: str) -> Dict[str, Any]:
         # Return the stock info
         return stock_info
     except Exception as e:
+        record_swallowed("get_info_on_stock", e)
         # If an error occurs during data fetching, display the error message in Streamlit
         st.error(f"Error fetching data for {ticker}: {e}")
         # Return an empty dictionary in case of error
@@ -40,56 +44,111 @@ logging.basicConfig(filename='stock_data.log', level=logging.INFO, format='%(asc
 6. GetStockRegionFunction
 
 """
-import yfinance as yf
-from typing import Dict
+from typing import Any, Dict, Iterable, Union
+import pandas as pd
+from stock_dashboard.instrumentation import record_swallowed, timed
+from stock_dashboard.market_data import get_market_data_service
+from stock_dashboard.symbol_index import symbol_attributes
+
+# Yahoo Finance exchange codes (the "exchange" field of stock.info) by region
+EXCHANGE_REGIONS = {
+    "American Stock": [
+        "NMS", "NGM", "NCM", "NAS", "NYQ", "NYS", "ASE", "PCX", "BTS", "CBO", "PNK", "OQB", "OQX", "OEM", "OBB",
+        "TOR", "VAN", "CNQ", "NEO",
+    ],
+    "European Stock": [
+        "LSE", "IOB", "AQS", "PAR", "AMS", "BRU", "LIS", "MIL", "MCE", "GER", "FRA", "BER", "DUS", "HAM", "MUN",
+        "STU", "HAN", "EBS", "VIE", "STO", "HEL", "CPH", "OSL", "ICE", "ISE", "WSE", "PRA", "ATH", "BUD", "MCX",
+        "TLO", "RIS", "LIT", "IST",
+    ],
+    "Asian Stock": [
+        "JPX", "OSA", "FKA", "SAP", "HKG", "KSC", "KOE", "NSI", "BSE", "SHH", "SHZ", "TAI", "TWO", "JKT", "KLS",
+        "SES", "SET", "PHS", "KAR", "DSE",
+    ],
+    "Other/Unknown Region": [
+        "ASX", "NZE", "JNB", "SAO", "MEX", "BUE", "SGO", "LIM", "BVC", "TLV", "SAU", "DOH", "KUW", "CAI", "DFM",
+        "ABU", "BAH", "MSM", "NAI", "CAS",
+    ],
+}
+
+# Common exchange names and abbreviations -> Yahoo exchange code
+EXCHANGE_ALIASES = {
+    "NASDAQ": "NMS", "NYSE": "NYQ", "AMEX": "ASE", "ARCA": "PCX", "NYSEARCA": "PCX", "BATS": "BTS", "CBOE": "CBO",
+    "TSX": "TOR", "TSXV": "VAN", "CSE": "CNQ", "CNSX": "CNQ",
+    "EURONEXT": "PAR", "XETRA": "GER", "BME": "MCE", "BOLSA-MADRID": "MCE", "SIX": "EBS", "VSE": "VIE",
+    "OMX": "STO", "OSLO": "OSL", "DUBLIN": "ISE", "PRAGUE": "PRA", "ATHENS": "ATH", "BUDAPEST": "BUD",
+    "MOEX": "MCX", "MICEX": "MCX",
+    "TSE": "JPX", "TYO": "JPX", "TKY": "JPX", "HKEX": "HKG", "KOSPI": "KSC", "KOSDAQ": "KOE", "NSE": "NSI",
+    "SSE": "SHH", "SHANGHAI": "SHH", "SZSE": "SHZ", "SHENZHEN": "SHZ", "TAIEX": "TAI", "TAIPEI": "TAI",
+    "IDX": "JKT", "PSE": "PHS", "BURSA-MALAYSIA": "KLS", "SGX": "SES", "KARACHI": "KAR", "DHAKA": "DSE",
+    "NZX": "NZE", "JSE": "JNB", "BMV": "MEX", "B3": "SAO", "BOVESPA": "SAO", "TADAWUL": "SAU", "QSE": "DOH",
+    "EGX": "CAI", "ADX": "ABU",
+}
+
+# Precompiled exact-match index: exchange code or alias -> region
+REGION_INDEX = {code: region for region, codes in EXCHANGE_REGIONS.items() for code in codes}
+REGION_INDEX.update({alias: REGION_INDEX[code] for alias, code in EXCHANGE_ALIASES.items()})
+
+
+def region_for_exchange(exchange: str) -> str:
+    """
+    Look up the region of an exchange code or alias (case-insensitive, exact match).
+
+    Args:
+        exchange (str): Exchange code as reported by Yahoo Finance (e.g. "NMS", "PAR", "JPX").
 
-def get_stock_region(ticker: str) -> str:
+    Returns:
+        str: The region, or "Other/Unknown Region (Exchange: ...)" when the code is not known.
     """
-    Fetch the region of a stock based on its exchange.
-    
+    code = (exchange or "").strip().upper()
+    return REGION_INDEX.get(code) or f"Other/Unknown Region (Exchange: {code.lower()})"
+
+
+def get_stock_region(info: Union[Dict[str, Any], str]) -> str:
+    """
+    Classify a stock's region from its already-fetched info, or from its ticker.
+
     Args:
-        ticker (str): The stock ticker symbol.
-        
+        info (dict or str): The stock's info dictionary (only "exchange" is used), or a
+            ticker whose exchange is read from the symbol index.
+
     Returns:
         str: The region (e.g., "American Stock", "European Stock", "Asian Stock", "Other/Unknown Region").
     """
-    try:
-        # Fetch stock info using yfinance
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        exchange = info.get("exchange", "").lower()
-
-        # Region mapping based on exchange abbreviations
-        region_map = {
-            "American Stock": [
-                "nasdaq", "nyse", "amex", "arca", "pcx", "nms", "nyq", "snp", "cboe", "bats", "tsx", "tsxv", "cse", "ne"
-            ],
-            "European Stock": [
-                "lse", "euronext", "xetra", "bme", "six", "fra", "ams", "par", "mil", "lis", "vse", "omx", "wse", "prague",
-                "athens", "budapest", "bvx", "micex", "moex", "hel", "sto", "oslo", "dublin", "bolsa-madrid","ger","ebs"
-            ],
-            "Asian Stock": [
-                "tse", "sse", "hkex", "kospi", "kosdaq", "nse", "bse", "szse", "taiex", "jpxt", "hsi", "idx", "pse",
-                "bursa-malaysia", "set", "hkg", "jpx", "tky", "sto", "shanghai", "shenzhen", "taipei", "karachi", "dhaka","ksc","nsi"
-            ],
-            "Other/Unknown Region": [
-                "asx", "nzx", "jse", "bvc", "bmv", "b3", "bovespa", "safex", "adx", "dfm", "tadawul", "qse", "egx", "casablanca",
-                "nairobi", "lagos", "muscat", "doha", "kuwait", "manama", "colombia", "peru", "chile", "argentina"
-            ]
-        }
+    if isinstance(info, str):
+        return region_for_exchange(symbol_attributes([info], "exchange")[info])
+    return region_for_exchange(info.get("exchange", ""))
 
-        # Match the exchange with the appropriate region
-        for region, exchanges in region_map.items():
-            if any(ex in exchange for ex in exchanges):
-                return region
 
-        # If no match found, return Unknown region with exchange info
-        return f"Other/Unknown Region (Exchange: {exchange})"
+def get_sectors(tickers: Iterable[str]) -> Dict[str, str]:
+    """
+    Look up the sector of each ticker in the symbol index (unknown tickers are fetched in one batch).
+
+    Args:
+        tickers (iterable): Stock tickers.
+
+    Returns:
+        dict: Ticker -> sector ("Unknown" when the provider has none).
+    """
+    return symbol_attributes(tickers, "sector")
 
-    except Exception as e:
-        return f"Error fetching data for {ticker}: {e}"
 
+def classify_regions(exchanges: pd.Series) -> pd.Series:
+    """
+    Classify many holdings at once with a single vectorized index lookup.
+
+    Args:
+        exchanges (pd.Series): Exchange codes.
+
+    Returns:
+        pd.Series: Regions aligned with `exchanges`.
+    """
+    codes = exchanges.fillna("").astype(str).str.strip().str.upper()
+    regions = codes.map(REGION_INDEX)
+    return regions.fillna("Other/Unknown Region (Exchange: " + codes.str.lower() + ")")
 
+
+@timed()
 def stock_region_diversification(tickers_with_quantity: Dict[str, int]) -> Dict[str, float]:
     """
     Calculates the portfolio diversification by region based on the stock tickers and quantities.
@@ -109,10 +168,12 @@ def stock_region_diversification(tickers_with_quantity: Dict[str, int]) -> Dict[
         region_totals = {}
         total_investment = 0
 
+        # Fetch every ticker's snapshot in one batch
+        snapshots = get_market_data_service().get_snapshots(tickers_with_quantity)
+
         # Loop through each stock in the portfolio
         for ticker, quantity in tickers_with_quantity.items():
-            stock = yf.Ticker(ticker)
-            current_price = stock.info.get("regularMarketPrice", 0)
+            current_price = snapshots[ticker].price
             
             # Skip the stock if the price is zero or invalid
             if current_price <= 0:
@@ -123,7 +184,7 @@ def stock_region_diversification(tickers_with_quantity: Dict[str, int]) -> Dict[
             total_investment += investment
 
             # Get the region for the stock
-            region = get_stock_region(ticker)
+            region = region_for_exchange(snapshots[ticker].exchange)
             
             # Add investment to the corresponding region
             if region not in region_totals:
@@ -143,6 +204,7 @@ def stock_region_diversification(tickers_with_quantity: Dict[str, int]) -> Dict[
         return region_percentages
 
     except Exception as e:
+        record_swallowed("stock_region_diversification", e)
         return {"Error": f"Error calculating diversification: {e}"}
 
 """
@@ -4,8 +4,14 @@
 """
 
 # Home Page:
+import pandas as pd
 import streamlit as st
 from nextpage import nav_page
+from stock_dashboard.portfolio import Portfolio
+from stock_dashboard.portfolio_import import (
+    HoldingsImportError, apply_editor_changes, import_holdings, load_holdings, missing_symbols,
+)
+from stock_dashboard.symbol_index import get_symbol_index
 
 # -------------------- PAGE CONFIG --------------------
 st.set_page_config(page_title="Stock Portfolio Builder", layout="wide")
@@ -99,37 +105,106 @@ st.write("Input your stock holdings to analyze them on the dashboard.")
 
 # Initialize session state to keep track of portfolio
 if "portfolio" not in st.session_state:
-    st.session_state.portfolio = []
+    st.session_state.portfolio = Portfolio()
 # If no portfolio is saved in the session state, initialize an empty portfolio.
-
-# Function to add a new stock to the portfolio
-def add_stock():
-    st.session_state.portfolio.append({"ticker": "", "quantity": 0.0})
-
+# The Portfolio keeps tickers and quantities in arrays that are edited in place (see portfolio);
+# sessions started before it hold a list of {"ticker", "quantity"} dicts, which is converted once.
+portfolio = st.session_state.portfolio = Portfolio.coerce(st.session_state.portfolio)
+
+# Rows shown in the holdings grid at a time; larger portfolios are paged
+PAGE_SIZE = 100
+
+# -------------------- IMPORT --------------------
+# Validated in one pass, unknown symbols checked in one batch (see portfolio_import)
+with st.expander("Import holdings from a file", expanded=not len(portfolio)):
+    uploaded = st.file_uploader(
+        "CSV, Excel or a broker positions export", type=["csv", "txt", "xlsx", "xls"], key="holdings_file"
+    )
+    mode = st.radio("Imported holdings", ["replace", "merge"], horizontal=True,
+                    format_func=lambda m: "Replace the portfolio" if m == "replace" else "Add to the portfolio")
+    if uploaded is not None and st.button("Import"):
+        try:
+            with st.spinner("Checking symbols..."):
+                result = import_holdings(uploaded)
+        except (HoldingsImportError, ValueError) as e:
+            st.error(f"Could not import {uploaded.name}: {e}")
+        else:
+            load_holdings(portfolio, result.holdings, mode)
+            st.session_state.import_result = result
+
+result = st.session_state.get("import_result")
+if result is not None:
+    message = f"Imported {len(result.holdings)} holdings."
+    if result.merged:
+        message += f" {result.merged} repeated rows were combined."
+    st.success(message)
+    if not result.rejected.empty:
+        unknown = result.rejected[result.rejected["reason"] == "unknown symbol"]["ticker"]
+        if not unknown.empty:
+            st.warning(f"Unknown symbols skipped: {', '.join(unknown.astype(str))}")
+        with st.expander(f"{len(result.rejected)} rows skipped"):
+            st.dataframe(result.rejected, hide_index=True, use_container_width=True)
+
+# -------------------- HOLDINGS GRID --------------------
 # Card-style container for adding stocks
 st.markdown('<div class="card">', unsafe_allow_html=True)
 st.markdown("### Add Stocks")
 # Card-style UI for better layout
 
-# Create input fields for each stock in the portfolio
-for i, stock in enumerate(st.session_state.portfolio):
-    col1, col2 = st.columns(2)
-    stock["ticker"] = col1.text_input(
-        f"Stock Ticker {i+1}", stock["ticker"], key=f"ticker_{i}"
-    )
-    stock["quantity"] = col2.number_input(
-        f"Quantity", value=float(stock["quantity"]), min_value=0.0, step=1.0, key=f"quantity_{i}"
+# Autocomplete from the local symbol index
+symbols = get_symbol_index()
+query = st.text_input("Find a stock", placeholder="Ticker or company name")
+matches = symbols.search(query)
+if matches:
+    col1, col2 = st.columns([4, 1])
+    choice = col1.selectbox(
+        "Matches", matches, label_visibility="collapsed",
+        format_func=lambda r: " | ".join(part for part in (r.ticker, r.name, r.exchange, r.currency) if part),
     )
+    if col2.button("Add"):
+        portfolio.append(choice.ticker, 0.0)
+elif query:
+    st.caption("No match in the symbol list.")
+
+# One editable grid for all rows, one page at a time; an edit writes back only its page
+pages = max(1, -(-len(portfolio) // PAGE_SIZE))
+page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1) - 1 if pages > 1 else 0
+start, stop = page * PAGE_SIZE, min((page + 1) * PAGE_SIZE, len(portfolio))
+page_rows = pd.DataFrame({"ticker": portfolio.tickers[start:stop], "quantity": portfolio.quantities[start:stop]})
+
+# The key changes with the portfolio's version, so an applied edit is never applied twice
+grid_key = f"holdings_grid_{page}_{portfolio.version}"
+
+
+def save_page():
+    edited = apply_editor_changes(page_rows, st.session_state[grid_key])
+    portfolio.splice(start, stop, edited["ticker"], edited["quantity"])
+
+
+st.data_editor(
+    page_rows,
+    key=grid_key,
+    num_rows="dynamic",
+    hide_index=True,
+    use_container_width=True,
+    column_config={
+        "ticker": st.column_config.TextColumn("Stock Ticker"),
+        "quantity": st.column_config.NumberColumn("Quantity", min_value=0.0, step=1.0),
+    },
+    on_change=save_page,
+)
 st.markdown("</div>", unsafe_allow_html=True)
-# Loop through the portfolio and create input fields for stock tickers and quantities.
-# Each stock is represented by a `ticker` and `quantity`, and a unique key is used to identify the input elements.
-
-# Add button to allow users to add another stock to the portfolio
-if st.button("Add Another"):
-    add_stock()
+if pages > 1:
+    st.caption(f"Rows {start + 1}-{stop} of {len(portfolio)}")
 
 # Validation: Ensure that there is at least one valid stock in the portfolio before proceeding
-valid_stocks = [s for s in st.session_state.portfolio if s["ticker"].strip() and s["quantity"] > 0]
+entered = portfolio.tickers[(pd.Series(portfolio.tickers, dtype=str).str.strip() != "").to_numpy()
+                            & (portfolio.quantities > 0)]
+# Indexed tickers are valid by lookup; only the others are checked with the provider, in one batch
+unknown = set(missing_symbols(list(dict.fromkeys(entered[~symbols.contains(entered)]))))
+valid_stocks = [t for t in entered if t not in unknown]
+if unknown:
+    st.warning(f"Unknown symbols, left out of the analysis: {', '.join(sorted(unknown))}")
 
 if valid_stocks:
     st.success("Portfolio ready.")
@@ -0,0 +1,142 @@
+"""
+16. Indicators
+
+Vectorized technical-indicator kernels (SMA, annualized rolling volatility, RSI) that
+work on a whole multi-ticker close panel at once. Rolling windows are built from
+cumulative sums instead of rolling(...).apply(lambda ...), and every ticker is rolled
+over its own trading days, so holidays on other exchanges don't punch holes in it.
+
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _compact(prices: pd.DataFrame):
+    """
+    Move each column's valid values to the bottom of the matrix, keeping their order.
+
+    Returns:
+        tuple: (values, order) where `order` maps compacted rows back to the panel rows.
+    """
+    values = prices.to_numpy(dtype="float64")
+    order = np.argsort(~np.isnan(values), axis=0, kind="stable")
+    return np.take_along_axis(values, order, axis=0), order
+
+
+def _expand(values: np.ndarray, order: np.ndarray, like: pd.DataFrame) -> pd.DataFrame:
+    """Inverse of `_compact`: scatter compacted rows back onto the panel's dates."""
+    out = np.empty_like(values)
+    np.put_along_axis(out, order, values, axis=0)
+    return pd.DataFrame(out, index=like.index, columns=like.columns)
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling sum over the rows of a 2-D array via cumulative sums.
+
+    Windows that contain a NaN are NaN, like pandas' rolling(window).sum().
+    """
+    valid = ~np.isnan(values)
+    zeros = np.zeros((1, values.shape[1]))
+    sums = np.concatenate([zeros, np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        window_sums = sums[window:] - sums[:-window]
+        window_counts = counts[window:] - counts[:-window]
+        out[window - 1:] = np.where(window_counts == window, window_sums, np.nan)
+    return out
+
+
+def _returns(values: np.ndarray) -> np.ndarray:
+    returns = np.full(values.shape, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[1:] = values[1:] / values[:-1] - 1
+    return returns
+
+
+def sma(prices: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Simple moving average of each column.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers.
+        window (int): Number of trading days.
+
+    Returns:
+        pd.DataFrame: Moving averages aligned with `prices`.
+    """
+    values, order = _compact(prices)
+    return _expand(_rolling_sum(values, window) / window, order, prices)
+
+
+def rolling_volatility(prices: pd.DataFrame, window: int = 30,
+                       periods_per_year: Optional[int] = 252) -> pd.DataFrame:
+    """
+    Rolling sample standard deviation of daily returns.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers.
+        window (int): Number of daily returns per window.
+        periods_per_year (int, optional): Annualization factor. None keeps daily units.
+
+    Returns:
+        pd.DataFrame: Rolling volatility aligned with `prices`.
+    """
+    values, order = _compact(prices)
+    returns = _returns(values)
+    sums = _rolling_sum(returns, window)
+    squares = _rolling_sum(returns ** 2, window)
+    variance = np.clip((squares - sums ** 2 / window) / (window - 1), 0, None)
+    volatility = np.sqrt(variance)
+    if periods_per_year:
+        volatility *= np.sqrt(periods_per_year)
+    return _expand(volatility, order, prices)
+
+
+def rsi(prices: pd.DataFrame, window: int = 14) -> pd.DataFrame:
+    """
+    Relative Strength Index from the sums of positive and negative daily returns.
+
+    RS is the sum of gains over the absolute sum of losses in the window (0 when
+    the window has no losses) and RSI = 100 - 100 / (1 + RS), which is the same
+    definition the export tab has always used.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers.
+        window (int): Number of daily returns per window.
+
+    Returns:
+        pd.DataFrame: RSI values aligned with `prices`.
+    """
+    values, order = _compact(prices)
+    returns = _returns(values)
+    missing = np.isnan(returns)
+    gains = _rolling_sum(np.where(missing, np.nan, np.where(returns > 0, returns, 0.0)), window)
+    losses = _rolling_sum(np.where(missing, np.nan, np.where(returns < 0, -returns, 0.0)), window)
+    loss_days = _rolling_sum(np.where(missing, np.nan, (returns < 0).astype("float64")), window)
+    gain_days = _rolling_sum(np.where(missing, np.nan, (returns > 0).astype("float64")), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = np.where(loss_days > 0, np.where(gain_days > 0, gains, 0.0) / losses, 0.0)
+    rs = np.where(np.isnan(loss_days), np.nan, rs)
+    return _expand(100 - 100 / (1 + rs), order, prices)
+
+
+def compute_indicators(prices: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Compute the export tab's technical indicators for a whole close panel.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers.
+
+    Returns:
+        dict: Indicator name ("SMA_50", "SMA_200", "Volatility", "RSI") -> panel.
+    """
+    return {
+        "SMA_50": sma(prices, 50),
+        "SMA_200": sma(prices, 200),
+        "Volatility": rolling_volatility(prices, 30),
+        "RSI": rsi(prices, 14),
+    }
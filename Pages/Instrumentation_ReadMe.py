@@ -0,0 +1,278 @@
+"""
+31. Instrumentation
+
+Lightweight metrics for the hot paths. Timed functions and tab renders record a
+latency histogram and a call count, upstream fetches record calls, tickers and
+payload bytes, and exceptions that are handled instead of raised are counted and
+logged instead of vanishing. Cache hit ratios and request coalescing are read from
+the cache and single-flight counters at export time.
+
+Everything is kept in one process-wide registry and exported as Prometheus text or
+JSON, over a local HTTP endpoint (set $STOCK_DASHBOARD_METRICS_PORT) and in the
+Dashboard's optional debug panel.
+
+"""
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger("stock_dashboard")
+
+# Latency bucket upper bounds in seconds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "latency_seconds": ("histogram", "Wall time of instrumented functions and tab renders"),
+    "calls_total": ("counter", "Calls of instrumented functions and tab renders"),
+    "errors_total": ("counter", "Exceptions raised out of instrumented functions"),
+    "swallowed_exceptions_total": ("counter", "Exceptions caught and handled without re-raising"),
+    "upstream_calls_total": ("counter", "Requests to the market-data provider"),
+    "upstream_tickers_total": ("counter", "Tickers requested from the market-data provider"),
+    "upstream_bytes_total": ("counter", "Payload bytes received from the market-data provider"),
+    "upstream_failures_total": ("counter", "Tickers the market-data provider could not answer"),
+    "cache_lookups_total": ("counter", "Shared cache lookups by tier"),
+    "cache_hit_ratio": ("gauge", "Share of shared cache lookups served from memory or SQLite"),
+    "singleflight_total": ("counter", "Coalesced fetches: led (performed) or shared (waited for)"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf past the last bucket)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> Labels:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, metric: str, amount: float = 1, /, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(metric, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, metric: str, value: float, /, **labels):
+        key = self._labels(labels)
+        with self._lock:
+            self._histograms.setdefault(metric, {}).setdefault(key, _Histogram()).observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # -------------------- EXPORT --------------------
+    def _external(self) -> Dict[str, Dict[Labels, float]]:
+        """Cache and single-flight counters, which those modules keep themselves."""
+        from stock_dashboard.cache import get_cache
+        from stock_dashboard.singleflight import get_single_flight
+
+        lookups, ratios = {}, {}
+        for data_class, stats in get_cache().stats().items():
+            for tier in ("memory_hits", "disk_hits", "misses"):
+                lookups[(("data_class", data_class), ("result", tier))] = stats[tier]
+            ratios[(("data_class", data_class),)] = stats["hit_ratio"]
+        flight = get_single_flight()
+        return {
+            "cache_lookups_total": lookups,
+            "cache_hit_ratio": ratios,
+            "singleflight_total": {(("result", "led"),): flight.led, (("result", "shared"),): flight.shared},
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        All metrics as plain data.
+
+        Returns:
+            dict: "counters" (name -> list of {labels, value}) and "histograms"
+            (name -> list of {labels, count, sum, p50, p95, p99, buckets}).
+        """
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: {k: (list(h.counts), h.sum, h.count, h.quantile(0.5), h.quantile(0.95), h.quantile(0.99))
+                                 for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+        counters.update(self._external())
+        return {
+            "counters": {
+                name: [{"labels": dict(k), "value": v} for k, v in sorted(series.items())]
+                for name, series in sorted(counters.items())
+            },
+            "histograms": {
+                name: [{"labels": dict(k), "count": count, "sum": total, "p50": p50, "p95": p95, "p99": p99,
+                        "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], counts))}
+                       for k, (counts, total, count, p50, p95, p99) in sorted(series.items())]
+                for name, series in sorted(histograms.items())
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2, default=str)
+
+    def to_prometheus(self, prefix: str = "stock_dashboard_") -> str:
+        """All metrics in the Prometheus text exposition format."""
+        def render_labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+            items = list(labels.items()) + ([extra] if extra else [])
+            if not items:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in snapshot["counters"].items():
+            kind, help_text = METRIC_HELP.get(name, ("counter", name))
+            lines += [f"# HELP {prefix}{name} {help_text}", f"# TYPE {prefix}{name} {kind}"]
+            lines += [f"{prefix}{name}{render_labels(s['labels'])} {s['value']}" for s in series]
+        for name, series in snapshot["histograms"].items():
+            kind, help_text = METRIC_HELP.get(name, ("histogram", name))
+            lines += [f"# HELP {prefix}{name} {help_text}", f"# TYPE {prefix}{name} histogram"]
+            for s in series:
+                cumulative = 0
+                for bound, n in s["buckets"].items():
+                    cumulative += n
+                    lines.append(f"{prefix}{name}_bucket{render_labels(s['labels'], ('le', bound))} {cumulative}")
+                lines.append(f"{prefix}{name}_sum{render_labels(s['labels'])} {s['sum']}")
+                lines.append(f"{prefix}{name}_count{render_labels(s['labels'])} {s['count']}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+# -------------------- RECORDING --------------------
+@contextmanager
+def span(name: str, kind: str = "function") -> Iterator[None]:
+    """Time a block: latency histogram, call count and raised exceptions under `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        _registry.inc("errors_total", kind=kind, name=name, exception=type(e).__name__)
+        raise
+    finally:
+        _registry.observe("latency_seconds", time.perf_counter() - start, kind=kind, name=name)
+        _registry.inc("calls_total", kind=kind, name=name)
+
+
+def timed(name: Optional[str] = None, kind: str = "function") -> Callable:
+    """Decorator form of `span`; the name defaults to the function's qualified name."""
+    def decorator(func):
+        metric_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(metric_name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_swallowed(name: str, error: BaseException):
+    """Count and log an exception that the caller handles instead of re-raising."""
+    _registry.inc("swallowed_exceptions_total", name=name, exception=type(error).__name__)
+    logger.warning("%s: handled %s: %s", name, type(error).__name__, error)
+
+
+def record_upstream(provider: str, endpoint: str, tickers: int, nbytes: int = 0, failures: int = 0):
+    """Count one request to the market-data provider."""
+    _registry.inc("upstream_calls_total", provider=provider, endpoint=endpoint)
+    _registry.inc("upstream_tickers_total", tickers, provider=provider, endpoint=endpoint)
+    if nbytes:
+        _registry.inc("upstream_bytes_total", nbytes, provider=provider, endpoint=endpoint)
+    if failures:
+        _registry.inc("upstream_failures_total", failures, provider=provider, endpoint=endpoint)
+
+
+# -------------------- ENDPOINT --------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") in ("", "/metrics"):
+            body, content_type = _registry.to_prometheus(), "text/plain; version=0.0.4"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body, content_type = _registry.to_json(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port: Optional[int] = None, host: str = "127.0.0.1") -> Optional[int]:
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread, once per process.
+
+    Args:
+        port (int, optional): Port to listen on. Defaults to $STOCK_DASHBOARD_METRICS_PORT;
+            without either, nothing is started.
+        host (str): Interface to bind (local only by default).
+
+    Returns:
+        int or None: The port being served, or None when disabled.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server.server_address[1]
+        port = port if port is not None else os.environ.get("STOCK_DASHBOARD_METRICS_PORT")
+        if port in (None, ""):
+            return None
+        try:
+            _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+        except OSError as e:
+            # Another server process already owns the port
+            record_swallowed("serve_metrics", e)
+            return None
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server.server_address[1]
@@ -0,0 +1,388 @@
+"""
+12. MarketData
+
+Shared market-data layer used by every tab. Each ticker's info is fetched once per cache
+lifetime and handed out as a normalized TickerSnapshot, so the tabs no longer call
+yf.Ticker(t).info on their own.
+
+"""
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from stock_dashboard.cache import FUNDAMENTALS, QUOTES, TwoTierCache, get_cache
+from stock_dashboard.concurrent_fetcher import FetchFailure, HydrationResult, hydrate
+from stock_dashboard.instrumentation import record_upstream
+from stock_dashboard.singleflight import get_single_flight
+
+
+@dataclass(frozen=True)
+class TickerSnapshot:
+    """
+    Normalized view of the Yahoo Finance info payload for one ticker.
+
+    Missing numeric fields are NaN (price fields default to 0 so that
+    unpriced holdings drop out of the portfolio like before).
+    """
+    ticker: str
+    price: float = 0.0
+    previous_close: float = np.nan
+    dividend_yield: float = 0.0
+    fifty_two_week_high: float = np.nan
+    fifty_two_week_low: float = np.nan
+    beta: float = np.nan
+    trailing_pe: float = np.nan
+    forward_eps: float = np.nan
+    market_cap: float = np.nan
+    price_to_book: float = np.nan
+    sector: str = "Unknown"
+    industry: str = "Unknown"
+    exchange: str = ""
+    currency: str = "USD"
+    name: str = ""
+
+    @property
+    def daily_change_pct(self) -> float:
+        """Percent change of the current price against the previous close."""
+        if not self.previous_close:
+            return np.nan
+        return (self.price - self.previous_close) / self.previous_close * 100
+
+
+def _to_float(value: Any, default: float = np.nan) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def snapshot_from_info(ticker: str, info: Dict[str, Any]) -> TickerSnapshot:
+    """
+    Build a TickerSnapshot from a raw yfinance info dictionary.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        info (dict): The raw info payload (may be empty).
+
+    Returns:
+        TickerSnapshot: The normalized snapshot.
+    """
+    info = info or {}
+    return TickerSnapshot(
+        ticker=ticker,
+        price=_to_float(info.get("regularMarketPrice"), 0.0),
+        previous_close=_to_float(info.get("previousClose")),
+        dividend_yield=_to_float(info.get("dividendYield"), 0.0),
+        fifty_two_week_high=_to_float(info.get("fiftyTwoWeekHigh")),
+        fifty_two_week_low=_to_float(info.get("fiftyTwoWeekLow")),
+        beta=_to_float(info.get("beta")),
+        trailing_pe=_to_float(info.get("trailingPE")),
+        forward_eps=_to_float(info.get("forwardEps")),
+        market_cap=_to_float(info.get("marketCap")),
+        price_to_book=_to_float(info.get("priceToBook")),
+        sector=info.get("sector") or "Unknown",
+        industry=info.get("industry") or "Unknown",
+        exchange=info.get("exchange") or "",
+        currency=info.get("currency") or "USD",
+        name=info.get("longName") or info.get("shortName") or "",
+    )
+
+
+# -------------------- PROVIDERS --------------------
+class MarketDataProvider:
+    """
+    Interface for market-data backends.
+
+    Set `supports_batch` to True when `fetch_info` can answer many tickers in
+    a single call; otherwise the service calls it one ticker at a time.
+    """
+    supports_batch = False
+
+    def fetch_info(self, tickers: List[str]) -> HydrationResult:
+        """
+        Fetch raw info payloads.
+
+        Args:
+            tickers (list): Ticker symbols to fetch.
+
+        Returns:
+            HydrationResult: `results` maps ticker -> info dictionary, with tickers that
+            failed omitted; `failures` says why, where the provider knows.
+        """
+        raise NotImplementedError
+
+    def fetch_history(self, tickers: List[str], start=None, end=None) -> Dict[str, pd.DataFrame]:
+        """
+        Fetch adjusted daily OHLCV bars.
+
+        Args:
+            tickers (list): Ticker symbols to fetch.
+            start (date-like, optional): First date to include. None fetches the full history.
+            end (date-like, optional): Exclusive end date. None fetches up to today.
+
+        Returns:
+            dict: Ticker -> DataFrame indexed by tz-naive "Date" with Open, High, Low,
+            Close and Volume columns. Tickers that failed are omitted.
+        """
+        raise NotImplementedError
+
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def normalize_bars(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring a daily bar frame into the canonical store layout: tz-naive "Date"
+    index at midnight, OHLCV columns only, sorted and without empty rows.
+    """
+    bars = bars.reindex(columns=OHLCV_COLUMNS).dropna(subset=["Close"])
+    index = pd.DatetimeIndex(bars.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    bars.index = index.normalize().rename("Date")
+    bars = bars[~bars.index.duplicated(keep="last")]
+    return bars.sort_index().astype("float64")
+
+
+class YahooProvider(MarketDataProvider):
+    """
+    Live Yahoo Finance backend built on yfinance.
+
+    Yahoo has no batched info endpoint, so a batch is hydrated concurrently:
+    see `concurrent_fetcher.hydrate` for the meaning of the arguments.
+    """
+    supports_batch = True
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 10.0, retries: int = 2, backoff: float = 0.5):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def fetch_info(self, tickers):
+        return hydrate(
+            tickers, lambda t: yf.Ticker(t).info, max_concurrency=self.max_concurrency,
+            timeout=self.timeout, retries=self.retries, backoff=self.backoff,
+        )
+
+    def fetch_history(self, tickers, start=None, end=None):
+        if start is None and end is None:
+            period = "max"
+        else:
+            period, start = None, start or "1900-01-01"
+        data = yf.download(
+            tickers, start=start, end=end, period=period,
+            auto_adjust=True, group_by="ticker", progress=False, threads=True,
+        )
+        histories = {}
+        if data.empty:
+            return histories
+        for ticker in tickers:
+            try:
+                bars = data[ticker] if isinstance(data.columns, pd.MultiIndex) else data
+            except KeyError:
+                continue
+            bars = normalize_bars(bars)
+            if not bars.empty:
+                histories[ticker] = bars
+        return histories
+
+
+class LocalProvider(MarketDataProvider):
+    """
+    Offline backend serving pre-recorded info payloads and daily bars.
+
+    Args:
+        infos (dict): Ticker -> info dictionary.
+        histories (dict): Ticker -> daily OHLCV DataFrame.
+    """
+    supports_batch = True
+
+    def __init__(self, infos: Optional[Dict[str, Dict[str, Any]]] = None,
+                 histories: Optional[Dict[str, pd.DataFrame]] = None):
+        self.infos = dict(infos or {})
+        self.histories = {t: normalize_bars(h) for t, h in (histories or {}).items()}
+        self.calls = 0
+
+    def fetch_info(self, tickers):
+        self.calls += 1
+        return HydrationResult({t: dict(self.infos[t]) for t in tickers if t in self.infos})
+
+    def fetch_history(self, tickers, start=None, end=None):
+        self.calls += 1
+        histories = {}
+        for ticker in tickers:
+            bars = self.histories.get(ticker)
+            if bars is None:
+                continue
+            if start is not None:
+                bars = bars[bars.index >= pd.Timestamp(start)]
+            if end is not None:
+                bars = bars[bars.index < pd.Timestamp(end)]
+            histories[ticker] = bars.copy()
+        return histories
+
+    # -------------------- FIXTURES --------------------
+    @classmethod
+    def from_directory(cls, path: str) -> "LocalProvider":
+        """
+        Load an offline fixture: `info.json` (ticker -> info) plus one
+        `prices/<ticker>.parquet` (or .csv with a Date column) per ticker.
+        """
+        with open(os.path.join(path, "info.json")) as f:
+            infos = json.load(f)
+        histories = {}
+        prices_dir = os.path.join(path, "prices")
+        for name in sorted(os.listdir(prices_dir)) if os.path.isdir(prices_dir) else []:
+            stem, ext = os.path.splitext(name)
+            file_path = os.path.join(prices_dir, name)
+            if ext == ".parquet":
+                histories[unquote(stem)] = pd.read_parquet(file_path)
+            elif ext == ".csv":
+                histories[unquote(stem)] = pd.read_csv(file_path, index_col="Date", parse_dates=True)
+        return cls(infos, histories)
+
+    def save(self, path: str):
+        """Write the provider's data as a fixture readable by `from_directory`."""
+        os.makedirs(os.path.join(path, "prices"), exist_ok=True)
+        with open(os.path.join(path, "info.json"), "w") as f:
+            json.dump(self.infos, f, indent=2, default=str)
+        for ticker, bars in self.histories.items():
+            bars.to_parquet(os.path.join(path, "prices", f"{quote(ticker, safe='')}.parquet"))
+
+
+# -------------------- SERVICE --------------------
+class MarketDataService:
+    """
+    Fetches each ticker's info at most once per cache lifetime and shares the
+    resulting snapshots between tabs and server processes.
+
+    Full snapshots are cached as QUOTES (minutes); the same snapshots are also
+    cached as FUNDAMENTALS (days) for callers that only need sector, currency,
+    exchange and the other slow-moving fields.
+
+    Args:
+        provider (MarketDataProvider): Backend to fetch from. Defaults to Yahoo.
+        cache (TwoTierCache): Cache to use. Defaults to the shared process cache.
+    """
+
+    def __init__(self, provider: Optional[MarketDataProvider] = None, cache: Optional[TwoTierCache] = None):
+        self.provider = provider or YahooProvider()
+        self.cache = cache or get_cache()
+        self._lock = threading.Lock()
+        # Ticker -> why its last fetch failed (cleared once a fetch succeeds)
+        self.failures: Dict[str, FetchFailure] = {}
+
+    @staticmethod
+    def _key(ticker: str) -> str:
+        return f"snapshot:{ticker}"
+
+    def set_provider(self, provider: MarketDataProvider):
+        """Swap the backend and drop every snapshot fetched from the previous one."""
+        with self._lock:
+            self.provider = provider
+            self.cache.clear(QUOTES)
+            self.cache.clear(FUNDAMENTALS)
+            self.failures.clear()
+
+    def invalidate(self, tickers: Optional[Iterable[str]] = None):
+        """Force the given tickers (or all tickers) to be refetched on next access."""
+        if tickers is None:
+            self.cache.clear(QUOTES)
+        else:
+            self.cache.delete(QUOTES, [self._key(t) for t in tickers])
+
+    def _fetch(self, tickers: List[str]) -> Dict[str, TickerSnapshot]:
+        """Fetch snapshots from the provider and cache them."""
+        failures = {}
+        provider = type(self.provider).__name__
+        batches = [tickers] if self.provider.supports_batch else [[t] for t in tickers]
+        infos = {}
+        for batch in batches:
+            fetched = self.provider.fetch_info(batch)
+            answered = fetched.results
+            failures.update(fetched.failures)
+            infos.update(answered)
+            record_upstream(provider, "info", len(batch), failures=len(batch) - len(answered),
+                            nbytes=sum(len(json.dumps(info, default=str)) for info in answered.values()))
+
+        snapshots = {t: snapshot_from_info(t, infos.get(t, {})) for t in tickers}
+        with self._lock:
+            for ticker in tickers:
+                if ticker in infos:
+                    self.failures.pop(ticker, None)
+                else:
+                    self.failures[ticker] = failures.get(ticker, FetchFailure(ticker, "no data returned", 1))
+        self.cache.set_many(QUOTES, {self._key(t): s for t, s in snapshots.items()})
+        # Only real answers are kept for days; failed tickers are retried with the quotes
+        self.cache.set_many(FUNDAMENTALS, {self._key(t): s for t, s in snapshots.items() if t in infos})
+        return snapshots
+
+    def _lookup(self, data_class: str, tickers: Iterable[str]) -> Dict[str, TickerSnapshot]:
+        tickers = list(dict.fromkeys(tickers))
+        keys = [self._key(t) for t in tickers]
+        hits = self.cache.get_many(data_class, keys)
+        if data_class == FUNDAMENTALS and len(hits) < len(keys):
+            # A ticker fetched (or failed) within the quote TTL is served from QUOTES, not refetched
+            hits.update(self.cache.get_many(QUOTES, [k for k in keys if k not in hits]))
+        snapshots = {t: hits[self._key(t)] for t in tickers if self._key(t) in hits}
+        missing = [t for t in tickers if t not in snapshots]
+        if missing:
+            # Tickers another session is already fetching are waited for, not refetched
+            fetched = get_single_flight().do_many(
+                [("snapshot", t) for t in missing],
+                lambda keys: {("snapshot", t): s for t, s in self._fetch([k[1] for k in keys]).items()},
+            )
+            snapshots.update({key[1]: snapshot for key, snapshot in fetched.items()})
+        return {t: snapshots[t] for t in tickers}
+
+    def get_snapshots(self, tickers: Iterable[str]) -> Dict[str, TickerSnapshot]:
+        """
+        Return current snapshots for the given tickers, fetching only stale ones.
+
+        Args:
+            tickers (iterable): Ticker symbols.
+
+        Returns:
+            dict: Ticker -> TickerSnapshot, in input order. Tickers the provider
+            could not answer get an empty snapshot (price 0).
+        """
+        return self._lookup(QUOTES, tickers)
+
+    def get_fundamentals(self, tickers: Iterable[str]) -> Dict[str, TickerSnapshot]:
+        """
+        Like `get_snapshots`, but served from the long-lived FUNDAMENTALS cache.
+
+        Only use the slow-moving fields (sector, industry, exchange, currency, ...)
+        of the result; its price fields may be days old.
+        """
+        return self._lookup(FUNDAMENTALS, tickers)
+
+    def get_snapshot(self, ticker: str) -> TickerSnapshot:
+        """Return the snapshot for a single ticker."""
+        return self.get_snapshots([ticker])[ticker]
+
+    def snapshots_frame(self, tickers: Iterable[str]) -> pd.DataFrame:
+        """
+        Return the snapshots for the given tickers as a DataFrame indexed by ticker.
+        """
+        snapshots = self.get_snapshots(tickers)
+        frame = pd.DataFrame([vars(s) for s in snapshots.values()])
+        return frame.set_index("ticker") if not frame.empty else frame
+
+
+_service: Optional[MarketDataService] = None
+
+
+def get_market_data_service() -> MarketDataService:
+    """Return the process-wide MarketDataService shared by all tabs."""
+    global _service
+    if _service is None:
+        _service = MarketDataService()
+    return _service
@@ -0,0 +1,117 @@
+"""
+14. Metrics
+
+Vectorized metrics engine for the Price Change tab. Takes one wide price matrix
+(dates x tickers) and computes every horizon return, rolling volatility, running-max
+drawdown and distance from the 52-week high in a single NumPy pass over the rows.
+
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from stock_dashboard.price_store import period_start, trading_days
+
+# Column label -> yfinance-style period, as used by the Price Change tab
+DEFAULT_HORIZONS = {"1D %": "2d", "1W %": "7d", "1M %": "30d"}
+
+
+def _bottom_align(prices: pd.DataFrame):
+    """
+    Push each column's valid values to the bottom of the matrix, keeping their order.
+
+    Tickers trade on different calendars, so a wide panel has holes. After
+    alignment the last row holds every ticker's latest bar and row -n holds the
+    bar n trading days back for that ticker, which matches how yfinance counts
+    "Nd" periods per ticker.
+
+    Returns:
+        tuple: (values, dates, first_valid) where `values` and `dates` are T x N
+        arrays and `first_valid` is the first row holding data in each column.
+    """
+    values = prices.to_numpy(dtype="float64")
+    valid = ~np.isnan(values)
+    order = np.argsort(valid, axis=0, kind="stable")
+    values = np.take_along_axis(values, order, axis=0)
+    dates = np.take_along_axis(
+        np.broadcast_to(prices.index.to_numpy(dtype="datetime64[ns]")[:, None], values.shape), order, axis=0
+    )
+    first_valid = len(values) - valid.sum(axis=0)
+    return values, dates, first_valid
+
+
+def _start_rows(period: str, dates: np.ndarray, first_valid: np.ndarray) -> np.ndarray:
+    """Return, per column, the row where a period-based window starts."""
+    n_rows = len(dates)
+    n_days = trading_days(period)
+    if period == "max":
+        return first_valid
+    if n_days is not None:
+        return np.maximum(n_rows - n_days, first_valid)
+    last_date = pd.Timestamp(dates[-1].max())
+    cutoff = np.datetime64(period_start(period, last_date))
+    in_window = (dates >= cutoff) & (np.arange(n_rows)[:, None] >= first_valid)
+    return np.where(in_window.any(axis=0), in_window.argmax(axis=0), n_rows - 1)
+
+
+def compute_price_metrics(prices: pd.DataFrame, horizons: Optional[Dict[str, str]] = None,
+                          volatility_window: int = 30, drawdown_window: int = 90,
+                          last_prices: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Compute return, volatility, drawdown and 52-week-high metrics for every ticker at once.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers.
+        horizons (dict): Column label -> period ("2d", "7d", "6mo", "1y", "max", ...).
+            Defaults to the 1D/1W/1M columns of the Price Change tab.
+        volatility_window (int): Trading days used for the volatility column.
+        drawdown_window (int): Trading days used for the max drawdown column.
+        last_prices (pd.Series, optional): Current price per ticker for the distance
+            from the 52-week high. Defaults to each ticker's latest close.
+
+    Returns:
+        pd.DataFrame: One row per ticker with the horizon returns (%),
+        "Volatility (30d)" (% daily std dev), "Max Drawdown (90d)" (%),
+        "52W High" (highest close over the last year) and "From 52W High" (%).
+    """
+    horizons = DEFAULT_HORIZONS if horizons is None else horizons
+    tickers = prices.columns
+    if prices.empty:
+        return pd.DataFrame(index=tickers)
+
+    values, dates, first_valid = _bottom_align(prices.sort_index())
+    columns = np.arange(values.shape[1])
+    last = values[-1]
+    metrics = {}
+
+    # Horizon returns: last bar against the first bar of each window
+    for label, period in horizons.items():
+        base = values[_start_rows(period, dates, first_valid), columns]
+        metrics[label] = (last - base) / base * 100
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Volatility: population std dev of daily returns in the window
+        window = values[-volatility_window:]
+        returns = window[1:] / window[:-1] - 1
+        counts = (~np.isnan(returns)).sum(axis=0)
+        safe = np.where(counts > 0, counts, 1)
+        mean = np.nansum(returns, axis=0) / safe
+        variance = np.nansum((returns - mean) ** 2, axis=0) / safe
+        metrics[f"Volatility ({volatility_window}d)"] = np.where(counts > 0, np.sqrt(variance) * 100, np.nan)
+
+        # Max drawdown: worst distance below the running max in the window
+        window = values[-drawdown_window:]
+        running_max = np.fmax.accumulate(window, axis=0)
+        drawdown = np.where(np.isnan(window), np.inf, window / running_max - 1)
+        worst = drawdown.min(axis=0)
+        metrics[f"Max Drawdown ({drawdown_window}d)"] = np.where(np.isinf(worst), np.nan, worst * 100)
+
+        # 52-week high and the distance of the current price from it
+        year_rows = np.arange(len(values))[:, None] >= _start_rows("1y", dates, first_valid)
+        high = np.where(year_rows & ~np.isnan(values), values, -np.inf).max(axis=0)
+        high = np.where(np.isinf(high), np.nan, high)
+        current = last if last_prices is None else last_prices.reindex(tickers).to_numpy(dtype="float64")
+        metrics["52W High"] = high
+        metrics["From 52W High"] = (current - high) / high * 100
+
+    return pd.DataFrame(metrics, index=tickers)
@@ -9,13 +9,23 @@ This file contains the code to render the portfolio overview, including metrics
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-import yfinance as yf
-import numpy as np
-import pandas as pd
 from stock_dashboard.Get_stock_region import stock_region_diversification
+from stock_dashboard.analytics import overview_metrics
+from stock_dashboard.cache import DAILY_BARS, cached
+from stock_dashboard.portfolio_history import portfolio_vs_benchmark
+from stock_dashboard.tab_registry import requires
+
+### Historical portfolio performance
+@cached(DAILY_BARS)
+def get_historical_values(qty_dict, period="30d"):
+    # Aligned close panel @ quantity vector; other exchanges' holidays are forward-filled
+    combined = portfolio_vs_benchmark(qty_dict, benchmark="SPY", period=period)
+    return combined.rename(columns={"SPY Value": "S&P 500 (SPY)"})
+
 
 ### Portfolio Overview
 
+@requires("valued_holdings", "fig_alloc", "fig_region", "total_value")
 def render_overview_tab(df, fig_alloc, fig_region, total_value):
     ### Styling the App Interface
     st.markdown("""
@@ -54,44 +64,12 @@ def render_overview_tab(df, fig_alloc, fig_region, total_value):
     st.title("Portfolio Overview")
 
     ### Calculating Portfolio Metrics
-    df = df.copy()
-    df["prev_close"] = df["ticker"].apply(lambda t: yf.Ticker(t).info.get("previousClose", np.nan))
-    df["daily_change_pct"] = ((df["price"] - df["prev_close"]) / df["prev_close"]) * 100
-    portfolio_daily_change = np.average(df["daily_change_pct"], weights=df["value"])
-
-    ### Calculating volatility 
-    @st.cache_data
-    def get_volatility(ticker):
-        try:
-            hist = yf.Ticker(ticker).history(period="30d")
-            returns = hist["Close"].pct_change().dropna()
-            return np.std(returns)
-        except:
-            return np.nan
-    df["volatility"] = df["ticker"].apply(get_volatility)
-    portfolio_volatility = np.average(df["volatility"], weights=df["value"])
-
-    
-    
-    ### Calculating divident yield
-    df["div_yield"] = df["ticker"].apply(lambda t: yf.Ticker(t).info.get("dividendYield", 0))
-    weighted_div_yield = np.average(df["div_yield"].fillna(0), weights=df["value"])
-
-    ### Sector Allocation
-    @st.cache_data
-    def get_sectors(tickers):
-        sector_map = {}
-        for ticker in tickers:
-            try:
-                info = yf.Ticker(ticker).info
-                sector_map[ticker] = info.get("sector", "Unknown")
-            except:
-                sector_map[ticker] = "Unknown"
-        return sector_map
-    sector_map = get_sectors(df["ticker"].tolist())
-    df["sector"] = df["ticker"].map(sector_map)
-    sector_count = df["sector"].nunique()
-    top_holding = df.loc[df['value'].idxmax()]["ticker"] if not df.empty else "N/A"
+    metrics, df = overview_metrics(df)
+    portfolio_daily_change = metrics["daily_change_pct"]
+    portfolio_volatility = metrics["volatility"]
+    weighted_div_yield = metrics["dividend_yield"]
+    sector_count = metrics["sector_count"]
+    top_holding = metrics["top_holding"]
 
     ### Displaying Portfolio Metrics
     st.markdown(f"""
@@ -143,26 +121,8 @@ def render_overview_tab(df, fig_alloc, fig_region, total_value):
     update_plot_style(fig_sector)
 
     # ----- HISTORICAL PORTFOLIO PERFORMANCE -----
-    @st.cache_data(show_spinner=True)
-    def get_historical_values(tickers, qty_dict):
-        hist_df = pd.DataFrame()
-        for ticker in tickers:
-            try:
-                hist = yf.Ticker(ticker).history(period="30d")["Close"]
-                hist_df[ticker] = hist * qty_dict[ticker]
-            except:
-                continue
-        hist_df["portfolio"] = hist_df.sum(axis=1)
-        spy = yf.Ticker("SPY").history(period="30d")["Close"]
-        combined = pd.DataFrame({
-            "Date": hist_df.index,
-            "Portfolio Value": hist_df["portfolio"] / hist_df["portfolio"].iloc[0],
-            "S&P 500 (SPY)": spy / spy.iloc[0]
-        }).dropna()
-        return combined
-        
     ### Portfolio vs S&P Performance
-    hist_chart_data = get_historical_values(df["ticker"].tolist(), tickers_qty)
+    hist_chart_data = get_historical_values(df.groupby("ticker")["quantity"].sum().to_dict())
     fig_hist = go.Figure()
     fig_hist.add_trace(go.Scatter(
         x=hist_chart_data["Date"],
@@ -0,0 +1,110 @@
+"""
+22. PortfolioHistory
+
+Portfolio value over time as one matrix-vector product: the holdings' close panel is
+aligned onto a single calendar and multiplied by the quantity vector. Calendar
+alignment is explicit, so holdings on different exchanges (7203.T next to AAPL) are
+either forward-filled across each other's holidays or restricted to common trading
+days instead of leaving NaN holes in the sum. Prices are converted to USD at each
+date's FX rate before they are summed.
+
+"""
+from typing import Dict, Optional, Union
+
+import pandas as pd
+from stock_dashboard.fx import to_usd
+from stock_dashboard.market_data import get_market_data_service
+from stock_dashboard.price_store import get_price_store
+
+UNION = "union"
+INTERSECTION = "intersection"
+
+
+def align_panel(prices: pd.DataFrame, how: str = UNION, fill: Optional[str] = "ffill",
+                limit: Optional[int] = None) -> pd.DataFrame:
+    """
+    Put every column of a close panel on one calendar.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers (NaN where a ticker did not trade).
+        how (str): UNION keeps every date any ticker traded; INTERSECTION keeps only
+            dates on which all of them traded.
+        fill (str, optional): "ffill" carries the last close over another exchange's
+            trading days (union only). None leaves those gaps, which drops the date.
+        limit (int, optional): Maximum number of consecutive dates to forward-fill.
+
+    Returns:
+        pd.DataFrame: Panel without missing values. Dates before every ticker has a
+        first price are dropped.
+    """
+    if how not in (UNION, INTERSECTION):
+        raise ValueError(f"how must be '{UNION}' or '{INTERSECTION}', got {how!r}")
+    panel = prices.sort_index()
+    if how == UNION and fill == "ffill":
+        panel = panel.ffill(limit=limit)
+    elif fill not in (None, "ffill"):
+        raise ValueError(f"Unsupported fill policy: {fill!r}")
+    return panel.dropna(how="any")
+
+
+def portfolio_values(prices: pd.DataFrame, quantities: Union[pd.Series, Dict[str, float]],
+                     how: str = UNION, fill: Optional[str] = "ffill", limit: Optional[int] = None) -> pd.Series:
+    """
+    Daily portfolio value from a close panel and the quantity held of each ticker.
+
+    Args:
+        prices (pd.DataFrame): Closing prices, dates x tickers.
+        quantities (pd.Series or dict): Quantity by ticker. Tickers without prices are ignored.
+        how, fill, limit: Calendar alignment, see `align_panel`.
+
+    Returns:
+        pd.Series: Portfolio value by date.
+    """
+    quantities = pd.Series(quantities, dtype="float64")
+    columns = prices.columns.intersection(quantities.index)
+    panel = align_panel(prices[columns], how, fill, limit)
+    values = panel.to_numpy(dtype="float64") @ quantities.reindex(columns).to_numpy()
+    return pd.Series(values, index=panel.index, name="portfolio")
+
+
+def portfolio_vs_benchmark(quantities: Union[pd.Series, Dict[str, float]], benchmark: str = "SPY",
+                           period: Optional[str] = "30d", start=None, how: str = UNION,
+                           fill: Optional[str] = "ffill", limit: Optional[int] = None,
+                           currencies: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Portfolio and benchmark value over a window, both normalized to 1 on the first date.
+
+    Args:
+        quantities (pd.Series or dict): Quantity by ticker.
+        benchmark (str): Benchmark ticker.
+        period (str, optional): Window such as "30d", "6mo", "1y", "5y" or "max".
+        start (date-like, optional): Start date instead of a period.
+        how, fill, limit: Calendar alignment, see `align_panel`. The benchmark is
+            carried forward onto the portfolio's dates.
+        currencies (dict, optional): Ticker -> quote currency. Looked up if omitted.
+
+    Returns:
+        pd.DataFrame: Columns "Date", "Portfolio Value" and "<benchmark> Value"
+        (empty when there is no overlapping history).
+    """
+    quantities = pd.Series(quantities, dtype="float64")
+    quantities = quantities.groupby(level=0).sum()
+    prices = get_price_store().close_panel(list(quantities.index) + [benchmark], period=period, start=start)
+    columns = ["Date", "Portfolio Value", f"{benchmark} Value"]
+    if prices.columns.intersection(quantities.index).empty or benchmark not in prices:
+        return pd.DataFrame(columns=columns)
+
+    if currencies is None:
+        snapshots = get_market_data_service().get_fundamentals(list(quantities.index))
+        currencies = {t: s.currency for t, s in snapshots.items()}
+    # Tickers whose currency has no USD rate are left out rather than valued as USD
+    holdings = to_usd(prices[prices.columns.intersection(quantities.index)], currencies).dropna(axis=1, how="all")
+    values = portfolio_values(holdings, quantities, how, fill, limit)
+    bench = prices[benchmark].dropna()
+    bench = bench.reindex(values.index.union(bench.index)).ffill().reindex(values.index)
+    combined = pd.DataFrame({
+        "Date": values.index,
+        "Portfolio Value": values / values.iloc[0] if len(values) else values,
+        f"{benchmark} Value": bench / bench.dropna().iloc[0] if bench.notna().any() else bench,
+    }).dropna()
+    return combined.reset_index(drop=True)
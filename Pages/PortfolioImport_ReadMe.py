@@ -0,0 +1,286 @@
+"""
+34. PortfolioImport
+
+Bulk import of holdings from CSV, Excel and broker position exports. The header row
+is located below any preamble the broker writes (account name, export date), the
+ticker and quantity columns are recognized by their common names, and cash, total
+and footer rows are skipped.
+
+Tickers are normalized (case, whitespace, "LSE:VOD"-style exchange prefixes, "BRK/B"
+share classes) and quantities parsed ("1,250", "(10)") with vectorized string
+operations, rows are validated in one pass and repeated tickers are merged. Symbols
+are then checked against the symbol index, and the ones it does not know with one
+batched snapshot lookup, which also primes the quotes the Dashboard values the
+portfolio with.
+
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from io import BytesIO, StringIO
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from stock_dashboard.market_data import MarketDataService, get_market_data_service
+from stock_dashboard.portfolio import HOLDINGS_COLUMNS, Portfolio
+from stock_dashboard.symbol_index import SYMBOL, get_symbol_index, resolved
+
+# Column names used by spreadsheets and broker exports (Fidelity, Schwab, Vanguard,
+# Interactive Brokers, Trading 212, ...), compared lowercased and stripped
+TICKER_COLUMNS = ["ticker", "symbol", "ticker symbol", "instrument symbol", "epic", "code", "stock"]
+QUANTITY_COLUMNS = ["quantity", "qty", "qty (quantity)", "shares", "no. of shares", "number of shares",
+                    "units", "position", "current quantity", "holding"]
+
+# Rows of a positions export that are not securities
+NON_SECURITY = re.compile(r"^(CASH\b.*|.*\*\*$|PENDING ACTIVITY|ACCOUNT TOTAL|TOTAL.*|--)$")
+
+# "EXCHANGE:SYMBOL" prefixes -> Yahoo suffix
+EXCHANGE_SUFFIXES = {
+    "NASDAQ": "", "NYSE": "", "NYSEARCA": "", "AMEX": "", "BATS": "",
+    "LSE": ".L", "LON": ".L", "XETRA": ".DE", "ETR": ".DE", "FRA": ".F", "EPA": ".PA",
+    "AMS": ".AS", "EBR": ".BR", "BIT": ".MI", "BME": ".MC", "SWX": ".SW", "STO": ".ST",
+    "TSE": ".T", "TYO": ".T", "HKG": ".HK", "HKEX": ".HK", "TSX": ".TO", "ASX": ".AX",
+    "NSE": ".NS", "BSE": ".BO", "KRX": ".KS",
+}
+
+HEADER_SCAN_ROWS = 30
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xls")
+
+# Rejection reasons
+NOT_A_SECURITY = "not a security"
+INVALID_SYMBOL = "invalid symbol"
+INVALID_QUANTITY = "invalid quantity"
+UNKNOWN_SYMBOL = "unknown symbol"
+
+
+class HoldingsImportError(ValueError):
+    """The file could not be read as a holdings table."""
+
+
+@dataclass
+class ImportResult:
+    """
+    Outcome of an import.
+
+    Attributes:
+        holdings (pd.DataFrame): "ticker" and "quantity", one row per ticker.
+        rejected (pd.DataFrame): "row" (1-based data row), "ticker", "quantity" and "reason".
+        merged (int): Rows folded into an earlier row of the same ticker.
+        columns (tuple): The (ticker, quantity) columns that were read.
+    """
+    holdings: pd.DataFrame
+    rejected: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=["row", "ticker", "quantity", "reason"]))
+    merged: int = 0
+    columns: Tuple[str, str] = ("ticker", "quantity")
+
+
+# -------------------- READING --------------------
+def _header_index(rows: List[List[Any]]) -> Optional[int]:
+    """Index of the first row naming both a ticker and a quantity column."""
+    for i, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+        cells = {str(c).strip().lower() for c in row if c is not None}
+        if cells & set(TICKER_COLUMNS) and cells & set(QUANTITY_COLUMNS):
+            return i
+    return None
+
+
+def read_table(file, name: Optional[str] = None) -> pd.DataFrame:
+    """
+    Read a holdings file as text columns, starting at its header row.
+
+    Args:
+        file: Path or binary file object (e.g. a Streamlit upload).
+        name (str, optional): File name, for the format. Defaults to the path or `file.name`.
+
+    Returns:
+        pd.DataFrame: Every column as strings (no values parsed yet).
+
+    Raises:
+        HoldingsImportError: If no ticker/quantity header row is found.
+    """
+    name = name or (file if isinstance(file, str) else getattr(file, "name", "")) or ""
+    data = file.read() if hasattr(file, "read") else open(file, "rb").read()
+
+    if name.lower().endswith(EXCEL_EXTENSIONS):
+        sheet = pd.read_excel(BytesIO(data), header=None, dtype=str)
+        header = _header_index(sheet.values.tolist())
+        if header is None:
+            raise HoldingsImportError(f"{os.path.basename(name)}: no ticker and quantity columns found")
+        table = sheet.iloc[header + 1:].reset_index(drop=True)
+        table.columns = [str(c).strip() for c in sheet.iloc[header]]
+        return table
+
+    text = data.decode("utf-8-sig", errors="replace")
+    lines = text.splitlines()
+    sniffed = [re.split(r"[,;\t]", line.replace('"', "")) for line in lines[:HEADER_SCAN_ROWS]]
+    header = _header_index(sniffed)
+    if header is None:
+        raise HoldingsImportError(f"{os.path.basename(name) or 'file'}: no ticker and quantity columns found")
+    separator = max([",", ";", "\t"], key=lines[header].count)
+    table = pd.read_csv(StringIO("\n".join(lines[header:])), sep=separator, dtype=str,
+                        skip_blank_lines=True, on_bad_lines="skip", index_col=False)
+    table.columns = [str(c).strip() for c in table.columns]
+    return table
+
+
+def find_columns(columns: Iterable[str]) -> Tuple[str, str]:
+    """
+    Pick the ticker and quantity columns, by the first matching name in
+    TICKER_COLUMNS and QUANTITY_COLUMNS.
+
+    Raises:
+        HoldingsImportError: If either is missing.
+    """
+    by_name = {str(c).strip().lower(): c for c in columns}
+    ticker = next((by_name[c] for c in TICKER_COLUMNS if c in by_name), None)
+    quantity = next((by_name[c] for c in QUANTITY_COLUMNS if c in by_name), None)
+    if ticker is None or quantity is None:
+        raise HoldingsImportError(f"Need a ticker and a quantity column; found {', '.join(map(str, columns))}")
+    return ticker, quantity
+
+
+# -------------------- NORMALIZING --------------------
+def normalize_tickers(tickers: pd.Series) -> pd.Series:
+    """
+    Yahoo-style symbols: stripped, upper case, "LSE:VOD" -> "VOD.L" and
+    "BRK/B" or "BRK B" -> "BRK-B". Missing values become "".
+    """
+    tickers = tickers.fillna("").astype(str).str.strip().str.upper()
+    prefixed = tickers.str.extract(r"^([A-Z]+):(.+)$")
+    suffixes = prefixed[0].map(EXCHANGE_SUFFIXES)
+    known = suffixes.notna()
+    tickers = tickers.where(~known, prefixed[1] + suffixes)
+    return tickers.str.replace(r"^([A-Z]{1,5})[/ ]([A-Z])$", r"\1-\2", regex=True)
+
+
+def parse_quantities(quantities: pd.Series) -> pd.Series:
+    """Numbers from export text: "1,250.5", "(10)" (negative) and "12 shares"; NaN otherwise."""
+    text = quantities.fillna("").astype(str).str.strip()
+    text = text.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    text = text.str.replace(r"[,\s]|shares?$", "", regex=True, flags=re.IGNORECASE)
+    return pd.to_numeric(text, errors="coerce")
+
+
+# -------------------- VALIDATION --------------------
+def missing_symbols(tickers: List[str], service: Optional[MarketDataService] = None) -> List[str]:
+    """
+    Tickers that are neither in the symbol index nor known to the market data provider.
+
+    Indexed tickers are accepted by lookup; the rest are checked with one batched
+    snapshot lookup (cached as quotes, so the Dashboard does not fetch them again) and
+    the ones that resolve are added to the index.
+    """
+    index = get_symbol_index()
+    unindexed = [t for t, known in zip(tickers, index.contains(tickers)) if not known]
+    if not unindexed:
+        return []
+    service = service or get_market_data_service()
+    snapshots = service.get_snapshots(unindexed)
+    index.learn(snapshots.values())
+    return [t for t in unindexed if t in service.failures or not resolved(snapshots[t])]
+
+
+def validate_holdings(tickers: pd.Series, quantities: pd.Series, check_symbols: bool = True,
+                      service: Optional[MarketDataService] = None) -> ImportResult:
+    """
+    Normalize, validate and merge holdings rows.
+
+    Args:
+        tickers (pd.Series): Ticker text per row.
+        quantities (pd.Series): Quantity text (or numbers) per row.
+        check_symbols (bool): Drop tickers the market data provider does not know.
+        service (MarketDataService, optional): For the symbol check. Defaults to the shared service.
+
+    Returns:
+        ImportResult: Valid holdings with one row per ticker, in first-seen order.
+    """
+    raw_tickers = tickers.reset_index(drop=True)
+    raw_quantities = quantities.reset_index(drop=True)
+    tickers = normalize_tickers(raw_tickers)
+    numeric = pd.api.types.is_numeric_dtype(raw_quantities)
+    parsed = pd.to_numeric(raw_quantities, errors="coerce") if numeric else parse_quantities(raw_quantities)
+
+    # One reason per row, the first that applies; blank rows are dropped silently
+    blank = (tickers == "") & raw_quantities.isna()
+    reasons = np.select(
+        [tickers.str.fullmatch(NON_SECURITY.pattern), ~tickers.str.fullmatch(SYMBOL),
+         ~np.isfinite(parsed) | (parsed <= 0)],
+        [NOT_A_SECURITY, INVALID_SYMBOL, INVALID_QUANTITY],
+        default="",
+    )
+    reasons = pd.Series(reasons, index=tickers.index).mask(blank, "")
+    valid = (reasons == "") & ~blank
+    rejected = pd.DataFrame({"row": pd.array(tickers.index + 1, dtype="Int64"), "ticker": raw_tickers, "quantity": raw_quantities,
+                             "reason": reasons})[(reasons != "")]
+
+    holdings = pd.DataFrame({"ticker": tickers[valid], "quantity": parsed[valid]})
+    merged = len(holdings) - holdings["ticker"].nunique()
+    holdings = holdings.groupby("ticker", sort=False, as_index=False)["quantity"].sum()
+
+    if check_symbols and not holdings.empty:
+        unknown = set(missing_symbols(holdings["ticker"].tolist(), service))
+        if unknown:
+            is_unknown = holdings["ticker"].isin(unknown)
+            rejected = pd.concat([rejected, holdings[is_unknown].assign(row=pd.NA, reason=UNKNOWN_SYMBOL)],
+                                 ignore_index=True)
+            holdings = holdings[~is_unknown]
+    return ImportResult(holdings.reset_index(drop=True), rejected.reset_index(drop=True), merged)
+
+
+def import_holdings(file, name: Optional[str] = None, check_symbols: bool = True,
+                    service: Optional[MarketDataService] = None) -> ImportResult:
+    """
+    Read and validate a holdings file (see read_table and validate_holdings).
+
+    Raises:
+        HoldingsImportError: If the file has no recognizable ticker and quantity columns.
+    """
+    table = read_table(file, name)
+    ticker_column, quantity_column = find_columns(table.columns)
+    result = validate_holdings(table[ticker_column], table[quantity_column], check_symbols, service)
+    result.columns = (ticker_column, quantity_column)
+    return result
+
+
+# -------------------- LOADING --------------------
+def load_holdings(portfolio: Portfolio, holdings: pd.DataFrame, mode: str = "replace"):
+    """
+    Put imported holdings into the session's portfolio.
+
+    Args:
+        portfolio (Portfolio): Updated in place.
+        holdings (pd.DataFrame): "ticker" and "quantity" columns.
+        mode (str): "replace" the portfolio, or "merge" into it (quantities of tickers
+            already held are added up, and blank rows are dropped).
+    """
+    if mode == "merge":
+        current = portfolio.frame()
+        current = current[current["ticker"].str.strip() != ""]
+        holdings = pd.concat([current, holdings[HOLDINGS_COLUMNS]], ignore_index=True)
+        holdings = holdings.groupby("ticker", sort=False, as_index=False)["quantity"].sum()
+    elif mode != "replace":
+        raise ValueError(f"Unknown import mode '{mode}'")
+    portfolio.replace(holdings["ticker"], holdings["quantity"])
+
+
+def apply_editor_changes(page: pd.DataFrame, changes: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Apply an st.data_editor change set to the page of rows it was shown.
+
+    Args:
+        page (pd.DataFrame): The rows given to the editor (positional index).
+        changes (dict): The editor's session state: "edited_rows", "added_rows" and "deleted_rows".
+
+    Returns:
+        pd.DataFrame: The page after the edits, with normalized tickers.
+    """
+    page = page.reset_index(drop=True).copy()
+    for row, values in changes.get("edited_rows", {}).items():
+        for column, value in values.items():
+            page.loc[int(row), column] = value
+    page = page.drop(index=[int(i) for i in changes.get("deleted_rows", [])])
+    added = pd.DataFrame(changes.get("added_rows", []), columns=HOLDINGS_COLUMNS)
+    page = pd.concat([page, added], ignore_index=True)
+    page["ticker"] = normalize_tickers(page["ticker"])
+    return page
@@ -0,0 +1,168 @@
+"""
+20. PortfolioState
+
+Incremental portfolio valuation for the Dashboard. The state object lives in
+st.session_state next to the session's Portfolio (see portfolio), so only tickers it
+has not priced yet are fetched and figures are only rebuilt when the holdings they
+were drawn from change. Values are in USD, converted at each holding's latest FX rate.
+
+Quotes are kept in arrays indexed by ticker code and the holdings are revalued with
+one vectorized gather and multiply, so a rerun with unchanged holdings (every tab
+switch) costs a version comparison, and the valued frame is built once per change
+and handed to the tabs as a shallow view instead of a copy.
+
+"""
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from stock_dashboard.cache import QUOTES, get_cache
+from stock_dashboard.fx import spot_rates
+from stock_dashboard.market_data import MarketDataService, get_market_data_service
+from stock_dashboard.portfolio import SYMBOLS, Portfolio
+
+FRAME_COLUMNS = ["ticker", "quantity", "price", "currency", "fx_rate", "value"]
+
+
+class PortfolioState:
+    """
+    Valued holdings that are updated in place from one rerun to the next.
+
+    `frame` keeps one row per holding as entered (repeated tickers included); rows
+    whose price is missing or zero are left out. Prices are reused until the quote TTL
+    runs out, after which the next update reprices everything. `price` stays in the
+    quote currency; `value` is USD. Holdings whose FX rate cannot be loaded keep a NaN
+    rate, are left out of `frame` and the total, and are listed in `failed`.
+
+    Args:
+        service (MarketDataService, optional): Source of prices. Defaults to the shared service.
+        max_quote_age (float, optional): Seconds before prices are refreshed. Defaults to the QUOTES TTL.
+    """
+
+    def __init__(self, service: Optional[MarketDataService] = None, max_quote_age: Optional[float] = None):
+        self._service = service
+        self.max_quote_age = max_quote_age
+        self._seen: Tuple[Optional[int], int] = (None, -1)
+        self._codes = np.empty(0, dtype=np.int32)
+        self._quantities = np.empty(0, dtype=np.float64)
+        # Quotes by ticker code; NaN price means not priced yet
+        self._prices = np.empty(0, dtype=np.float64)
+        self._fx_rates = np.empty(0, dtype=np.float64)
+        self._currencies = np.empty(0, dtype=object)
+        self._priced_at = 0.0
+        self._figures: Dict[str, Tuple[int, go.Figure]] = {}
+        self.frame = pd.DataFrame(columns=FRAME_COLUMNS)
+        self.total_value = 0.0
+        self.failed: List[str] = []
+        self.version = 0
+
+    @property
+    def service(self) -> MarketDataService:
+        return self._service or get_market_data_service()
+
+    def _quotes_expired(self) -> bool:
+        max_age = self.max_quote_age if self.max_quote_age is not None else get_cache().ttl(QUOTES)
+        return time.time() - self._priced_at > max_age
+
+    def _reserve(self, n_codes: int):
+        """Grow the per-code quote arrays to cover every interned ticker."""
+        if n_codes > len(self._prices):
+            grow = max(n_codes, 2 * len(self._prices)) - len(self._prices)
+            self._prices = np.concatenate([self._prices, np.full(grow, np.nan)])
+            self._fx_rates = np.concatenate([self._fx_rates, np.full(grow, np.nan)])
+            self._currencies = np.concatenate([self._currencies, np.full(grow, None, dtype=object)])
+
+    # -------------------- UPDATE --------------------
+    def update(self, portfolio) -> bool:
+        """
+        Bring the state in line with the current holdings.
+
+        Args:
+            portfolio (Portfolio): The holdings; a list of {"ticker", "quantity"} dicts is
+                converted (and then always compared row by row).
+
+        Returns:
+            bool: True if anything changed (and `version` was bumped).
+        """
+        portfolio = Portfolio.coerce(portfolio)
+        expired = self._quotes_expired()
+        seen = (portfolio.uid, portfolio.version)
+        if seen == self._seen and not expired:
+            return False
+        codes, quantities = portfolio.holdings()
+        self._seen = seen
+        if not expired and np.array_equal(codes, self._codes) and np.array_equal(quantities, self._quantities):
+            return False
+
+        # Price only tickers we have not priced (or found no USD rate for) yet, unless the quotes have gone stale
+        self._reserve(len(SYMBOLS))
+        unique = np.unique(codes)
+        to_price = unique if expired else unique[np.isnan(self._prices[unique]) | np.isnan(self._fx_rates[unique])]
+        if len(to_price):
+            tickers = SYMBOLS.symbols(to_price).tolist()
+            snapshots = self.service.get_snapshots(tickers)
+            self._prices[to_price] = [snapshots[t].price for t in tickers]
+            self._currencies[to_price] = [snapshots[t].currency for t in tickers]
+            # A currency without a rate stays NaN: those holdings are left out, not valued as USD
+            rates = spot_rates(self._currencies[to_price])
+            self._fx_rates[to_price] = rates.reindex(self._currencies[to_price]).to_numpy()
+            if expired:
+                self._priced_at = time.time()
+        failures = self.service.failures
+        self.failed = [f"{t} ({failures[t].error})" for t in SYMBOLS.symbols(unique) if t in failures]
+        no_rate = unique[(self._prices[unique] > 0) & np.isnan(self._fx_rates[unique])]
+        self.failed += [f"{t} (no USD rate for {c})" for t, c in zip(SYMBOLS.symbols(no_rate), self._currencies[no_rate])]
+
+        # One gather and multiply over all rows; unpriced rows and rows without a USD rate drop out
+        prices = self._prices[codes]
+        keep = (prices > 0) & ~np.isnan(self._fx_rates[codes])
+        kept = codes[keep]
+        fx_rates = self._fx_rates[kept]
+        values = prices[keep] * quantities[keep] * fx_rates
+        self.frame = pd.DataFrame({
+            "ticker": SYMBOLS.symbols(kept),
+            "quantity": quantities[keep],
+            "price": prices[keep],
+            "currency": self._currencies[kept],
+            "fx_rate": fx_rates,
+            "value": values,
+        }, columns=FRAME_COLUMNS)
+        self.total_value = float(values.sum())
+        self._codes, self._quantities = codes, quantities
+        self.version += 1
+        return True
+
+    # -------------------- DERIVED --------------------
+    def view(self) -> pd.DataFrame:
+        """
+        The valued holdings for a tab: a shallow copy sharing the state's columns.
+
+        Tabs may add columns to it freely; the rows are not copied per rerun.
+        """
+        return self.frame.copy(deep=False)
+
+    def weights(self) -> pd.Series:
+        """Share of the total value held in each ticker (unpriced tickers and those without a USD rate count as 0)."""
+        prices, fx_rates = self._prices[self._codes], self._fx_rates[self._codes]
+        values = np.where((prices > 0) & ~np.isnan(fx_rates), prices * self._quantities * fx_rates, 0.0)
+        values = pd.Series(values).groupby(SYMBOLS.symbols(self._codes), sort=False).sum()
+        return values / self.total_value if self.total_value else values * 0.0
+
+    def figure(self, name: str, build: Callable[[pd.DataFrame], Optional[go.Figure]]) -> Optional[go.Figure]:
+        """
+        Return a figure drawn from the holdings, rebuilding it only after they change.
+
+        Args:
+            name (str): Cache slot for the figure.
+            build (callable): Takes the holdings frame and returns a figure (or None).
+
+        Returns:
+            go.Figure: A copy, so tabs can restyle it without touching the cached one.
+        """
+        version, fig = self._figures.get(name, (None, None))
+        if version != self.version:
+            fig = build(self.frame)
+            self._figures[name] = (self.version, fig)
+        return go.Figure(fig) if fig is not None else None
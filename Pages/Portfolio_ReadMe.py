@@ -0,0 +1,235 @@
+"""
+33. Portfolio
+
+Array-backed holdings for the session state. Each ticker is interned once per
+process as an int32 code, and a portfolio keeps its rows as a code array and a
+contiguous float64 quantity array that grow in place. The HomePage appends and edits
+rows without rebuilding anything, and the Dashboard reads the holdings without
+converting a list of dicts on every rerun.
+
+Every edit bumps `version`, so PortfolioState can tell an unchanged rerun in O(1),
+and the arrays and frames handed out are read-only views, built at most once per
+version.
+
+"""
+import itertools
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+HOLDINGS_COLUMNS = ["ticker", "quantity"]
+
+
+# -------------------- SYMBOLS --------------------
+class SymbolTable:
+    """
+    Process-wide ticker <-> int32 code mapping. Codes are never reused, so they can be
+    used as indices into per-ticker arrays shared by every session.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes: Dict[str, int] = {}
+        self._symbols = np.empty(64, dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def code(self, ticker: str) -> int:
+        """Code of a ticker, assigning the next one on first sight."""
+        code = self._codes.get(ticker)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(ticker)
+                if code is None:
+                    code = len(self._codes)
+                    if code == len(self._symbols):
+                        grown = np.empty(2 * len(self._symbols), dtype=object)
+                        grown[:code] = self._symbols
+                        self._symbols = grown
+                    self._symbols[code] = ticker
+                    self._codes[ticker] = code
+        return code
+
+    def codes(self, tickers: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.code(t) for t in tickers), dtype=np.int32)
+
+    def symbols(self, codes: np.ndarray) -> np.ndarray:
+        """Ticker strings of `codes` (the interned objects, not copies)."""
+        return self._symbols[codes]
+
+
+SYMBOLS = SymbolTable()
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _to_quantity(value: Any) -> float:
+    """Numeric quantity, or NaN when it is not a number (such rows are ignored)."""
+    return float(pd.to_numeric(value, errors="coerce"))
+
+
+def _to_quantities(values: Iterable[Any]) -> np.ndarray:
+    """Vectorized `_to_quantity`."""
+    return pd.to_numeric(pd.Series(list(values), dtype="object"), errors="coerce").to_numpy(np.float64)
+
+
+# -------------------- PORTFOLIO --------------------
+class Portfolio:
+    """
+    Holdings as entered: one row per (ticker, quantity), repeated tickers allowed.
+
+    Args:
+        tickers (iterable): Ticker symbols, as typed.
+        quantities (iterable): Quantities; values that are not numeric are kept as NaN
+            and left out of `holdings()`.
+    """
+
+    _uids = itertools.count()
+
+    def __init__(self, tickers: Iterable[str] = (), quantities: Iterable[Any] = ()):
+        self.uid = next(self._uids)
+        self.version = 0
+        self._size = 0
+        self._codes = np.empty(16, dtype=np.int32)
+        self._quantities = np.empty(16, dtype=np.float64)
+        self._views: Dict[str, Tuple[int, Any]] = {}
+        self.extend(tickers, quantities)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "Portfolio":
+        """Build from {"ticker": ..., "quantity": ...} dicts (the old session format)."""
+        records = list(records)
+        return cls((str(r.get("ticker") or "") for r in records), [r.get("quantity") for r in records])
+
+    @classmethod
+    def coerce(cls, portfolio) -> "Portfolio":
+        """Return `portfolio` itself if it is a Portfolio, else build one from its records."""
+        return portfolio if isinstance(portfolio, cls) else cls.from_records(portfolio)
+
+    def __len__(self) -> int:
+        return self._size
+
+    # -------------------- EDITING --------------------
+    def _reserve(self, size: int):
+        if size > len(self._codes):
+            capacity = max(size, 2 * len(self._codes))
+            for name in ("_codes", "_quantities"):
+                grown = np.empty(capacity, dtype=getattr(self, name).dtype)
+                grown[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, grown)
+
+    def _changed(self):
+        self.version += 1
+
+    def append(self, ticker: str, quantity: Any = 0.0):
+        """Add one row (amortized O(1))."""
+        self._reserve(self._size + 1)
+        self._codes[self._size] = SYMBOLS.code(ticker)
+        self._quantities[self._size] = _to_quantity(quantity)
+        self._size += 1
+        self._changed()
+
+    def extend(self, tickers: Iterable[str], quantities: Iterable[Any]):
+        """Add many rows at once; quantities are converted in one vectorized pass."""
+        self.splice(self._size, self._size, tickers, quantities)
+
+    def splice(self, start: int, stop: int, tickers: Iterable[str], quantities: Iterable[Any]):
+        """
+        Replace rows [start, stop) with new rows (any number, so rows can be added or
+        removed), shifting the rows after them. Used to write back one page of the grid.
+        `start` and `stop` are clamped to [0, len(self)], so rows past the end are appended.
+        """
+        codes = SYMBOLS.codes(tickers)
+        values = _to_quantities(quantities)
+        if len(codes) != len(values):
+            raise ValueError(f"{len(codes)} tickers but {len(values)} quantities")
+        start = min(max(0, start), self._size)
+        stop = min(max(start, stop), self._size)
+        if not len(codes) and start == stop:
+            return
+        tail_codes, tail_quantities = self._codes[stop:self._size].copy(), self._quantities[stop:self._size].copy()
+        size = start + len(codes) + len(tail_codes)
+        self._reserve(size)
+        self._codes[start:size] = np.concatenate([codes, tail_codes])
+        self._quantities[start:size] = np.concatenate([values, tail_quantities])
+        self._size = size
+        self._changed()
+
+    def set(self, index: int, ticker: Optional[str] = None, quantity: Any = None):
+        """Edit one row in place; a value equal to the current one is not a change."""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+        code = SYMBOLS.code(ticker) if ticker is not None else self._codes[index]
+        value = _to_quantity(quantity) if quantity is not None else self._quantities[index]
+        same_value = value == self._quantities[index] or (np.isnan(value) and np.isnan(self._quantities[index]))
+        if code != self._codes[index] or not same_value:
+            self._codes[index], self._quantities[index] = code, value
+            self._changed()
+
+    def replace(self, tickers: Iterable[str], quantities: Iterable[Any]):
+        """Swap in a whole new set of rows (e.g. from an import)."""
+        self.splice(0, self._size, tickers, quantities)
+
+    def clear(self):
+        if self._size:
+            self._size = 0
+            self._changed()
+
+    # -------------------- VIEWS --------------------
+    def _cached(self, name: str, build):
+        version, value = self._views.get(name, (None, None))
+        if version != self.version:
+            value = build()
+            self._views[name] = (self.version, value)
+        return value
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Ticker codes per row (read-only view)."""
+        return _readonly(self._codes[:self._size])
+
+    @property
+    def quantities(self) -> np.ndarray:
+        """Quantities per row, NaN where not numeric (read-only view)."""
+        return _readonly(self._quantities[:self._size])
+
+    @property
+    def tickers(self) -> np.ndarray:
+        """Ticker strings per row (read-only, built once per version)."""
+        return self._cached("tickers", lambda: _readonly(SYMBOLS.symbols(self._codes[:self._size])))
+
+    def holdings(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The rows the Dashboard analyzes: those with a numeric quantity.
+
+        Returns:
+            tuple: (codes, quantities), read-only and built once per version.
+        """
+        def build():
+            keep = ~np.isnan(self._quantities[:self._size])
+            return _readonly(self._codes[:self._size][keep]), _readonly(self._quantities[:self._size][keep])
+        return self._cached("holdings", build)
+
+    def frame(self) -> pd.DataFrame:
+        """
+        "ticker" and "quantity" of the analyzed rows.
+
+        Returns:
+            pd.DataFrame: A shallow copy of a frame built once per version, so callers
+            can add columns without copying the rows or touching the cached frame.
+        """
+        def build():
+            codes, quantities = self.holdings()
+            return pd.DataFrame({"ticker": SYMBOLS.symbols(codes), "quantity": quantities}, columns=HOLDINGS_COLUMNS)
+        return self._cached("frame", build).copy(deep=False)
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Every row as a {"ticker", "quantity"} dict."""
+        return [{"ticker": t, "quantity": float(q)} for t, q in zip(self.tickers, self.quantities)]
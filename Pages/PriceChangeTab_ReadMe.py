@@ -5,11 +5,22 @@
 
 
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import numpy as np
 import plotly.express as px
+from stock_dashboard.analytics import price_change_metrics
+from stock_dashboard.cache import DAILY_BARS, cached
+from stock_dashboard.price_store import get_price_store
+from stock_dashboard.tab_registry import requires
+
+@cached(DAILY_BARS)
+def get_price_history(tickers):
+    chart_data = get_price_store().close_panel(tickers, period="90d")
+    if chart_data.empty:
+        return chart_data
+    return chart_data / chart_data.bfill().iloc[0] * 100
+
 
+@requires("valued_holdings")
 def render_price_change_tab(portfolio_df):
     st.markdown("""
     <style>
@@ -33,51 +44,9 @@ def render_price_change_tab(portfolio_df):
 
     st.title("Price Change & Volatility")
 
-    df = portfolio_df.copy()
-
-    # Define helper functions
-    @st.cache_data
-    def get_change(ticker, period):
-        try:
-            hist = yf.Ticker(ticker).history(period=period)
-            return ((hist["Close"].iloc[-1] - hist["Close"].iloc[0]) / hist["Close"].iloc[0]) * 100
-        except:
-            return np.nan
-
-    @st.cache_data
-    def get_volatility(ticker):
-        try:
-            hist = yf.Ticker(ticker).history(period="30d")
-            returns = hist["Close"].pct_change().dropna()
-            return np.std(returns) * 100
-        except:
-            return np.nan
-
-    @st.cache_data
-    def get_max_drawdown(ticker):
-        try:
-            hist = yf.Ticker(ticker).history(period="90d")["Close"]
-            roll_max = hist.cummax()
-            drawdown = (hist - roll_max) / roll_max
-            return drawdown.min() * 100
-        except:
-            return np.nan
-
-    @st.cache_data
-    def get_52w_high(ticker):
-        try:
-            return yf.Ticker(ticker).info.get("fiftyTwoWeekHigh")
-        except:
-            return np.nan
-
-    # Add static metrics
-    df["1D %"] = df["ticker"].apply(lambda t: get_change(t, "2d"))
-    df["1W %"] = df["ticker"].apply(lambda t: get_change(t, "7d"))
-    df["1M %"] = df["ticker"].apply(lambda t: get_change(t, "30d"))
-    df["Volatility (30d)"] = df["ticker"].apply(get_volatility)
-    df["Max Drawdown (90d)"] = df["ticker"].apply(get_max_drawdown)
-    df["52W High"] = df["ticker"].apply(get_52w_high)
-    df["From 52W High"] = ((df["price"] - df["52W High"]) / df["52W High"]) * 100
+    # The valued holdings are shared with the portfolio state; the metrics below are joined
+    # onto a new frame, so the rows are not copied on every rerun
+    df = portfolio_df
 
     # === RETURN PERIOD SELECTION ===
     period_map = {
@@ -94,7 +63,8 @@ def render_price_change_tab(portfolio_df):
     selected_label = st.selectbox("Choose return period", list(period_map.keys()))
     period = period_map[selected_label]
 
-    df["Selected %"] = df["ticker"].apply(lambda t: get_change(t, period))
+    # Every metric column comes from one pass of the metrics engine over a single price matrix
+    df = price_change_metrics(df, period)
 
     # === BAR CHART ===
     st.subheader(f"{selected_label} Returns by Ticker")
@@ -122,19 +92,6 @@ def render_price_change_tab(portfolio_df):
     st.subheader("Normalized Price History (Last 90 Days)")
     selected = st.multiselect("Compare stocks", df["ticker"].tolist(), default=df["ticker"].tolist())
 
-    @st.cache_data
-    def get_price_history(tickers):
-        chart_data = pd.DataFrame()
-        for ticker in tickers:
-            try:
-                hist = yf.Ticker(ticker).history(period="90d")["Close"]
-                hist = hist / hist.iloc[0] * 100
-                chart_data[ticker] = hist
-            except:
-                continue
-        chart_data.index.name = "Date"
-        return chart_data
-
     price_chart_df = get_price_history(selected)
     if not price_chart_df.empty:
         fig_line = px.line(
@@ -0,0 +1,295 @@
+"""
+13. PriceStore
+
+Persistent on-disk store of adjusted daily OHLCV bars, one Parquet file per ticker.
+Each symbol keeps a single canonical daily series; a refresh only downloads the
+trailing bars that are missing, and every period-based query is answered by slicing
+the stored series.
+
+"""
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+import pandas as pd
+from stock_dashboard.cache import DAILY_BARS, TwoTierCache, get_cache
+from stock_dashboard.instrumentation import record_upstream
+from stock_dashboard.market_data import (
+    MarketDataProvider, OHLCV_COLUMNS, get_market_data_service, normalize_bars,
+)
+from stock_dashboard.singleflight import get_single_flight
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".stock_dashboard", "prices")
+
+# Seconds before a ticker the provider did not answer for is asked for again
+MISS_TTL = 15 * 60
+
+_PERIOD_PATTERN = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def trading_days(period: Optional[str]) -> Optional[int]:
+    """Return N for an "Nd" period (a count of trading days), otherwise None."""
+    match = _PERIOD_PATTERN.match(period or "")
+    return int(match.group(1)) if match and match.group(2) == "d" else None
+
+
+def period_start(period: Optional[str], last_date: pd.Timestamp) -> Optional[pd.Timestamp]:
+    """
+    Translate a yfinance-style period into the first calendar date it needs.
+
+    "Nd" periods count trading days, so the calendar start is padded for weekends
+    and holidays; the exact number of bars is taken later by `slice_period`.
+
+    Args:
+        period (str): One of "Nd", "Nwk", "Nmo", "Ny", "ytd", "max" or None.
+        last_date (pd.Timestamp): The date the period ends on.
+
+    Returns:
+        pd.Timestamp or None: The start date, or None for the full history.
+    """
+    if period in (None, "max"):
+        return None
+    if period == "ytd":
+        return pd.Timestamp(year=last_date.year, month=1, day=1)
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == "d":
+        return last_date - pd.Timedelta(days=n * 7 // 5 + 10)
+    if unit == "wk":
+        return last_date - pd.DateOffset(weeks=n)
+    if unit == "mo":
+        return last_date - pd.DateOffset(months=n)
+    return last_date - pd.DateOffset(years=n)
+
+
+def slice_period(bars: pd.DataFrame, period: Optional[str]) -> pd.DataFrame:
+    """
+    Slice a daily frame down to a yfinance-style period.
+
+    Args:
+        bars (pd.DataFrame): Daily rows indexed by date.
+        period (str): See `period_start`.
+
+    Returns:
+        pd.DataFrame: The rows that fall in the period.
+    """
+    if bars.empty or period in (None, "max"):
+        return bars
+    n_days = trading_days(period)
+    if n_days is not None:
+        return bars.iloc[-n_days:]
+    return bars[bars.index >= period_start(period, bars.index[-1])]
+
+
+class PriceStore:
+    """
+    Local columnar store of daily bars.
+
+    Args:
+        root (str): Directory holding one Parquet file per ticker plus a manifest.
+            Defaults to $STOCK_DASHBOARD_DATA or ~/.stock_dashboard/prices.
+        provider (MarketDataProvider): Backend for missing bars. Defaults to the
+            shared market-data service's provider.
+        cache (TwoTierCache): Cache recording when each ticker's trailing bars were
+            last refreshed (a DAILY_BARS entry, valid until the next market close).
+            Defaults to the shared process cache.
+    """
+
+    def __init__(self, root: Optional[str] = None, provider: Optional[MarketDataProvider] = None,
+                 cache: Optional[TwoTierCache] = None):
+        self.root = root or os.environ.get("STOCK_DASHBOARD_DATA", DEFAULT_ROOT)
+        self._provider = provider
+        self.cache = cache or get_cache()
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._lock = threading.RLock()
+        os.makedirs(self.root, exist_ok=True)
+        self._manifest_path = os.path.join(self.root, "manifest.json")
+        self._manifest = self._read_manifest()
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        return self._provider or get_market_data_service().provider
+
+    # -------------------- FILES --------------------
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{quote(ticker, safe='')}.parquet")
+
+    def _read_manifest(self) -> Dict[str, dict]:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        """Write the manifest, keeping entries other server processes added since our last read."""
+        self._manifest = {**self._read_manifest(), **self._manifest}
+        tmp_path = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def load(self, ticker: str) -> pd.DataFrame:
+        """Return the stored bars for a ticker (empty if nothing is stored yet)."""
+        try:
+            mtime = os.path.getmtime(self._path(ticker))
+        except OSError:
+            mtime = None
+        with self._lock:
+            # Reload when another server process has rewritten the file
+            if ticker not in self._frames or self._mtimes.get(ticker) != mtime:
+                self._mtimes[ticker] = mtime
+                try:
+                    self._frames[ticker] = pd.read_parquet(self._path(ticker))
+                except (OSError, ValueError):
+                    self._frames[ticker] = pd.DataFrame(
+                        columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], name="Date"), dtype="float64"
+                    )
+            return self._frames[ticker]
+
+    def _save(self, ticker: str, bars: pd.DataFrame):
+        tmp_path = self._path(ticker) + ".tmp"
+        bars.to_parquet(tmp_path)
+        os.replace(tmp_path, self._path(ticker))
+        self._frames[ticker] = bars
+        self._mtimes[ticker] = os.path.getmtime(self._path(ticker))
+
+    # -------------------- REFRESH --------------------
+    def _plan(self, ticker: str, start: Optional[pd.Timestamp], checked: Dict[str, bool]):
+        """Return the (start, end, cold) ranges that must be fetched for a ticker."""
+        bars = self.load(ticker)
+        entry = self._manifest.get(ticker)
+        marker = checked.get(f"bars:{ticker}")
+        stale = entry is None or marker is None
+        if bars.empty or entry is None:
+            # Without a manifest entry the stored coverage is unknown: refetch from `start`,
+            # unless the provider recently had nothing for the ticker (a False marker)
+            return [(start, None, True)] if stale and marker is not False else []
+        ranges = []
+        covered_from = pd.Timestamp(entry["start"]) if entry.get("start") else None
+        if covered_from is not None and (start is None or start < covered_from):
+            ranges.append((start, covered_from, False))
+        if stale:
+            # Refetch the last stored bar too, in case it was an intraday print
+            ranges.append((bars.index[-1], None, False))
+        return ranges
+
+    def refresh(self, tickers: Iterable[str], start=None):
+        """
+        Make sure the store covers `start` onwards for every ticker, downloading
+        only missing leading or trailing bars. Tickers needing the same range are
+        fetched in one batched provider call, and a range another session is
+        already fetching is waited for instead of fetched again.
+
+        Args:
+            tickers (iterable): Ticker symbols.
+            start (date-like, optional): Earliest date needed. None means full history.
+        """
+        start = pd.Timestamp(start).normalize() if start is not None else None
+        tickers = list(dict.fromkeys(tickers))
+        checked = self.cache.get_many(DAILY_BARS, [f"bars:{t}" for t in tickers])
+        with self._lock:
+            if any(t not in self._manifest for t in tickers):
+                # Another server process may have stored these tickers since we started
+                self._manifest = {**self._read_manifest(), **self._manifest}
+            groups: Dict[tuple, List[str]] = {}
+            for ticker in tickers:
+                for fetch_range in self._plan(ticker, start, checked):
+                    groups.setdefault(fetch_range, []).append(ticker)
+
+        for (fetch_start, fetch_end, cold), group in groups.items():
+            get_single_flight().do_many(
+                [("bars", ticker, fetch_start, fetch_end) for ticker in group],
+                lambda keys, s=fetch_start, e=fetch_end, c=cold: self._fetch([k[1] for k in keys], s, e, c),
+            )
+
+    def _fetch(self, tickers: List[str], fetch_start, fetch_end, cold: bool):
+        """Download one range for a group of tickers and merge it into the store."""
+        fetched = self.provider.fetch_history(tickers, start=fetch_start, end=fetch_end)
+        record_upstream(type(self.provider).__name__, "history", len(tickers),
+                        nbytes=int(sum(bars.memory_usage(index=True).sum() for bars in fetched.values())))
+        refreshed, missed = {}, {}
+        with self._lock:
+            for ticker in tickers:
+                new_bars = fetched.get(ticker)
+                if new_bars is None or new_bars.empty:
+                    # Failed or unknown: the coverage is unchanged, and the ticker is
+                    # only asked for again after MISS_TTL instead of on every refresh
+                    if fetch_end is None:
+                        missed[f"bars:{ticker}"] = False
+                    continue
+                stored, new_bars = self.load(ticker), normalize_bars(new_bars)
+                bars = pd.concat([stored, new_bars]) if not stored.empty else new_bars
+                bars = bars[~bars.index.duplicated(keep="last")].sort_index()
+                self._save(ticker, bars)
+                entry = self._manifest.setdefault(ticker, {})
+                if cold or fetch_end is not None:
+                    entry["start"] = fetch_start.isoformat() if fetch_start is not None else None
+                if fetch_end is None:
+                    refreshed[f"bars:{ticker}"] = True
+            self._write_manifest()
+        self.cache.set_many(DAILY_BARS, refreshed)
+        self.cache.set_many(DAILY_BARS, missed, ttl=min(MISS_TTL, self.cache.ttl(DAILY_BARS)))
+
+    # -------------------- QUERIES --------------------
+    def history(self, ticker: str, period: Optional[str] = None, start=None) -> pd.DataFrame:
+        """
+        Return daily OHLCV bars for one ticker, sliced from the store.
+
+        Args:
+            ticker (str): The stock ticker symbol.
+            period (str, optional): yfinance-style period ("30d", "6mo", "1y", "max", ...).
+            start (date-like, optional): First date to include. Ignored when period is set.
+
+        Returns:
+            pd.DataFrame: Bars indexed by "Date" (empty if the ticker has no data).
+        """
+        return self.history_many([ticker], period=period, start=start)[ticker]
+
+    def history_many(self, tickers: Iterable[str], period: Optional[str] = None, start=None) -> Dict[str, pd.DataFrame]:
+        """Batched version of `history`: one refresh for all tickers."""
+        tickers = list(dict.fromkeys(tickers))
+        if period is not None:
+            start = period_start(period, pd.Timestamp.today().normalize())
+        self.refresh(tickers, start=start)
+        result = {}
+        for ticker in tickers:
+            bars = self.load(ticker)
+            if period is not None:
+                result[ticker] = slice_period(bars, period)
+            elif start is not None:
+                result[ticker] = bars[bars.index >= pd.Timestamp(start)]
+            else:
+                result[ticker] = bars
+        return result
+
+    def close_panel(self, tickers: Iterable[str], period: Optional[str] = None, start=None) -> pd.DataFrame:
+        """
+        Return a wide (dates x tickers) frame of closing prices.
+
+        Tickers without data are left out, matching yf.download(...)["Close"].dropna(axis=1, how="all").
+        """
+        histories = self.history_many(tickers, period=period, start=start)
+        closes = {t: bars["Close"] for t, bars in histories.items() if not bars.empty}
+        if not closes:
+            return pd.DataFrame()
+        panel = pd.concat(closes, axis=1).sort_index()
+        panel.index.name = "Date"
+        return panel
+
+
+_store: Optional[PriceStore] = None
+
+
+def get_price_store() -> PriceStore:
+    """Return the process-wide PriceStore."""
+    global _store
+    if _store is None:
+        _store = PriceStore()
+    return _store
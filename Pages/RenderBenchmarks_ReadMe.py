@@ -0,0 +1,590 @@
+"""
+32. RenderBenchmarks
+
+End-to-end benchmarks of the Dashboard tabs, run offline. Each render function is
+called the way the Dashboard calls it (through the tab registry, with the same
+dataset builders) against a deterministic LocalProvider, with Streamlit replaced by
+a stub that answers every widget with its default and serializes charts and tables
+the way the real frontend does.
+
+Every (portfolio size, tab) scenario runs in a fresh process with empty stores and
+cache: a cold render that fetches everything, then a warm rerun. Wall time, peak
+traced memory (measured in a second process, since tracing slows the code down) and
+upstream provider calls are reported and checked against regression thresholds;
+the run exits with status 1 when one is exceeded or a tab fails to render (tabs in
+KNOWN_BROKEN are reported as skipped instead).
+
+Run with: python -m stock_dashboard.render_benchmarks [--sizes 10 100 1000]
+    [--tabs overview export ...] [--fixture DIR] [--thresholds FILE] [--json FILE]
+Record a fixture from Yahoo Finance: python -m stock_dashboard.render_benchmarks
+    --record DIR --tickers AAPL MSFT ULVR.L ...
+
+"""
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from stock_dashboard.fx import MINOR_UNITS, fx_symbol
+from stock_dashboard.instrumentation import get_metrics
+from stock_dashboard.market_data import LocalProvider, YahooProvider, get_market_data_service
+from stock_dashboard.portfolio import Portfolio
+
+SIZES = (10, 100, 1000)
+
+# Tab name -> (module, render function); imported inside the scenario process
+TABS = {
+    "overview": ("stock_dashboard.overview_tab", "render_overview_tab"),
+    "price_change": ("stock_dashboard.price_change_tab", "render_price_change_tab"),
+    "value_over_time": ("stock_dashboard.value_over_time_tab", "render_value_over_time_tab"),
+    "risk_classification": ("stock_dashboard.risk_classification_tab", "render_risk_classification_tab"),
+    "export": ("stock_dashboard.export_tab", "render_export_tab"),
+}
+
+# Tabs that cannot run in this tree, so their errors do not fail the run: tab -> reason.
+# The risk classification tab's source is truncated and does not import.
+KNOWN_BROKEN = {
+    "risk_classification": "source is truncated",
+}
+
+# Buttons the stub presses, so the export tab builds its bundle
+CLICKS = ("Prepare Export",)
+
+# Benchmarks the tabs compare against (Overview: SPY, Value Over Time: ^GSPC)
+BENCHMARK_TICKERS = ("SPY", "^GSPC")
+
+# Synthetic listings: (ticker suffix, exchange, currency, price scale)
+LISTINGS = [
+    ("", "NMS", "USD", 1.0),
+    ("", "NYQ", "USD", 1.0),
+    (".L", "LSE", "GBp", 100.0),
+    (".PA", "PAR", "EUR", 1.0),
+    (".DE", "GER", "EUR", 1.0),
+    (".T", "JPX", "JPY", 100.0),
+    (".HK", "HKG", "HKD", 5.0),
+]
+FX_TO_USD = {"GBP": 1.27, "EUR": 1.08, "JPY": 0.0067, "HKD": 0.128}
+SECTORS = ["Technology", "Healthcare", "Financial Services", "Consumer Cyclical", "Industrials",
+           "Energy", "Utilities", "Consumer Defensive", "Real Estate", "Communication Services"]
+HISTORY_START = "2019-01-01"
+
+# Limits per tab and portfolio size: wall seconds (cold and warm rerun), peak traced MB
+# (cold) and upstream calls (cold and warm). Times and memory are ~3x a single-core
+# reference run, with floors of 2 s, 0.5 s and 25 MB so small scenarios do not flake.
+# Upstream calls are batched, so their limit does not grow with the portfolio, and a
+# warm rerun must not call the provider at all. Tabs in KNOWN_BROKEN have no limits
+# until they can be measured.
+THRESHOLDS = {
+    "overview": {
+        10: {"cold_s": 2.0, "warm_s": 0.5, "peak_mb": 25, "cold_calls": 10, "warm_calls": 0},
+        100: {"cold_s": 5.0, "warm_s": 1.0, "peak_mb": 30, "cold_calls": 10, "warm_calls": 0},
+        1000: {"cold_s": 32.0, "warm_s": 3.0, "peak_mb": 85, "cold_calls": 10, "warm_calls": 0},
+    },
+    "price_change": {
+        10: {"cold_s": 2.0, "warm_s": 0.6, "peak_mb": 25, "cold_calls": 10, "warm_calls": 0},
+        100: {"cold_s": 5.0, "warm_s": 2.5, "peak_mb": 35, "cold_calls": 10, "warm_calls": 0},
+        1000: {"cold_s": 48.0, "warm_s": 18.0, "peak_mb": 180, "cold_calls": 10, "warm_calls": 0},
+    },
+    "value_over_time": {
+        10: {"cold_s": 2.0, "warm_s": 0.5, "peak_mb": 35, "cold_calls": 10, "warm_calls": 0},
+        100: {"cold_s": 6.5, "warm_s": 2.0, "peak_mb": 150, "cold_calls": 10, "warm_calls": 0},
+        1000: {"cold_s": 55.0, "warm_s": 18.0, "peak_mb": 1350, "cold_calls": 10, "warm_calls": 0},
+    },
+    "export": {
+        10: {"cold_s": 2.5, "warm_s": 0.5, "peak_mb": 25, "cold_calls": 10, "warm_calls": 0},
+        100: {"cold_s": 26.0, "warm_s": 0.5, "peak_mb": 35, "cold_calls": 10, "warm_calls": 0},
+        1000: {"cold_s": 210.0, "warm_s": 0.5, "peak_mb": 320, "cold_calls": 10, "warm_calls": 0},
+    },
+}
+
+
+# -------------------- DATA --------------------
+def synthetic_tickers(n_tickers: int) -> List[str]:
+    """Ticker symbols spread over the LISTINGS exchanges (e.g. "T0002.L")."""
+    return [f"T{i:04d}{LISTINGS[i % len(LISTINGS)][0]}" for i in range(n_tickers)]
+
+
+def _bars(rng: np.random.Generator, index: pd.DatetimeIndex, start_price: float) -> pd.DataFrame:
+    returns = rng.normal(0.0003, 0.018, size=len(index))
+    close = start_price * np.exp(np.cumsum(returns))
+    spread = np.abs(rng.normal(0, 0.01, size=len(index)))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.003, size=len(index))),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(100_000, 5_000_000, size=len(index)).astype("float64"),
+    }, index=index.rename("Date"))
+
+
+def synthetic_provider(n_tickers: int, seed: int = 42, end=None) -> LocalProvider:
+    """
+    Offline provider with random-walk daily bars and info payloads for `n_tickers`
+    stocks, plus the benchmarks and FX pairs the tabs ask for.
+
+    Args:
+        n_tickers (int): Number of stocks (see synthetic_tickers).
+        seed (int): Random seed; the same seed gives the same prices and payloads.
+        end (date-like, optional): Last bar. Defaults to the last business day, so the
+            stores see complete histories and never fetch again on the warm rerun.
+
+    Returns:
+        LocalProvider: Provider holding every payload in memory.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(HISTORY_START, pd.Timestamp(end) if end is not None else pd.Timestamp.today().normalize())
+    infos, histories = {}, {}
+    for i, ticker in enumerate(synthetic_tickers(n_tickers)):
+        _, exchange, currency, scale = LISTINGS[i % len(LISTINGS)]
+        bars = _bars(rng, index, scale * rng.uniform(10, 400))
+        close = bars["Close"]
+        infos[ticker] = {
+            "regularMarketPrice": float(close.iloc[-1]),
+            "previousClose": float(close.iloc[-2]),
+            "currency": currency,
+            "exchange": exchange,
+            "sector": SECTORS[int(rng.integers(len(SECTORS)))],
+            "industry": "Synthetic",
+            "beta": round(float(rng.uniform(0.3, 2.0)), 2),
+            "trailingPE": round(float(rng.uniform(5, 60)), 1),
+            "forwardEps": round(float(rng.uniform(0.5, 15)), 2),
+            "dividendYield": round(float(rng.uniform(0, 0.06)), 4),
+            "marketCap": float(rng.uniform(1e9, 2e12)),
+            "priceToBook": round(float(rng.uniform(0.5, 20)), 2),
+            "fiftyTwoWeekHigh": float(close.iloc[-252:].max()),
+            "fiftyTwoWeekLow": float(close.iloc[-252:].min()),
+        }
+        histories[ticker] = bars
+    for ticker in BENCHMARK_TICKERS:
+        histories[ticker] = _bars(rng, index, 400.0)
+        infos[ticker] = {"regularMarketPrice": float(histories[ticker]["Close"].iloc[-1]),
+                         "currency": "USD", "exchange": "PCX", "sector": "Index"}
+    for currency, rate in FX_TO_USD.items():
+        histories[fx_symbol(currency)] = _bars(rng, index, rate)
+    return LocalProvider(infos, histories)
+
+
+def synthetic_portfolio(tickers: List[str], n_holdings: int, seed: int = 42) -> Portfolio:
+    """
+    The session's portfolio with `n_holdings` holdings, cycling through `tickers`
+    when there are fewer tickers than holdings.
+    """
+    rng = np.random.default_rng(seed)
+    quantities = rng.integers(1, 200, size=n_holdings)
+    return Portfolio([tickers[i % len(tickers)] for i in range(n_holdings)], quantities)
+
+
+def record_fixture(tickers: Iterable[str], path: str, start=HISTORY_START):
+    """
+    Record a fixture from Yahoo Finance for offline runs (see LocalProvider.from_directory):
+    the tickers' info payloads and daily bars, plus the benchmarks and their FX pairs.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    yahoo = YahooProvider()
+    infos = yahoo.fetch_info(tickers + list(BENCHMARK_TICKERS)).results
+    currencies = {MINOR_UNITS.get(info.get("currency"), (info.get("currency"), 1.0))[0] for info in infos.values()}
+    fx_tickers = [fx_symbol(c) for c in sorted(c for c in currencies if c and c != "USD")]
+    histories = yahoo.fetch_history(tickers + list(BENCHMARK_TICKERS) + fx_tickers, start=start)
+    LocalProvider(infos, histories).save(path)
+
+
+# -------------------- STREAMLIT STUB --------------------
+class _Rerun(Exception):
+    """Raised by the stub's st.rerun(); the runner renders the tab again."""
+
+
+class _SessionState(dict):
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+
+class StreamlitStub:
+    """
+    Stand-in for the `streamlit` module while a tab renders.
+
+    Widgets return their default value (or `answers[label]`), buttons are pressed when
+    their label is in `clicks`, and containers (columns, sidebar, expanders) are the stub
+    itself. Charts and tables are serialized like the real elements (figure JSON, Arrow),
+    so the benchmark pays the same cost per element; everything else is a no-op.
+
+    Args:
+        session_state (dict, optional): Kept across reruns of one session.
+        answers (dict, optional): Widget label -> value to return instead of the default.
+        clicks (iterable): Labels of buttons to press.
+    """
+
+    def __init__(self, session_state: Optional[dict] = None, answers: Optional[Dict[str, Any]] = None,
+                 clicks: Iterable[str] = ()):
+        self.session_state = session_state if session_state is not None else _SessionState()
+        self.answers = dict(answers or {})
+        self.clicks = set(clicks)
+        self.elements = 0
+
+    def __getattr__(self, name):
+        # markdown, title, metric, warning, progress, ...
+        return self._element
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _element(self, *args, **kwargs):
+        self.elements += 1
+        return self
+
+    @property
+    def sidebar(self):
+        return self
+
+    def columns(self, spec, **kwargs):
+        return [self] * (spec if isinstance(spec, int) else len(spec))
+
+    def tabs(self, labels, **kwargs):
+        return [self] * len(labels)
+
+    # Elements whose payload the frontend receives serialized
+    def plotly_chart(self, figure, **kwargs):
+        self.elements += 1
+        if figure is not None:
+            figure.to_json()
+
+    def dataframe(self, data, **kwargs):
+        import pyarrow as pa
+
+        self.elements += 1
+        if hasattr(data, "to_html") and not isinstance(data, pd.DataFrame):
+            data.to_html()  # Styler: formatting and colors are computed per cell
+        else:
+            pa.Table.from_pandas(pd.DataFrame(data))
+
+    def download_button(self, label, data, **kwargs):
+        self.elements += 1
+        if callable(data):
+            data = data()
+        if hasattr(data, "read"):
+            data.read()
+        return label in self.clicks
+
+    # Widgets
+    def _answer(self, label, default):
+        return self.answers.get(label, default)
+
+    def button(self, label, **kwargs):
+        return label in self.clicks
+
+    def selectbox(self, label, options, index=0, **kwargs):
+        options = list(options)
+        return self._answer(label, options[index] if options and index is not None else None)
+
+    def radio(self, label, options, index=0, **kwargs):
+        return self.selectbox(label, options, index)
+
+    def multiselect(self, label, options, default=None, **kwargs):
+        return self._answer(label, list(default or []))
+
+    def checkbox(self, label, value=False, **kwargs):
+        return self._answer(label, value)
+
+    toggle = checkbox
+
+    def text_input(self, label, value="", **kwargs):
+        return self._answer(label, value)
+
+    def date_input(self, label, value=None, **kwargs):
+        return self._answer(label, value)
+
+    def number_input(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self._answer(label, value if value is not None else (min_value or 0))
+
+    def slider(self, label, min_value=None, max_value=None, value=None, **kwargs):
+        return self._answer(label, value if value is not None else min_value)
+
+    # Execution control
+    def rerun(self, **kwargs):
+        raise _Rerun()
+
+    def fragment(self, func=None, **kwargs):
+        return func if func is not None else (lambda f: f)
+
+    def cache_data(self, func=None, **kwargs):
+        return func if func is not None else (lambda f: f)
+
+    cache_resource = cache_data
+
+
+@contextmanager
+def stubbed_streamlit(stub: StreamlitStub):
+    """Point the `st` name of every loaded stock_dashboard module at `stub`."""
+    import streamlit
+
+    modules = [module for name, module in list(sys.modules.items())
+               if name.startswith("stock_dashboard.") and getattr(module, "st", None) is streamlit]
+    for module in modules:
+        module.st = stub
+    try:
+        yield stub
+    finally:
+        for module in modules:
+            module.st = streamlit
+
+
+# -------------------- SCENARIOS --------------------
+def dashboard_datasets(portfolio: Portfolio, session_state: dict):
+    """The Dashboard's dataset builders (see Dashboard), bound to one session."""
+    from stock_dashboard.portfolio_state import PortfolioState
+    from stock_dashboard.tab_registry import DatasetResolver
+
+    datasets = DatasetResolver()
+
+    @datasets.register("holdings")
+    def build_holdings(_):
+        return portfolio.frame()
+
+    @datasets.register("portfolio_state")
+    def build_portfolio_state(_):
+        state = session_state.setdefault("portfolio_state", PortfolioState())
+        state.update(portfolio)
+        return state
+
+    @datasets.register("valued_holdings")
+    def build_valued_holdings(resolved):
+        return resolved["portfolio_state"].view()
+
+    @datasets.register("total_value")
+    def build_total_value(resolved):
+        return resolved["portfolio_state"].total_value
+
+    @datasets.register("fig_alloc")
+    def build_fig_alloc(resolved):
+        return resolved["portfolio_state"].figure(
+            "allocation", lambda frame: px.pie(frame, values="value", names="ticker", title="Portfolio Allocation"))
+
+    @datasets.register("fig_region")
+    def build_fig_region(_):
+        return None
+
+    return datasets
+
+
+def _upstream() -> Dict[str, float]:
+    counters = get_metrics().snapshot()["counters"]
+    return {name: sum(s["value"] for s in counters.get(f"upstream_{name}_total", []))
+            for name in ("calls", "tickers", "bytes")}
+
+
+def _render(render, portfolio, session_state, max_reruns: int = 5) -> int:
+    """One script run of a tab, including the reruns it asks for; returns the element count."""
+    from stock_dashboard.tab_registry import render_tab
+
+    stub = StreamlitStub(session_state, clicks=CLICKS)
+    with stubbed_streamlit(stub):
+        for _ in range(max_reruns):
+            try:
+                render_tab(render, dashboard_datasets(portfolio, session_state))
+                break
+            except _Rerun:
+                continue
+    return stub.elements
+
+
+def _finish_exports(portfolio, timeout: float = 3600):
+    """Wait for the export bundle the tab queued (the page polls for it the same way)."""
+    from stock_dashboard.export_jobs import export_key, get_export_queue
+
+    queue, key = get_export_queue(), export_key(portfolio.frame())
+    deadline = time.monotonic() + timeout
+    while (job := queue.status(key)) is not None and job.active and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def run_scenario(tab: str, n_holdings: int, trace_memory: bool = False, fixture: Optional[str] = None,
+                 seed: int = 42) -> Dict[str, Any]:
+    """
+    Render one tab for one portfolio size, cold and then warm, in this process.
+
+    Meant to run in a fresh process (see run_suite): the stores and cache are put in a
+    scratch directory, so the cold render starts from nothing.
+
+    Args:
+        tab (str): Key of TABS.
+        n_holdings (int): Holdings in the portfolio.
+        trace_memory (bool): Measure the cold render's peak traced memory instead of timing it.
+        fixture (str, optional): Recorded fixture directory instead of synthetic data.
+        seed (int): Seed of the synthetic data and quantities.
+
+    Returns:
+        dict: cold_s, warm_s, cold_calls, warm_calls, cold_tickers, cold_bytes and
+        elements, or peak_mb when tracing memory. "error" is set when the tab failed.
+    """
+    scratch = tempfile.mkdtemp(prefix="stock_dashboard_bench_")
+    for var, name in (("STOCK_DASHBOARD_DATA", "prices"), ("STOCK_DASHBOARD_CACHE", "cache.sqlite"),
+                      ("STOCK_DASHBOARD_FEATURES", "features"), ("STOCK_DASHBOARD_EXPORTS", "exports"),
+                      ("STOCK_DASHBOARD_MODELS", "models"), ("STOCK_DASHBOARD_SYMBOLS", "symbols.parquet")):
+        os.environ[var] = os.path.join(scratch, name)
+    try:
+        module_name, func_name = TABS[tab]
+        try:
+            render = getattr(importlib.import_module(module_name), func_name)
+        except (ImportError, SyntaxError) as e:
+            return {"error": f"{module_name}: {type(e).__name__}: {e}"}
+
+        if fixture:
+            provider = LocalProvider.from_directory(fixture)
+            tickers = [t for t in provider.infos if t not in BENCHMARK_TICKERS]
+        else:
+            provider = synthetic_provider(n_holdings, seed)
+            tickers = synthetic_tickers(n_holdings)
+        get_market_data_service().set_provider(provider)
+        portfolio = synthetic_portfolio(tickers, n_holdings, seed)
+        session_state = _SessionState()
+        result = {}
+
+        for phase in ("cold", "warm"):
+            get_metrics().reset()
+            if trace_memory:
+                tracemalloc.start()
+            start = time.perf_counter()
+            try:
+                elements = _render(render, portfolio, session_state)
+                if tab == "export":
+                    _finish_exports(portfolio)
+                    if phase == "cold":
+                        # The run after the job finished, which offers the download
+                        elements = _render(render, portfolio, session_state)
+            except Exception as e:
+                result["error"] = f"{phase}: {type(e).__name__}: {e}"
+                break
+            finally:
+                elapsed = time.perf_counter() - start
+                if trace_memory:
+                    result.setdefault("peak_mb", tracemalloc.get_traced_memory()[1] / 1e6)
+                    tracemalloc.stop()
+            if trace_memory:
+                break
+            upstream = _upstream()
+            result.update({f"{phase}_s": elapsed, f"{phase}_calls": upstream["calls"]})
+            if phase == "cold":
+                result.update(cold_tickers=upstream["tickers"], cold_bytes=upstream["bytes"], elements=elements)
+        return result
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_suite(tabs: Iterable[str] = tuple(TABS), sizes: Iterable[int] = SIZES,
+              fixture: Optional[str] = None, memory: bool = True) -> pd.DataFrame:
+    """
+    Run every (size, tab) scenario, each in a fresh spawned process.
+
+    Returns:
+        pd.DataFrame: One row per scenario (see run_scenario for the columns).
+    """
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as pool:
+        for n in sizes:
+            for tab in tabs:
+                row = {"tab": tab, "holdings": n}
+                row.update(pool.submit(run_scenario, tab, n, False, fixture).result())
+                if memory and "error" not in row:
+                    row.update(pool.submit(run_scenario, tab, n, True, fixture).result())
+                rows.append(row)
+                print(_format_row(row), file=sys.stderr)
+    return pd.DataFrame(rows)
+
+
+# -------------------- REPORTING --------------------
+def _format_row(row: Dict[str, Any]) -> str:
+    if "error" in row and pd.notna(row["error"]):
+        outcome = "skipped" if row["tab"] in KNOWN_BROKEN else "FAILED"
+        return f"{row['tab']:<20} {row['holdings']:>5}  {outcome} ({row['error']})"
+    peak = f"{row['peak_mb']:8.1f} MB" if pd.notna(row.get("peak_mb", np.nan)) else "        -   "
+    return (f"{row['tab']:<20} {row['holdings']:>5}  cold {row['cold_s']:7.2f}s  warm {row['warm_s']:6.2f}s"
+            f"  peak {peak}  upstream calls {row['cold_calls']:.0f} cold / {row['warm_calls']:.0f} warm"
+            f"  ({row['cold_tickers']:.0f} tickers, {row['cold_bytes'] / 1e6:.1f} MB)")
+
+
+def check_thresholds(results: pd.DataFrame, thresholds: Optional[Dict] = None) -> List[str]:
+    """
+    Compare results with the regression thresholds. A scenario that failed counts
+    as a failure unless its tab is in KNOWN_BROKEN.
+
+    Args:
+        results (pd.DataFrame): Output of run_suite.
+        thresholds (dict, optional): tab -> size -> limit name -> maximum. Defaults to THRESHOLDS.
+
+    Returns:
+        list: One message per failed scenario or exceeded limit (empty when everything passed).
+    """
+    thresholds = thresholds or THRESHOLDS
+    failures = []
+    for row in results.to_dict("records"):
+        if pd.notna(row.get("error", np.nan)):
+            if row["tab"] not in KNOWN_BROKEN:
+                failures.append(f"{row['tab']} ({row['holdings']} holdings): failed: {row['error']}")
+            continue
+        limits = thresholds.get(row["tab"], {}).get(row["holdings"], {})
+        for limit, maximum in limits.items():
+            value = row.get(limit)
+            if value is not None and pd.notna(value) and value > maximum:
+                failures.append(f"{row['tab']} ({row['holdings']} holdings): {limit} = {value:.2f} > {maximum}")
+    return failures
+
+
+def _load_thresholds(path: str) -> Dict:
+    """JSON thresholds file with the THRESHOLDS layout (sizes as string keys)."""
+    with open(path) as f:
+        data = json.load(f)
+    return {tab: {int(n): limits for n, limits in sizes.items()} for tab, sizes in data.items()}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the Dashboard tabs offline.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="Portfolio sizes (holdings)")
+    parser.add_argument("--tabs", nargs="+", default=list(TABS), choices=list(TABS), help="Tabs to render")
+    parser.add_argument("--fixture", default=None, help="Recorded fixture directory instead of synthetic data")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced-memory runs")
+    parser.add_argument("--thresholds", default=None, help="JSON file overriding the regression thresholds")
+    parser.add_argument("--json", default=None, help="Write the results to this JSON file")
+    parser.add_argument("--record", default=None, help="Record a fixture from Yahoo Finance into this directory")
+    parser.add_argument("--tickers", nargs="+", default=[], help="Tickers to record (with --record)")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        if not args.tickers:
+            parser.error("--record needs --tickers")
+        record_fixture(args.tickers, args.record)
+        print(f"Recorded {len(args.tickers)} tickers into {args.record}", file=sys.stderr)
+        return
+
+    results = run_suite(args.tabs, args.sizes, args.fixture, memory=not args.no_memory)
+    if args.json:
+        results.to_json(args.json, orient="records", indent=2)
+    failures = check_thresholds(results, _load_thresholds(args.thresholds) if args.thresholds else None)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+29. Report
+
+PDF portfolio report, rendered entirely in memory. The report has a summary page
+(sector allocation and a fundamentals overview table) followed by one section per
+ticker with its key figures and a one-year price chart.
+
+Price charts are small PNGs drawn with Pillow. Each is rendered once per ticker and
+trading day and kept in the shared cache, so later reports (and other sessions)
+reuse the image bytes instead of redrawing them.
+
+"""
+from datetime import date
+from io import BytesIO
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+from PIL import Image, ImageDraw
+from stock_dashboard.cache import DAILY_BARS, get_cache
+from stock_dashboard.price_store import get_price_store
+
+CHART_SIZE = (480, 150)  # pixels
+CHART_WIDTH_MM = 95
+SECTION_HEIGHT_MM = 62
+
+# Chart palette: white, grid, label, up, down. Palette images are a quarter the
+# size of RGB ones and much faster to encode and embed.
+CHART_PALETTE = [(255, 255, 255), (225, 225, 232), (90, 90, 90), (30, 160, 90), (200, 60, 60)]
+WHITE, GRID, LABEL, UP, DOWN = range(len(CHART_PALETTE))
+HEADER_FILL = (230, 230, 240)
+ROW_HEIGHT_MM = 5
+
+OVERVIEW_COLUMNS = {  # column -> width in mm
+    "Ticker": 24, "Sector": 48, "Market Cap": 28, "P/E": 18, "Dividend Yield": 26, "Beta": 16, "52W High": 20,
+}
+
+
+# -------------------- FORMATTING --------------------
+def _text(value) -> str:
+    """Cell text in the core fonts' latin-1 range; missing values become "-"."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "-"
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+
+def _number(value, digits: int = 2, suffix: str = "") -> str:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "-"
+    if np.isnan(value):
+        return "-"
+    return f"{value:,.{digits}f}{suffix}"
+
+
+def _money(value) -> str:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "-"
+    if np.isnan(value):
+        return "-"
+    for unit, scale in (("T", 1e12), ("B", 1e9), ("M", 1e6)):
+        if abs(value) >= scale:
+            return f"{value / scale:,.2f}{unit}"
+    return f"{value:,.0f}"
+
+
+def _yield(value) -> str:
+    try:
+        return _number(float(value) * 100, suffix="%")
+    except (TypeError, ValueError):
+        return "-"
+
+
+# -------------------- CHARTS --------------------
+def render_price_chart(closes: pd.Series, size=CHART_SIZE) -> bytes:
+    """
+    Draw a price line chart as PNG bytes (green when the period return is positive).
+
+    Args:
+        closes (pd.Series): Closing prices in date order.
+        size (tuple): Width and height in pixels.
+
+    Returns:
+        bytes: The PNG image.
+    """
+    width, height = size
+    pad = 6
+    image = Image.new("P", size, WHITE)
+    image.putpalette([channel for color in CHART_PALETTE for channel in color])
+    draw = ImageDraw.Draw(image)
+    for fraction in (0.25, 0.5, 0.75):
+        y = pad + fraction * (height - 2 * pad)
+        draw.line([(pad, y), (width - pad, y)], fill=GRID)
+
+    values = closes.dropna().to_numpy(dtype="float64")
+    if len(values) >= 2:
+        low, high = values.min(), values.max()
+        span = high - low or 1.0
+        xs = np.linspace(pad, width - pad, len(values))
+        ys = height - pad - (values - low) / span * (height - 2 * pad)
+        color = UP if values[-1] >= values[0] else DOWN
+        draw.line(list(zip(xs.tolist(), ys.tolist())), fill=color, width=2)
+        draw.text((pad + 2, pad), f"{high:,.2f}", fill=LABEL)
+        draw.text((pad + 2, height - pad - 12), f"{low:,.2f}", fill=LABEL)
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def price_charts(tickers: Iterable[str], period: str = "1y",
+                 prices: Optional[pd.DataFrame] = None) -> Dict[str, bytes]:
+    """
+    PNG price chart of each ticker.
+
+    Args:
+        tickers (iterable): Ticker symbols.
+        period (str): Window of the charts.
+        prices (pd.DataFrame, optional): Close panel (dates x tickers) to draw from.
+            When omitted, charts are served from the cache and only missing ones are
+            drawn from the price store and cached until the next market close.
+
+    Returns:
+        dict: Ticker -> PNG bytes, for tickers with price history.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    if prices is not None:
+        return {t: render_price_chart(prices[t]) for t in tickers if t in prices}
+
+    cache = get_cache()
+    keys = {t: f"price_chart:{t}:{period}" for t in tickers}
+    hits = cache.get_many(DAILY_BARS, keys.values())
+    charts = {t: hits[keys[t]] for t in tickers if keys[t] in hits}
+    missing = [t for t in tickers if t not in charts]
+    if missing:
+        panel = get_price_store().close_panel(missing, period=period)
+        drawn = {t: render_price_chart(panel[t]) for t in missing if t in panel}
+        cache.set_many(DAILY_BARS, {keys[t]: png for t, png in drawn.items()})
+        charts.update(drawn)
+    return {t: charts[t] for t in tickers if t in charts}
+
+
+# -------------------- REPORT --------------------
+class _ReportPDF(FPDF):
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Helvetica", size=8)
+        self.set_text_color(120, 120, 120)
+        self.cell(0, 8, f"Page {self.page_no()}/{{nb}}", align="C")
+        self.set_text_color(0, 0, 0)
+
+
+def _sector_bars(pdf: FPDF, sectors: pd.Series, width: float = 120):
+    """Horizontal bar chart of holdings per sector, drawn as vector shapes."""
+    counts = sectors.fillna("Unknown").map(_text).value_counts()
+    if counts.empty:
+        return
+    label_width = 50
+    bar_scale = (width - label_width - 15) / counts.max()
+    pdf.set_font("Helvetica", size=9)
+    pdf.set_fill_color(99, 110, 250)
+    for sector, count in counts.items():
+        y = pdf.get_y()
+        pdf.cell(label_width, 6, sector[:30])
+        pdf.rect(pdf.l_margin + label_width, y + 1, count * bar_scale, 4, style="F")
+        pdf.set_x(pdf.l_margin + label_width + count * bar_scale + 2)
+        pdf.cell(15, 6, str(count), new_x="LMARGIN", new_y="NEXT")
+
+
+def _table(pdf: FPDF, widths, rows, header=None):
+    """
+    Single-line bordered table drawn with plain cells (fpdf2's `table()` measures and
+    wraps every cell, which is far slower on reports with thousands of rows).
+    Text longer than its column is cut off; the header is repeated after page breaks.
+    """
+    def draw(cells, fill=False):
+        for width, text in zip(widths, cells):
+            # Helvetica at 8pt averages ~1.6 mm per character
+            pdf.cell(width, ROW_HEIGHT_MM, text[:int(width / 1.6)], border=1, fill=fill)
+        pdf.ln(ROW_HEIGHT_MM)
+
+    def draw_header():
+        if header is not None:
+            pdf.set_font(style="B")
+            pdf.set_fill_color(*HEADER_FILL)
+            draw(header, fill=True)
+            pdf.set_font(style="")
+
+    draw_header()
+    for cells in rows:
+        if pdf.will_page_break(ROW_HEIGHT_MM):
+            pdf.add_page()
+            draw_header()
+        draw(cells)
+
+
+def _overview_table(pdf: FPDF, fundamentals: pd.DataFrame):
+    formatters = {"Market Cap": _money, "P/E": _number, "Dividend Yield": _yield,
+                  "Beta": _number, "52W High": _number}
+    columns = [c for c in OVERVIEW_COLUMNS if c in fundamentals.columns]
+    pdf.set_font("Helvetica", size=8)
+    rows = ([formatters.get(c, _text)(v) for c, v in zip(columns, record)]
+            for record in fundamentals[columns].itertuples(index=False))
+    _table(pdf, [OVERVIEW_COLUMNS[c] for c in columns], rows, header=columns)
+
+
+def _ticker_section(pdf: FPDF, row: pd.Series, quantity, chart: Optional[bytes]):
+    if pdf.will_page_break(SECTION_HEIGHT_MM):
+        pdf.add_page()
+    top = pdf.get_y()
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 8, _text(row.get("Ticker")), new_x="LMARGIN", new_y="NEXT")
+
+    figures = [
+        ("Sector", _text(row.get("Sector"))),
+        ("Industry", _text(row.get("Industry"))),
+        ("Exchange", _text(row.get("Exchange"))),
+        ("Quantity", _number(quantity, 0) if quantity is not None else "-"),
+        ("Market Cap", _money(row.get("Market Cap"))),
+        ("P/E / Forward EPS", f"{_number(row.get('P/E'))} / {_number(row.get('Forward EPS'))}"),
+        ("Dividend Yield", _yield(row.get("Dividend Yield"))),
+        ("Beta / Price to Book", f"{_number(row.get('Beta'))} / {_number(row.get('Price to Book'))}"),
+        ("52W Range", f"{_number(row.get('52W Low'))} - {_number(row.get('52W High'))}"),
+    ]
+    pdf.set_font("Helvetica", size=8)
+    _table(pdf, (30, 50), figures)
+
+    if chart is not None:
+        # fpdf2 embeds identical image bytes only once per document
+        pdf.image(BytesIO(chart), x=pdf.l_margin + 88, y=top + 9, w=CHART_WIDTH_MM)
+    pdf.set_y(max(pdf.get_y(), top + SECTION_HEIGHT_MM - 6))
+
+
+def build_pdf_report(fundamentals: pd.DataFrame, holdings: Optional[pd.DataFrame] = None,
+                     period: str = "1y", prices: Optional[pd.DataFrame] = None,
+                     as_of: Optional[date] = None) -> bytes:
+    """
+    Render the portfolio PDF report in memory.
+
+    Args:
+        fundamentals (pd.DataFrame): One row per ticker (see export_pipeline.FUNDAMENTAL_COLUMNS).
+        holdings (pd.DataFrame, optional): "ticker" and "quantity" columns, for the quantities.
+        period (str): Window of the price charts.
+        prices (pd.DataFrame, optional): Close panel to draw the charts from instead of the store.
+        as_of (date, optional): Date printed on the report. Defaults to today.
+
+    Returns:
+        bytes: The PDF document.
+    """
+    quantities = {}
+    if holdings is not None and not holdings.empty:
+        quantities = pd.to_numeric(holdings["quantity"], errors="coerce").groupby(holdings["ticker"]).sum().to_dict()
+    charts = price_charts(fundamentals["Ticker"], period, prices) if not fundamentals.empty else {}
+
+    pdf = _ReportPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, "Portfolio Summary Report", align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", size=10)
+    pdf.cell(0, 6, f"{len(fundamentals)} holdings - as of {(as_of or date.today()):%Y-%m-%d}",
+             align="C", new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(6)
+
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, "Sector Allocation", new_x="LMARGIN", new_y="NEXT")
+    if "Sector" in fundamentals:
+        _sector_bars(pdf, fundamentals["Sector"])
+    pdf.ln(6)
+
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, "Fundamentals Overview", new_x="LMARGIN", new_y="NEXT")
+    _overview_table(pdf, fundamentals)
+
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, "Holdings", new_x="LMARGIN", new_y="NEXT")
+    for _, row in fundamentals.iterrows():
+        ticker = row.get("Ticker")
+        _ticker_section(pdf, row, quantities.get(ticker), charts.get(ticker))
+
+    return bytes(pdf.output())
@@ -0,0 +1,282 @@
+"""
+26. RiskModel
+
+Versioned risk-classification model. The random forest is trained once, offline, on
+the features of a broad ticker universe and saved to a model registry together with
+its version and feature schema. The dashboard and the batch runner only load the
+latest model (once per process) and run inference on it.
+
+The rule-based labels the model learns from are a declarative threshold table,
+evaluated with NumPy masks over the whole feature matrix. The table can be replaced
+from a JSON or CSV file ($STOCK_DASHBOARD_RISK_RULES) without code changes.
+
+Train with: python -m stock_dashboard.risk_model universe.txt [--fixture DIR]
+
+"""
+import argparse
+import json
+import os
+import pickle
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestClassifier
+from stock_dashboard.instrumentation import record_swallowed
+
+FEATURE_SCHEMA = ["Volatility", "Beta", "P/E Ratio", "Dividend Yield", "Price Std Dev"]
+RISK_LEVELS = ["Low", "Moderate", "High"]
+
+DEFAULT_ROOT = os.path.join(os.path.expanduser("~"), ".stock_dashboard", "models")
+
+# -------------------- RULES --------------------
+# One row per condition; conditions sharing a rule name are OR'ed and the rule adds
+# its points once when any of them holds. Missing feature values never trigger a rule.
+DEFAULT_RISK_RULES = [
+    {"rule": "High Volatility/Beta", "feature": "Volatility", "op": ">", "threshold": 0.35, "points": 2},
+    {"rule": "High Volatility/Beta", "feature": "Beta", "op": ">", "threshold": 1.2, "points": 2},
+    {"rule": "High P/E", "feature": "P/E Ratio", "op": ">", "threshold": 30, "points": 1},
+    {"rule": "Low Dividend Yield", "feature": "Dividend Yield", "op": "<", "threshold": 1, "points": 1},
+]
+
+# Minimum score for each level, checked from the top; lower scores are "Low"
+DEFAULT_RISK_CUTOFFS = {"High": 3, "Moderate": 2}
+
+_OPERATORS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+
+
+def load_risk_rules(path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load the risk threshold table.
+
+    Args:
+        path (str, optional): JSON (list of rows) or CSV file with rule, feature, op,
+            threshold and points columns. Defaults to $STOCK_DASHBOARD_RISK_RULES,
+            then to DEFAULT_RISK_RULES.
+
+    Returns:
+        pd.DataFrame: The rule table.
+    """
+    path = path or os.environ.get("STOCK_DASHBOARD_RISK_RULES")
+    if not path:
+        return pd.DataFrame(DEFAULT_RISK_RULES)
+    if path.lower().endswith(".csv"):
+        rules = pd.read_csv(path)
+    else:
+        with open(path) as f:
+            rules = pd.DataFrame(json.load(f))
+    unknown = set(rules["op"]) - set(_OPERATORS)
+    if unknown:
+        raise ValueError(f"Unknown risk rule operators: {sorted(unknown)}")
+    return rules
+
+
+def score_risk(feature_df: pd.DataFrame, rules: Optional[pd.DataFrame] = None,
+               cutoffs: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Score every row against the threshold table in one pass.
+
+    Args:
+        feature_df (pd.DataFrame): One row per ticker with the features the rules name.
+        rules (pd.DataFrame, optional): Threshold table. Defaults to `load_risk_rules()`.
+        cutoffs (dict, optional): Level -> minimum score. Defaults to DEFAULT_RISK_CUTOFFS.
+
+    Returns:
+        pd.DataFrame: One "Rule: <name>" column with the points each rule contributed,
+        then "Risk Score" and "Risk", indexed like `feature_df`.
+    """
+    rules = load_risk_rules() if rules is None else rules
+    cutoffs = DEFAULT_RISK_CUTOFFS if cutoffs is None else cutoffs
+    contributions = {}
+    for name, conditions in rules.groupby("rule", sort=False):
+        hit = np.zeros(len(feature_df), dtype=bool)
+        for feature, op, threshold in conditions[["feature", "op", "threshold"]].itertuples(index=False):
+            values = feature_df[feature].to_numpy(dtype="float64")
+            with np.errstate(invalid="ignore"):
+                hit |= _OPERATORS[op](values, threshold)
+        contributions[f"Rule: {name}"] = np.where(hit, conditions["points"].iloc[0], 0)
+
+    scores = pd.DataFrame(contributions, index=feature_df.index)
+    scores["Risk Score"] = scores.sum(axis=1) if contributions else 0
+    levels = sorted(cutoffs.items(), key=lambda item: item[1], reverse=True)
+    scores["Risk"] = np.select([scores["Risk Score"].to_numpy() >= cutoff for _, cutoff in levels],
+                               [level for level, _ in levels], default="Low")
+    return scores
+
+
+@dataclass
+class RiskModel:
+    """A trained classifier plus its feature schema; `classes` maps predicted codes to levels."""
+    version: str
+    features: List[str]
+    classes: List[str]
+    model: Any
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def predict(self, feature_df: pd.DataFrame) -> np.ndarray:
+        """
+        Predict a risk level for each row.
+
+        Raises:
+            ValueError: If a feature of the model's schema is missing.
+        """
+        missing = [f for f in self.features if f not in feature_df.columns]
+        if missing:
+            raise ValueError(f"Risk model {self.version} needs features {missing}")
+        if feature_df.empty:
+            return np.array([], dtype=object)
+        codes = self.model.predict(feature_df[self.features].to_numpy(dtype="float64"))
+        return np.asarray(self.classes, dtype=object)[codes]
+
+
+def train_risk_model(feature_df: pd.DataFrame, version: Optional[str] = None,
+                     n_estimators: int = 100, random_state: int = 42) -> RiskModel:
+    """
+    Fit the classifier on rule-labelled feature rows.
+
+    Args:
+        feature_df (pd.DataFrame): One row per (ticker, snapshot) with the FEATURE_SCHEMA columns.
+        version (str, optional): Model version. Defaults to a UTC timestamp.
+        n_estimators (int): Number of trees.
+        random_state (int): Seed, so retraining on the same data gives the same model.
+
+    Returns:
+        RiskModel: The trained model.
+    """
+    rows = feature_df.dropna(subset=FEATURE_SCHEMA)
+    if rows.empty:
+        raise ValueError("No complete feature rows to train the risk model on")
+    rules = load_risk_rules()
+    labels = score_risk(rows, rules)["Risk"]
+    codes = labels.map({level: i for i, level in enumerate(RISK_LEVELS)}).to_numpy()
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    model.fit(rows[FEATURE_SCHEMA].to_numpy(dtype="float64"), codes)
+    metadata = {
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "training_rows": len(rows),
+        "label_counts": labels.value_counts().to_dict(),
+        "sklearn_version": sklearn.__version__,
+        "risk_rules": rules.to_dict("records"),
+    }
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    return RiskModel(version, list(FEATURE_SCHEMA), list(RISK_LEVELS), model, metadata)
+
+
+class ModelRegistry:
+    """
+    Directory of pickled model versions plus a manifest naming the latest one.
+
+    Args:
+        root (str, optional): Registry directory. Defaults to $STOCK_DASHBOARD_MODELS or ~/.stock_dashboard/models.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.environ.get("STOCK_DASHBOARD_MODELS", DEFAULT_ROOT)
+        self._manifest_path = os.path.join(self.root, "manifest.json")
+
+    def _path(self, version: str) -> str:
+        return os.path.join(self.root, f"risk_model-{version}.pkl")
+
+    def manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"latest": None, "versions": {}}
+
+    def versions(self) -> List[str]:
+        """Saved versions, oldest first."""
+        return sorted(self.manifest()["versions"])
+
+    def save(self, model: RiskModel, make_latest: bool = True):
+        """Store a model version (atomically) and optionally point `latest` at it."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._path(model.version) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(model.version))
+
+        manifest = self.manifest()
+        manifest["versions"][model.version] = {"features": model.features, **model.metadata}
+        if make_latest:
+            manifest["latest"] = model.version
+        tmp_path = self._manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_path, self._manifest_path)
+
+    def load(self, version: Optional[str] = None) -> Optional[RiskModel]:
+        """
+        Load a model version (the latest by default).
+
+        Returns:
+            RiskModel or None: None when the registry has no such model.
+
+        Raises:
+            ValueError: If the stored model's feature schema differs from FEATURE_SCHEMA.
+        """
+        version = version or self.manifest()["latest"]
+        if version is None or not os.path.exists(self._path(version)):
+            return None
+        with open(self._path(version), "rb") as f:
+            model = pickle.load(f)
+        if model.features != FEATURE_SCHEMA:
+            raise ValueError(f"Risk model {version} was trained on {model.features}, expected {FEATURE_SCHEMA}")
+        return model
+
+
+_model: Optional[RiskModel] = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_risk_model() -> Optional[RiskModel]:
+    """
+    Return the registry's latest model, loaded once per process (None if none was
+    trained, or if it cannot be used; the rule-based label is used instead).
+    """
+    global _model, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                try:
+                    _model = ModelRegistry().load()
+                except Exception as e:
+                    # e.g. a model trained on another feature schema, or an unreadable pickle
+                    record_swallowed("get_risk_model", e)
+                    _model = None
+                _loaded = True
+    return _model
+
+
+def main(argv: Optional[List[str]] = None):
+    from stock_dashboard.analytics import risk_features
+    from stock_dashboard.market_data import LocalProvider, get_market_data_service
+    # Run as `python -m`, this file is __main__; train through the package module so the
+    # pickle names stock_dashboard.risk_model.RiskModel, which get_risk_model can load.
+    from stock_dashboard.risk_model import ModelRegistry, train_risk_model
+
+    parser = argparse.ArgumentParser(description="Train the risk model and save it to the registry.")
+    parser.add_argument("universe", help="Text file with one ticker per line")
+    parser.add_argument("--version", default=None, help="Model version (default: UTC timestamp)")
+    parser.add_argument("--fixture", default=None, help="Offline data fixture directory instead of Yahoo Finance")
+    parser.add_argument("--registry", default=None, help="Registry directory")
+    args = parser.parse_args(argv)
+
+    if args.fixture:
+        get_market_data_service().set_provider(LocalProvider.from_directory(args.fixture))
+    with open(args.universe) as f:
+        tickers = [line.strip().upper() for line in f if line.strip() and not line.startswith("#")]
+
+    model = train_risk_model(risk_features(tickers), version=args.version)
+    ModelRegistry(args.registry).save(model)
+    print(f"risk model {model.version}: {model.metadata['training_rows']} rows, "
+          f"labels {model.metadata['label_counts']}")
+
+
+if __name__ == "__main__":
+    main()
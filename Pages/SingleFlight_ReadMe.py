@@ -0,0 +1,92 @@
+"""
+19. SingleFlight
+
+Request coalescing for the data-access path. Streamlit runs every browser session as a
+thread of the same server process, so when many sessions ask for the same
+(symbol, dataset, window) at once, one of them performs the upstream fetch and the
+others wait for its result instead of stampeding Yahoo.
+
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, Iterable, List
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent work by key.
+
+    The first caller for a key becomes its leader and runs the work; callers that
+    arrive while it is in flight wait and receive the leader's result (or exception).
+    Nothing is kept after the flight lands; caching is the caller's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.led = 0
+        self.shared = 0
+
+    def do_many(self, keys: Iterable[Hashable], work: Callable[[List[Hashable]], Dict[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        Run `work` for the keys nobody else is fetching, and wait for the rest.
+
+        Args:
+            keys (iterable): Keys needed by this caller.
+            work (callable): Takes the list of keys this caller leads and returns a
+                dict of key -> value (missing keys resolve to None).
+
+        Returns:
+            dict: Key -> value for every requested key.
+        """
+        keys = list(dict.fromkeys(keys))
+        leading, following = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self._calls:
+                    following[key] = self._calls[key]
+                else:
+                    leading[key] = self._calls[key] = _Call()
+            self.led += len(leading)
+            self.shared += len(following)
+
+        results = {}
+        if leading:
+            try:
+                values = work(list(leading)) or {}
+                for key, call in leading.items():
+                    call.value = results[key] = values.get(key)
+            except BaseException as e:
+                for call in leading.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key, call in leading.items():
+                        del self._calls[key]
+                        call.done.set()
+
+        for key, call in following.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.value
+        return {key: results[key] for key in keys}
+
+    def do(self, key: Hashable, work: Callable[[], Any]) -> Any:
+        """Run `work()` once for all concurrent callers of `key` and return its result."""
+        return self.do_many([key], lambda _: {key: work()})[key]
+
+
+_flights = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide SingleFlight shared by every session."""
+    return _flights
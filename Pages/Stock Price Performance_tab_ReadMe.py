@@ -6,12 +6,18 @@ This chart shows how the stock prices have evolved over time for the selected po
 # Import necessary libraries
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import plotly.graph_objects as go
 import numpy as np
+from stock_dashboard.analytics import period_returns
+from stock_dashboard.cache import DAILY_BARS, cached
+from stock_dashboard.fx import fx_panel, to_usd
+from stock_dashboard.indicators import rolling_volatility
+from stock_dashboard.instrumentation import record_swallowed
+from stock_dashboard.symbol_index import symbol_attributes
+from stock_dashboard.price_store import get_price_store
+from stock_dashboard.tab_registry import requires
 
 # Caching data to improve performance and reduce API calls
-@st.cache_data
 def get_ticker_currencies(tickers):
     """
     Fetches the currency of each ticker. Defaults to USD if unavailable.
@@ -22,43 +28,24 @@ def get_ticker_currencies(tickers):
     Returns:
         dict: A dictionary mapping tickers to their respective currencies.
     """
-    currencies = {}
-    for ticker in tickers:
-        try:
-            info = yf.Ticker(ticker).info
-            currencies[ticker] = info.get("currency", "USD")
-        except:
-            currencies[ticker] = "USD"
-    return currencies
+    # Read from the symbol index; only tickers it does not know are fetched, in one batch
+    return symbol_attributes(tickers, "currency")
 
-@st.cache_data
-def fetch_fx_rates(currencies):
+@cached(DAILY_BARS)
+def fetch_fx_rates(currencies, start):
     """
-    Fetches the exchange rates for all currencies in the portfolio (converting to USD).
+    Fetches daily exchange rates to USD for all currencies in the portfolio.
     
     Parameters:
-        currencies (set): A set of unique currencies in the portfolio.
+        currencies (list): Unique currencies in the portfolio.
+        start (date): Earliest date needed.
         
     Returns:
-        dict: A dictionary mapping each currency to its exchange rate against USD.
+        pd.DataFrame: Rates indexed by date, one column per currency.
     """
-    fx_rates = {}
-    for curr in currencies:
-        if curr == "USD":
-            fx_rates[curr] = 1.0
-        else:
-            fx_symbol = f"{curr}USD=X"
-            try:
-                fx_data = yf.download(fx_symbol, period="7d", interval="1d", progress=False)
-                if not fx_data.empty:
-                    fx_rates[curr] = fx_data["Adj Close"].iloc[-1]
-                else:
-                    fx_rates[curr] = None
-            except:
-                fx_rates[curr] = None
-    return fx_rates
+    return fx_panel(currencies, start=start)
 
-@st.cache_data(show_spinner=True)
+@cached(DAILY_BARS)
 def fetch_price_history(tickers, start):
     """
     Fetches the historical stock price data for the specified tickers.
@@ -71,9 +58,10 @@ def fetch_price_history(tickers, start):
         pd.DataFrame: A DataFrame with stock price data.
     """
     try:
-        data = yf.download(tickers, start=start, auto_adjust=True, progress=False)["Close"]
+        data = get_price_store().close_panel(tickers, start=start)
         return data.dropna(axis=1, how="all") if not data.empty else pd.DataFrame()
-    except:
+    except Exception as e:
+        record_swallowed("fetch_price_history", e)
         return pd.DataFrame()
 
 @st.cache_data(show_spinner=True)
@@ -87,29 +75,9 @@ def calculate_returns(prices):
     Returns:
         pd.DataFrame: A DataFrame of the calculated returns for each stock.
     """
-    returns = pd.DataFrame(index=prices.columns)
-    today = prices.index[-1]
-
-    def calc_return(days):
-        try:
-            past = prices.index[-1] - pd.Timedelta(days=days)
-            past_idx = prices.index[prices.index >= past][0]
-            return ((prices.loc[today] - prices.loc[past_idx]) / prices.loc[past_idx]) * 100
-        except:
-            return pd.Series(np.nan, index=prices.columns)
-
-    # Calculating returns for 1M, 6M, 1Y, and 5Y
-    returns["1M"] = calc_return(30)
-    returns["6M"] = calc_return(180)
-    returns["1Y"] = calc_return(365)
-    returns["5Y"] = calc_return(1825)
-    
-    # Calculating maximum drawdown
-    returns["Max Drawdown %"] = (
-        prices.apply(lambda x: ((x / x.cummax()) - 1).min() * 100)
-    )
-    return returns.round(2)
+    return period_returns(prices)
 
+@requires("holdings")
 def render_value_over_time_tab(df):
     """
     Renders the Stock Price Performance Over Time tab in the Streamlit app.
@@ -186,12 +154,14 @@ def render_value_over_time_tab(df):
     benchmark_data = price_data[benchmarks].dropna(axis=1, how="all") if benchmarks else pd.DataFrame()
     stock_data = price_data.drop(columns=benchmarks, errors="ignore")
 
-    # FX Conversion (silent)
+    # FX Conversion
     currencies = get_ticker_currencies(stock_data.columns.tolist())
-    fx_rates = fetch_fx_rates(set(currencies.values()))
-    for ticker in stock_data.columns:
-        fx = fx_rates.get(currencies.get(ticker, "USD"), 1.0) or 1.0
-        stock_data[ticker] *= fx
+    fx_rates = fetch_fx_rates(sorted(set(currencies.values())), start=start_date)
+    stock_data = to_usd(stock_data, currencies, fx=fx_rates)
+    no_rate = stock_data.columns[stock_data.isna().all()]
+    if len(no_rate):
+        st.warning(f"No USD exchange rate for {', '.join(f'{t} ({currencies.get(t)})' for t in no_rate)}; left out.")
+        stock_data = stock_data.drop(columns=no_rate)
 
     # Chart Controls
     st.subheader("Chart Options")
@@ -256,15 +226,15 @@ def render_value_over_time_tab(df):
         return "color: white"
 
     # Styling the returns table
-    styled_df = returns_df.style.format("{:.2f}%").applymap(colorize)
+    styled_df = returns_df.style.format("{:.2f}%").map(colorize)
     st.dataframe(styled_df, use_container_width=True)
 
     # Rolling Volatility Chart
     st.subheader("30-Day Rolling Volatility")
     vol_fig = go.Figure()
+    rolling_vols = rolling_volatility(stock_data[selected_tickers], 30, periods_per_year=None) * 100
     for ticker in selected_tickers:
-        returns = stock_data[ticker].pct_change().dropna()
-        rolling_vol = returns.rolling(30).std() * 100
+        rolling_vol = rolling_vols[ticker].dropna()
         vol_fig.add_trace(go.Scatter(
             x=rolling_vol.index,
             y=rolling_vol,
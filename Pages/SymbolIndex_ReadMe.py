@@ -0,0 +1,330 @@
+"""
+35. SymbolIndex
+
+Local symbol master: ticker, name, exchange, currency and sector of every known
+listing. It is stored as one dictionary-encoded Parquet table and held in memory as
+sorted arrays, so ticker validation is a hash lookup, autocomplete is a binary search
+over tickers and names, and the sector, currency and exchange of a holding are read
+without fetching its info.
+
+The index is filled in bulk: from a listing file (CSV, TXT, Parquet or an info.json
+fixture) or by refreshing every indexed ticker with one batched fundamentals lookup.
+Tickers it does not know yet are looked up in one batch when they are first asked
+for and added to it.
+
+Load or refresh with: python -m stock_dashboard.symbol_index [--load FILE] [--refresh] [--fixture DIR]
+
+"""
+import argparse
+import bisect
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from stock_dashboard.market_data import LocalProvider, MarketDataService, TickerSnapshot, get_market_data_service
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".stock_dashboard", "symbols.parquet")
+
+SYMBOL_COLUMNS = ["ticker", "name", "exchange", "currency", "sector"]
+# Low-cardinality columns, stored as categories (dictionary-encoded in the file)
+CATEGORY_COLUMNS = ["exchange", "currency", "sector"]
+
+# Yahoo symbol: letters, digits and . - = ^ (e.g. BRK-B, ULVR.L, GBPUSD=X, ^GSPC)
+SYMBOL = r"\^?[A-Z0-9][A-Z0-9.\-=]{0,19}"
+
+# Column names of common listing files (NASDAQ Trader, exchange downloads, screeners)
+LISTING_COLUMNS = {
+    "ticker": ["ticker", "symbol", "act symbol", "code"],
+    "name": ["name", "security name", "company name", "company", "longname", "description"],
+    "exchange": ["exchange", "listing exchange", "exchange code", "mic"],
+    "currency": ["currency", "trading currency"],
+    "sector": ["sector", "gics sector"],
+}
+
+
+@dataclass(frozen=True)
+class SymbolRecord:
+    """One listing; fields the source did not provide are ""."""
+    ticker: str
+    name: str = ""
+    exchange: str = ""
+    currency: str = ""
+    sector: str = ""
+
+
+def _normalize(frame: pd.DataFrame) -> pd.DataFrame:
+    """SYMBOL_COLUMNS as strings ("" when missing), valid tickers only, one row per ticker."""
+    frame = frame.reindex(columns=SYMBOL_COLUMNS)
+    frame["ticker"] = frame["ticker"].fillna("").astype(str).str.strip().str.upper()
+    for column in SYMBOL_COLUMNS[1:]:
+        frame[column] = frame[column].astype(object).where(frame[column].notna(), "").astype(str).str.strip()
+    frame = frame[frame["ticker"].str.fullmatch(SYMBOL)]
+    return frame.drop_duplicates("ticker", keep="last").sort_values("ticker", ignore_index=True)
+
+
+def read_listing(path: str) -> pd.DataFrame:
+    """
+    Read a listing file into SYMBOL_COLUMNS.
+
+    Args:
+        path (str): CSV or pipe/tab-separated TXT with a header row, Parquet, or a
+            fixture info.json (ticker -> info).
+
+    Returns:
+        pd.DataFrame: One row per valid ticker; footer and test rows are dropped.
+    """
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            infos = json.load(f)
+        frame = pd.DataFrame([
+            {"ticker": ticker, "name": info.get("longName") or info.get("shortName"), "exchange": info.get("exchange"),
+             "currency": info.get("currency"), "sector": info.get("sector")}
+            for ticker, info in infos.items()
+        ])
+        return _normalize(frame)
+    if path.lower().endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        with open(path, encoding="utf-8-sig") as f:
+            header = f.readline()
+        frame = pd.read_csv(path, sep=max([",", "|", "\t", ";"], key=header.count), dtype=str,
+                            encoding="utf-8-sig", index_col=False)
+    by_name = {str(c).strip().lower(): c for c in frame.columns}
+    renames = {}
+    for column, aliases in LISTING_COLUMNS.items():
+        source = next((by_name[a] for a in aliases if a in by_name), None)
+        if source is not None:
+            renames[source] = column
+    if "ticker" not in renames.values():
+        raise ValueError(f"{path}: no ticker or symbol column")
+    frame = frame.rename(columns=renames)
+    if "test issue" in by_name:
+        frame = frame[frame[by_name["test issue"]].fillna("N").str.upper() != "Y"]
+    return _normalize(frame)
+
+
+def resolved(snapshot: TickerSnapshot) -> bool:
+    """Whether the provider answered for the ticker (failed tickers get an empty snapshot)."""
+    return bool(snapshot.exchange) or snapshot.price > 0
+
+
+class _Arrays:
+    """One immutable build of the index; readers never see a half-built one."""
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame.astype({c: "category" for c in CATEGORY_COLUMNS})
+        # Column arrays for lookups (category values are shared, not copied per row)
+        self.values = {c: self.frame[c].to_numpy(dtype=object) for c in SYMBOL_COLUMNS}
+        self.tickers: List[str] = frame["ticker"].tolist()
+        self.rows: Dict[str, int] = {t: i for i, t in enumerate(self.tickers)}
+        names = frame["name"].str.upper().to_numpy(dtype=object)
+        self.name_order = np.argsort(names, kind="stable").astype(np.int32)
+        self.names: List[str] = names[self.name_order].tolist()
+
+
+class SymbolIndex:
+    """
+    Ticker -> name, exchange, currency and sector, backed by a Parquet file.
+
+    Args:
+        path (str, optional): Index file. Defaults to $STOCK_DASHBOARD_SYMBOLS or
+            ~/.stock_dashboard/symbols.parquet.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("STOCK_DASHBOARD_SYMBOLS", DEFAULT_PATH)
+        self._lock = threading.RLock()
+        self._mtime = None
+        self._arrays = _Arrays(_normalize(pd.DataFrame(columns=SYMBOL_COLUMNS)))
+
+    # -------------------- INTERNALS --------------------
+    def _current(self) -> _Arrays:
+        """The in-memory index (re-read when another process rewrote the file)."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._arrays
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    frame = pd.read_parquet(self.path)
+                    self._arrays = _Arrays(_normalize(frame.astype({c: str for c in CATEGORY_COLUMNS})))
+                    self._mtime = mtime
+        return self._arrays
+
+    def _write(self, frame: pd.DataFrame):
+        arrays = _Arrays(frame)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        arrays.frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        self._arrays, self._mtime = arrays, os.path.getmtime(self.path)
+
+    # -------------------- LOOKUPS --------------------
+    def __len__(self) -> int:
+        return len(self._current().tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._current().rows
+
+    def contains(self, tickers: Iterable[str]) -> np.ndarray:
+        """Whether each ticker is indexed, as a boolean array (one hash lookup each)."""
+        rows = self._current().rows
+        return np.fromiter((t in rows for t in tickers), dtype=bool)
+
+    @staticmethod
+    def _record(arrays: _Arrays, row: int) -> SymbolRecord:
+        return SymbolRecord(*(arrays.values[c][row] for c in SYMBOL_COLUMNS))
+
+    def get(self, ticker: str) -> Optional[SymbolRecord]:
+        arrays = self._current()
+        row = arrays.rows.get(ticker)
+        return self._record(arrays, row) if row is not None else None
+
+    def attribute(self, tickers: Iterable[str], column: str) -> Dict[str, str]:
+        """
+        One column ("name", "exchange", "currency" or "sector") of the indexed tickers;
+        tickers that are not indexed, or have no value in that column, are left out.
+        """
+        arrays = self._current()
+        values = arrays.values[column]
+        found = {t: values[arrays.rows[t]] for t in tickers if t in arrays.rows}
+        return {t: value for t, value in found.items() if value}
+
+    def search(self, text: str, limit: int = 10) -> List[SymbolRecord]:
+        """
+        Autocomplete: tickers starting with `text`, then names starting with it.
+
+        Both are binary searches over sorted arrays, O(log n + limit).
+        """
+        prefix = (text or "").strip().upper()
+        if not prefix:
+            return []
+        arrays = self._current()
+        rows = []
+        for keys, order in ((arrays.tickers, None), (arrays.names, arrays.name_order)):
+            start = bisect.bisect_left(keys, prefix)
+            stop = min(bisect.bisect_left(keys, prefix + "\U0010ffff"), start + limit)
+            rows += [int(order[i]) if order is not None else i for i in range(start, stop)]
+        return [self._record(arrays, row) for row in list(dict.fromkeys(rows))[:limit]]
+
+    def frame(self) -> pd.DataFrame:
+        """The whole index, sorted by ticker."""
+        return self._current().frame.copy(deep=False)
+
+    # -------------------- UPDATES --------------------
+    def update(self, rows: pd.DataFrame, replace: bool = False):
+        """
+        Add or overwrite rows (SYMBOL_COLUMNS) and write the file.
+
+        Args:
+            rows (pd.DataFrame): New rows; their non-empty values win over the indexed
+                row of the same ticker.
+            replace (bool): Drop every row that is not in `rows`.
+        """
+        with self._lock:
+            rows = _normalize(rows)
+            if not replace:
+                current = self._current().frame.astype({c: str for c in CATEGORY_COLUMNS}).set_index("ticker")
+                merged = rows.set_index("ticker").replace("", np.nan).combine_first(current)
+                rows = _normalize(merged.reset_index())
+            self._write(rows)
+
+    def load(self, path: str, replace: bool = False) -> int:
+        """Add a listing file (see read_listing). Returns the number of rows read."""
+        rows = read_listing(path)
+        self.update(rows, replace)
+        return len(rows)
+
+    def learn(self, snapshots: Iterable[TickerSnapshot]):
+        """
+        Add the snapshots the provider could answer. Their values are stored as given,
+        including the snapshot defaults ("Unknown" sector, "USD"), so they are final.
+        """
+        rows = pd.DataFrame(
+            [{"ticker": s.ticker, "name": s.name, "exchange": s.exchange, "currency": s.currency, "sector": s.sector}
+             for s in snapshots if resolved(s)],
+            columns=SYMBOL_COLUMNS,
+        )
+        if not rows.empty:
+            self.update(rows)
+
+    def refresh(self, tickers: Optional[Iterable[str]] = None, service: Optional[MarketDataService] = None) -> int:
+        """
+        Re-read every indexed ticker (plus `tickers`) with one batched fundamentals lookup.
+
+        Returns:
+            int: Number of tickers the provider answered.
+        """
+        service = service or get_market_data_service()
+        tickers = list(dict.fromkeys(self._current().tickers + list(tickers or [])))
+        snapshots = [s for s in service.get_fundamentals(tickers).values() if resolved(s)]
+        self.learn(snapshots)
+        return len(snapshots)
+
+
+_index: Optional[SymbolIndex] = None
+
+
+def get_symbol_index() -> SymbolIndex:
+    """Return the process-wide symbol index."""
+    global _index
+    if _index is None:
+        _index = SymbolIndex()
+    return _index
+
+
+def symbol_attributes(tickers: Iterable[str], column: str,
+                      service: Optional[MarketDataService] = None) -> Dict[str, str]:
+    """
+    One column ("name", "exchange", "currency" or "sector") for every ticker.
+
+    Indexed tickers are answered from the index; the rest are fetched together in one
+    batched fundamentals lookup and added to it (as are indexed tickers without a value
+    in that column). Tickers the provider does not know get the TickerSnapshot default.
+
+    Returns:
+        dict: Ticker -> value, in input order.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    index = get_symbol_index()
+    values = index.attribute(tickers, column)
+    missing = [t for t in tickers if t not in values]
+    if missing:
+        snapshots = (service or get_market_data_service()).get_fundamentals(missing)
+        index.learn(snapshots.values())
+        values.update({t: getattr(s, column) for t, s in snapshots.items()})
+    return {t: values[t] for t in tickers}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build or refresh the local symbol index.")
+    parser.add_argument("--load", action="append", default=[], help="Listing file to add (CSV, TXT, Parquet, info.json)")
+    parser.add_argument("--replace", action="store_true", help="Replace the index with the loaded files")
+    parser.add_argument("--refresh", action="store_true", help="Re-read every indexed ticker from the provider")
+    parser.add_argument("--fixture", default=None, help="Offline data fixture directory instead of Yahoo Finance")
+    parser.add_argument("--search", default=None, help="Print the autocomplete matches of a prefix")
+    args = parser.parse_args(argv)
+
+    index = get_symbol_index()
+    if args.fixture:
+        provider = LocalProvider.from_directory(args.fixture)
+        get_market_data_service().set_provider(provider)
+    if args.load:
+        rows = pd.concat([read_listing(path) for path in args.load], ignore_index=True)
+        index.update(rows, replace=args.replace)
+    if args.refresh:
+        extra = list(provider.infos) if args.fixture else None
+        print(f"{index.refresh(extra)} tickers refreshed")
+    if args.search:
+        for record in index.search(args.search):
+            print(f"{record.ticker:<12} {record.exchange:<5} {record.currency:<4} {record.name}")
+    print(f"{len(index)} symbols in {index.path}")
+
+
+if __name__ == "__main__":
+    main()
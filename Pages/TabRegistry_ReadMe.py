@@ -0,0 +1,67 @@
+"""
+21. TabRegistry
+
+Dependency-declared Dashboard tabs. Each render function names the datasets it takes
+with @requires, and the Dashboard registers one builder per dataset. Only the
+datasets the selected tab asks for (and whatever those are built from) are computed,
+each at most once per rerun, so opening a tab never pays for another tab's data.
+Every dataset build and tab render is timed (see instrumentation).
+
+"""
+from typing import Any, Callable, Dict, Iterable
+
+from stock_dashboard.instrumentation import span
+
+DATASETS_ATTR = "required_datasets"
+
+
+def requires(*datasets: str) -> Callable:
+    """
+    Declare the datasets a tab's render function takes, in argument order.
+
+    Example:
+        @requires("valued_holdings", "total_value")
+        def render_some_tab(df, total_value): ...
+    """
+    def decorator(render):
+        setattr(render, DATASETS_ATTR, datasets)
+        return render
+    return decorator
+
+
+class DatasetResolver:
+    """
+    Lazily builds named datasets and memoizes them for the rest of the rerun.
+
+    Builders receive the resolver, so a dataset can be derived from other datasets
+    (e.g. the allocation pie from the valued holdings) without building anything else.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[["DatasetResolver"], Any]] = {}
+        self._values: Dict[str, Any] = {}
+
+    def register(self, name: str) -> Callable:
+        """Decorator registering the builder for a dataset."""
+        def decorator(build):
+            self._builders[name] = build
+            return build
+        return decorator
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self._values:
+            if name not in self._builders:
+                raise KeyError(f"No builder registered for dataset '{name}'")
+            with span(name, kind="dataset"):
+                self._values[name] = self._builders[name](self)
+        return self._values[name]
+
+    def resolve(self, names: Iterable[str]) -> list:
+        """Build (or reuse) each named dataset, in order."""
+        return [self[name] for name in names]
+
+
+def render_tab(render: Callable, resolver: DatasetResolver):
+    """Call a tab's render function with the datasets it declared."""
+    with span(render.__name__, kind="tab"):
+        return render(*resolver.resolve(getattr(render, DATASETS_ATTR, ())))